@@ -0,0 +1,49 @@
+import sys
+import argparse
+from src.benchmark import (BENCH_SIZES, BENCH_GROUPS, BENCH_DTYPES, TOLERANCE, run_benchmarks,
+                           save_results, load_results, compare_results)
+
+
+def main(argv):
+    """Замеры скорости и памяти: python benchmark.py --sizes 10000 100000 --baseline bench/baseline.json"""
+    parser = argparse.ArgumentParser(description="Замеры времени и памяти загрузки, очистки, статистики, графиков и моделей")
+    parser.add_argument("--source", choices=("synthetic", "titanic"), default="synthetic",
+                        help="синтетическая таблица или увеличенная копия titanic.csv")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(BENCH_SIZES), help="размеры таблиц в строках")
+    parser.add_argument("--groups", nargs="+", choices=BENCH_GROUPS, default=list(BENCH_GROUPS),
+                        help="какие группы замеров запускать")
+    parser.add_argument("--columns", type=int, default=8, help="число колонок синтетической таблицы")
+    parser.add_argument("--dtypes", nargs="+", choices=BENCH_DTYPES, default=list(BENCH_DTYPES),
+                        help="типы колонок синтетической таблицы (по кругу)")
+    parser.add_argument("--missing", type=float, default=0.05, help="доля пропусков в колонке")
+    parser.add_argument("--duplicates", type=float, default=0.01, help="доля строк-дубликатов")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="повторов каждого замера (берется лучшее время)")
+    parser.add_argument("--no-memory", action="store_true", help="не мерить пиковую память")
+    parser.add_argument("--output", default="bench/results.json", help="куда записать результаты (JSON)")
+    parser.add_argument("--baseline", help="JSON с базовыми результатами для сравнения")
+    parser.add_argument("--save-baseline", action="store_true", help="записать результаты как новую базу (--baseline)")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="допустимое замедление (0.25 - 25%%)")
+    args = parser.parse_args(argv)
+
+    options = {"columns": args.columns, "dtypes": tuple(args.dtypes), "missing_rate": args.missing,
+               "duplicate_rate": args.duplicates, "seed": args.seed}
+    results = run_benchmarks(args.sizes, args.source, args.groups, args.repeat, not args.no_memory,
+                             options if args.source == "synthetic" else None)
+    save_results(results, args.output)
+    print(f"Результаты записаны: {args.output}")
+
+    if args.baseline and args.save_baseline:
+        save_results(results, args.baseline)
+        print(f"База обновлена: {args.baseline}")
+    elif args.baseline:
+        report = compare_results(results, load_results(args.baseline), args.tolerance)
+        print(report.round(4).to_string(index=False))
+        regressions = (report['Статус'] == 'регрессия').sum()
+        print(f"Регрессий: {regressions}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -2,9 +2,18 @@ import pandas as pd
 import os
 import sys
 from src.cleaner import DataCleaner
-from src.statistics import DataStats
+from src.statistics import DataStats, IncrementalStats
 from src.visualizer import DataVisualizer
 from src.machine_learning import DataPredictor
+from src.loader import ChunkedCSV, DEFAULT_CHUNKSIZE, is_stream
+from src.shards import load_shards, shard_report, is_shard_source
+from src.cache import DatasetCache
+from src.models import ModelRegistry
+from src.memory import optimize_dtypes, memory_report, append_rows
+from src.pipeline import STEP_LABELS
+from src.correlation import CORR_METHODS, METHOD_LABELS
+from src.profiling import PROFILER, count_rows, format_record
+from src.sampling import draw_sample, SAMPLE_METHODS, DEFAULT_SAMPLE_SIZE
 
 # Настройки отображения
 pd.set_option('display.max_columns', None)
@@ -14,34 +23,262 @@ pd.set_option('display.width', 1000)
 current_df = None
 # Глобальный клинер, чтобы помнить историю очистки
 current_cleaner = None
+# Путь к исходному файлу (нужен для кэша)
+current_path = None
+# Кэш разобранных и очищенных таблиц на диске
+dataset_cache = DatasetCache()
+# Обученные модели на диске (повторное обучение на тех же данных не нужно)
+model_registry = ModelRegistry()
+# Накопленная статистика (IncrementalStats) и версии колонок таблицы, к которой она
+# относится: при дописывании строк она обновляется, а не считается заново
+current_stats = None
+stats_owner = None
+# Режим выборки: настройки выборки (способ, размер, колонка) или None - работа со всей таблицей
+sample_settings = None
+# Выборка текущей таблицы и версии колонок, по которым она взята: берется заново,
+# только если таблица или настройки изменились
+current_sample = None
+sample_owner = None
+# Последнее действие (название, функция от таблицы) - для повтора на полных данных
+last_action = None
+
+def describe_recipe(recipe):
+    return ", ".join(STEP_LABELS.get(name, name) for name, _ in recipe)
+
+def load_from_cache(path):
+    """Таблица из кэша (разобранная или очищенная) и ее рецепт очистки; None, если кэша нет."""
+    recipes = dataset_cache.cleaned_recipes(path)
+    if recipes:
+        print("В кэше есть очищенные версии этого файла:")
+        for i, recipe in enumerate(recipes, 1):
+            print(f"{i}. {describe_recipe(recipe)}")
+        val = input("Номер версии (Enter - исходные данные): ").strip()
+        if val.isdigit() and 1 <= int(val) <= len(recipes):
+            recipe = recipes[int(val) - 1]
+            df = dataset_cache.load(path, recipe)
+            if df is not None:
+                return df, recipe
+    df = dataset_cache.load(path)
+    return (df, []) if df is not None else None
 
 def load_data():
-    global current_df, current_cleaner
-    path = input("Введите путь к CSV файлу (например, data.csv): ")
+    global current_df, current_cleaner, current_path
+    path = input("Введите путь к CSV файлу, папке или шаблону (например, data.csv или parts/*.csv): ")
     # Убираем кавычки, если пользователь скопировал путь как "C:\path\to\file"
     path = path.strip('"').strip("'")
+
+    if is_shard_source(path):
+        load_shard_data(path)
+        return
     
     if not os.path.exists(path):
         print(f"Ошибка: Файл '{path}' не найден.")
         return
 
+    print("Режим загрузки: 1 - целиком в память, 2 - потоковый (для очень больших файлов), "
+          "3 - дописать строки к загруженной таблице")
+    mode = input("Ваш выбор (по умолчанию 1): ").strip()
+    if mode == "3":
+        append_data(path)
+        return
+
+    chunksize = DEFAULT_CHUNKSIZE
+    if mode == "2":
+        val = input(f"Размер чанка в строках (по умолчанию {DEFAULT_CHUNKSIZE}): ")
+        if val.strip():
+            if not val.strip().isdigit():
+                print("Ошибка: нужно ввести целое число.")
+                return
+            chunksize = int(val)
+
     try:
-        current_df = pd.read_csv(path)
-        # Создаем клинер один раз при загрузке
-        current_cleaner = DataCleaner(current_df)
-        print(f"\nУспешно загружено! Размер таблицы: {current_df.shape}")
-        print("Первые 5 строк:")
-        print(current_df.head())
+        with PROFILER.stage("main.load_data") as record:
+            if mode == "2":
+                current_df = ChunkedCSV(path, chunksize=chunksize)
+                current_cleaner = DataCleaner(current_df)
+                print(f"\nФайл открыт в потоковом режиме (по {chunksize} строк за раз).")
+                print(f"Типы колонок: {current_df.dtypes}")
+            else:
+                cached = load_from_cache(path)
+                recipe = []
+                if cached is not None:
+                    current_df, recipe = cached
+                    print("\nТаблица загружена из кэша (без повторного разбора CSV).")
+                else:
+                    current_df = pd.read_csv(path)
+                    # Компактные типы сразу после разбора (в кэш попадает уже сжатая таблица)
+                    current_df, report = optimize_dtypes(current_df)
+                    print("\n".join(memory_report(report)))
+                    save_to_cache(current_df, path)
+                # Создаем клинер один раз при загрузке
+                current_cleaner = DataCleaner(current_df, recipe=recipe)
+                print(f"\nУспешно загружено! Размер таблицы: {current_df.shape}")
+            current_path = path
+            print("Первые 5 строк:")
+            print(current_df.head())
+            record['rows_out'] = count_rows(current_df)
+        # Замер загрузки - первая строка истории нового клинера
+        current_cleaner.history.append(format_record(record))
     except Exception as e:
         print(f"Ошибка при чтении файла: {e}")
 
+def load_shard_data(source):
+    """Загружает таблицу из многих CSV частей (папка или шаблон) параллельно."""
+    global current_df, current_cleaner, current_path
+    val = input("Сколько процессов разбирают файлы (по умолчанию - все ядра): ").strip()
+    if val and not val.isdigit():
+        print("Ошибка: нужно ввести целое число.")
+        return
+    try:
+        with PROFILER.stage("main.load_shards") as record:
+            df, report, notes = load_shards(source, workers=int(val) if val else None)
+            lines = shard_report(report) + notes
+            df, memory = optimize_dtypes(df)
+            lines += memory_report(memory)
+            record['rows_out'] = count_rows(df)
+    except Exception as e:
+        print(f"Ошибка при чтении файлов: {e}")
+        return
+    print("\n".join(lines))
+    current_df, current_path = df, source
+    current_cleaner = DataCleaner(current_df)
+    current_cleaner.history.extend(lines)
+    current_cleaner.history.append(format_record(record))
+    print(f"\nУспешно загружено! Размер таблицы: {current_df.shape}")
+    print("Первые 5 строк:")
+    print(current_df.head())
+
+def append_data(path):
+    """Дописывает строки нового CSV к таблице; накопленная статистика обновляется только по ним."""
+    global current_df, current_cleaner, current_stats, stats_owner
+    if current_df is None or is_stream(current_df):
+        print("Сначала загрузите таблицу в память (режим 1).")
+        return
+    try:
+        with PROFILER.stage("main.append_data", count_rows(current_df)) as record:
+            new_rows = pd.read_csv(path)
+            state = get_stats_state()
+            # Типы таблицы (после сжатия - int8, category) при дописывании не расширяются
+            current_df = append_rows(current_df, new_rows)
+            state.update(new_rows)
+            current_stats = state
+            record['rows_out'] = count_rows(current_df)
+    except Exception as e:
+        print(f"Ошибка при чтении файла: {e}")
+        return
+    # Дописанная таблица - новая исходная точка для очистки
+    current_cleaner = DataCleaner(current_df)
+    stats_owner = current_cleaner.column_versions
+    current_cleaner.history.append(format_record(record))
+    print(f"Дописано строк: {len(new_rows)}, всего: {len(current_df)}. "
+          f"Статистика обновлена по новым строкам.")
+
+def current_versions():
+    """Версии колонок текущей таблицы - по ним статистика берется из кэша, пока колонки не меняются."""
+    if current_cleaner is not None and current_cleaner.df is current_df:
+        return current_cleaner.column_versions
+    return None
+
+def stats_state_fresh():
+    """Накопленная статистика относится к текущей таблице (версии колонок не менялись)."""
+    versions = current_versions()
+    return current_stats is not None and versions is not None and stats_owner == versions
+
+def get_stats_state():
+    """Накопленная статистика текущей таблицы (строится заново, только если таблица изменилась).
+
+    Изменение определяется по версиям колонок, а не по объекту таблицы:
+    шаг очистки, поменявший колонку на месте, тоже меняет ее версию.
+    """
+    global current_stats, stats_owner
+    if not stats_state_fresh():
+        current_stats = IncrementalStats.from_data(current_df)
+        stats_owner = current_versions()
+    return current_stats
+
+def get_sample():
+    """Выборка текущей таблицы (из кэша, пока версии колонок таблицы не изменились)."""
+    global current_sample, sample_owner
+    versions = current_versions()
+    if current_sample is None or versions is None or sample_owner != versions:
+        with PROFILER.stage("main.draw_sample", count_rows(current_df)) as record:
+            current_sample = draw_sample(current_df, **sample_settings)
+            record['rows_out'] = len(current_sample.df)
+        sample_owner = versions
+        print(f"{current_sample.describe()}, {record['wall']:.2f} с")
+    return current_sample
+
+def working_data():
+    """Таблица для интерактивных действий: выборка в режиме выборки, иначе вся таблица."""
+    if sample_settings is None:
+        return current_df
+    return get_sample().df
+
+def run_action(label, action, columns=None):
+    """Выполняет action(таблица) над рабочей таблицей и запоминает его для повтора на полных данных.
+
+    В режиме выборки после действия печатаются доверительные интервалы
+    для колонок columns (по умолчанию - всех числовых).
+    """
+    global last_action
+    last_action = (label, action)
+    action(working_data())
+    if sample_settings is not None:
+        sample = get_sample()
+        if columns is None or len(columns):
+            print(f"\n{sample.describe()}. Оценки для всей таблицы (95% интервалы):")
+            print(sample.confidence_intervals(columns))
+        else:
+            print(f"\n{sample.describe()}")
+        print("Пункт 9 главного меню - повторить это действие на полных данных.")
+
+def rerun_on_full_data():
+    """Повторяет последнее действие на всей таблице (те же шаги, что и для выборки)."""
+    if last_action is None:
+        print("Еще не было действий для повтора.")
+        return
+    if current_df is None:
+        print("Сначала загрузите данные!")
+        return
+    label, action = last_action
+    print(f"\n[Полные данные] {label}")
+    with PROFILER.stage("main.rerun_on_full_data", count_rows(current_df)) as record:
+        action(current_df)
+    print(format_record(record))
+
+def versions_for(df):
+    """Версии колонок для кэша статистики - только для самой текущей таблицы (не выборки)."""
+    return current_versions() if df is current_df else None
+
+def save_to_cache(df, path, recipe=None):
+    try:
+        dataset_cache.save(df, path, recipe)
+        print("Таблица сохранена в кэш.")
+    except Exception as e:
+        # Кэш - только ускорение, без него программа работает как раньше
+        print(f"Не удалось сохранить кэш: {e}")
+
+def get_numeric_columns(df):
+    """Числовые колонки как для таблицы в памяти, так и для потока."""
+    if is_stream(df):
+        return df.numeric_columns()
+    return df.select_dtypes(include=['number']).columns.tolist()
+
 def show_current_data():
     if current_df is None:
         print("Сначала загрузите данные!")
         return
+    run_action("Показать таблицу", print_table, columns=[])
+
+def print_table(df):
     print("\n--- Текущие данные ---")
-    print(current_df)
-    print(f"\nРазмер: {current_df.shape}")
+    if is_stream(df):
+        # Поток целиком не выводим: это прочитало бы весь файл
+        print(df.head(20))
+        print(f"\nПотоковый режим, файл: {df.path}")
+        return
+    print(df)
+    print(f"\nРазмер: {df.shape}")
 
 def clean_data():
     global current_df, current_cleaner
@@ -56,66 +293,200 @@ def clean_data():
         print("\n--- Меню очистки данных ---")
         print("1. Удалить дубликаты")
         print("2. Удалить строки с пропусками (NaN)")
-        print("3. Заполнить пропуски средним значением")
+        print("3. Заполнить пропуски (среднее / медиана / мода, по группам)")
         print("4. Исправить форматирование (текст -> числа)")
         print("5. Исправить форматирование (текст -> даты)")
-        print("6. Удалить выбросы (Z-score)")
+        print("6. Удалить выбросы (Z-score / IQR / MAD)")
         print("7. Показать сводку по очистке")
         print("8. Показать текущую таблицу")
+        state = "вкл" if current_cleaner.lazy else "выкл"
+        print(f"9. Ленивый режим (шаги копятся в план) [{state}]")
+        print("10. Выполнить накопленный план")
+        print("11. Отменить последний шаг")
+        print("12. Повторить отмененный шаг")
+        print("13. Сохранить контрольную точку")
+        print("14. Вернуться к контрольной точке")
+        print("15. Сохранить очищенную таблицу в кэш")
+        print("16. Сжать типы колонок (экономия памяти)")
+        print("17. Сохранить значения заполнения пропусков (для новых данных)")
         print("0. Назад в главное меню")
         
         choice = input("Выберите действие: ")
         
         if choice == "1":
-            current_df = current_cleaner.remove_duplicates()
+            val = input("Ключевые колонки через запятую (Enter - сравнивать строки целиком): ").strip()
+            subset = [c.strip() for c in val.split(",") if c.strip()] or None
+            missing = [c for c in subset or [] if c not in current_df.columns]
+            if missing:
+                print(f"Ошибка: нет колонок {', '.join(missing)}")
+                continue
+            current_df = current_cleaner.remove_duplicates(subset)
         elif choice == "2":
             current_df = current_cleaner.remove_missing_values()
         elif choice == "3":
-            current_df = current_cleaner.fill_missing_values()
+            print("Способ: 1 - среднее, 2 - медиана, 3 - мода (и для текста), "
+                  "4 - сохраненные значения из файла")
+            way = input("Ваш выбор (по умолчанию 1): ").strip()
+            if way == "4":
+                path = input("Путь к файлу значений (.joblib): ").strip().strip('"').strip("'")
+                if not os.path.exists(path):
+                    print(f"Ошибка: Файл '{path}' не найден.")
+                    continue
+                current_df = current_cleaner.fill_missing_values(fitted=path)
+                continue
+            strategy = {"2": "median", "3": "mode"}.get(way, "mean")
+            val = input("Колонки групп через запятую, например Pclass,Sex (Enter - без групп): ").strip()
+            group_by = [c.strip() for c in val.split(",") if c.strip()] or None
+            missing = [c for c in group_by or [] if c not in current_df.columns]
+            if missing:
+                print(f"Ошибка: нет колонок {', '.join(missing)}")
+                continue
+            current_df = current_cleaner.fill_missing_values(strategy, group_by)
         elif choice == "4":
             current_df = current_cleaner.convert_to_numeric()
         elif choice == "5":
             current_df = current_cleaner.convert_to_datetime()
         elif choice == "6":
             try:
-                val = input("Введите порог Z-оценки (по умолчанию 3): ")
-                # Если нажали Enter, ставим 3
-                threshold = float(val) if val.strip() else 3.0
-                current_df = current_cleaner.remove_outliers(threshold)
+                print("Метод: 1 - Z-score, 2 - IQR, 3 - MAD (медиана)")
+                method = {"2": "iqr", "3": "mad"}.get(input("Ваш выбор (по умолчанию 1): ").strip(), "zscore")
+                default = 1.5 if method == "iqr" else 3.0
+                val = input(f"Введите порог (по умолчанию {default}): ")
+                # Если нажали Enter, ставим порог по умолчанию
+                threshold = float(val) if val.strip() else default
+                seq = input("Проверять колонки по очереди (старый режим)? (y/n, по умолчанию n): ")
+                current_df = current_cleaner.remove_outliers(threshold, method, sequential=seq.strip().lower() == "y")
             except ValueError:
                 print("Ошибка: нужно ввести число.")
         elif choice == "7":
             current_cleaner.print_summary()
         elif choice == "8":
-            print(current_df)
+            print(current_df.head(20) if is_stream(current_df) else current_df)
+        elif choice == "9":
+            if current_cleaner.lazy:
+                # Перед выключением выполняем то, что уже накоплено
+                current_df = current_cleaner.collect()
+            current_cleaner.lazy = not current_cleaner.lazy
+            print(f"Ленивый режим {'включен' if current_cleaner.lazy else 'выключен'}.")
+        elif choice == "10":
+            current_df = current_cleaner.collect()
+        elif choice == "11":
+            current_df = current_cleaner.undo()
+        elif choice == "12":
+            current_df = current_cleaner.redo()
+        elif choice == "13":
+            name = input("Имя контрольной точки: ").strip()
+            if name:
+                current_cleaner.checkpoint(name)
+        elif choice == "14":
+            name = input("Имя контрольной точки: ").strip()
+            current_df = current_cleaner.restore(name)
+        elif choice == "15":
+            if is_stream(current_df):
+                print("В потоковом режиме кэш не используется.")
+            elif is_shard_source(current_path):
+                print("Для таблицы из нескольких файлов кэш не используется.")
+            elif not current_cleaner.recipe:
+                print("Очистка еще не выполнялась.")
+            else:
+                save_to_cache(current_df, current_path, current_cleaner.recipe)
+        elif choice == "16":
+            current_df = current_cleaner.optimize_memory()
+        elif choice == "17":
+            if current_cleaner.imputer is None:
+                print("Пропуски еще не заполнялись (в ленивом режиме значения не сохраняются).")
+                continue
+            default = os.path.join(".cache", "imputer.joblib")
+            path = input(f"Файл (по умолчанию {default}): ").strip() or default
+            current_cleaner.imputer.save(path)
+            print(f"Значения заполнения сохранены в {path} (пункт 3, способ 4 - применить к новым данным).")
         elif choice == "0":
+            if len(current_cleaner.plan):
+                print("Внимание: в плане есть невыполненные шаги (пункт 10).")
             break
         else:
             print("Неверный выбор.")
 
+def stats_for(df):
+    """DataStats для таблицы (в приближенном режиме - из накопленного состояния, если оно есть)."""
+    state = current_stats if df is current_df and stats_state_fresh() else None
+    return DataStats(df, state=state, versions=versions_for(df))
+
 def show_statistics():
     global current_df
     if current_df is None:
         print("Сначала загрузите данные!")
         return
     
-    # Создаем объект статистики
-    stats_module = DataStats(current_df)
-    
     print("\n--- Статистика ---")
     print("1. Общая статистика")
     print("2. Матрица корреляции")
+    print("3. Общая статистика (приближенные квантили, обновляется при дописывании строк)")
+    print("4. Корреляция Спирмена / Кендалла")
+    print("5. Самые коррелированные пары колонок")
+    print("6. Статистика и корреляция по группам")
     print("0. Назад")
     
     choice = input("Выберите действие: ")
     
     if choice == "1":
-        print("\n[Основные показатели]")
-        # .T транспонирует таблицу (строки становятся столбцами) для удобства чтения
-        print(stats_module.get_basic_stats().T)
+        def action(df):
+            print("\n[Основные показатели]")
+            # .T транспонирует таблицу (строки становятся столбцами) для удобства чтения
+            print(stats_for(df).get_basic_stats().T)
+        run_action("Общая статистика", action)
     elif choice == "2":
-        print("\n[Матрица корреляции]")
-        print(stats_module.get_correlation())
+        def action(df):
+            print("\n[Матрица корреляции]")
+            print(stats_for(df).get_correlation())
+        run_action("Матрица корреляции", action)
+    elif choice == "3":
+        def action(df):
+            print("\n[Основные показатели (приближенно)]")
+            state = get_stats_state() if df is current_df else None
+            print(DataStats(df, approx=True, state=state).get_basic_stats().T)
+        run_action("Общая статистика (приближенно)", action)
+    elif choice == "4":
+        method = "kendall" if input("1 - Спирмен, 2 - Кендалл: ").strip() == "2" else "spearman"
+
+        def action(df):
+            print(f"\n[Матрица корреляции: {METHOD_LABELS[method]}]")
+            print(stats_for(df).get_correlation(method))
+        run_action(f"Корреляция: {METHOD_LABELS[method]}", action)
+    elif choice == "5":
+        print("Метод: 1 - Пирсон, 2 - Спирмен, 3 - Кендалл")
+        val = input("Ваш выбор: ").strip()
+        method = CORR_METHODS[int(val) - 1] if val in ("1", "2", "3") else "pearson"
+        val = input("Сколько пар показать (Enter - 20) или порог |r| (например 0.8): ").strip()
+        try:
+            number = float(val) if val else 20
+        except ValueError:
+            print("Ошибка: нужно ввести число.")
+            return
+
+        def action(df):
+            if number < 1:
+                pairs = stats_for(df).get_correlated_pairs(threshold=number, method=method)
+            else:
+                pairs = stats_for(df).get_correlated_pairs(k=int(number), method=method)
+            print(f"\n[Самые коррелированные пары: {METHOD_LABELS[method]}]")
+            print(pairs)
+        run_action(f"Самые коррелированные пары: {METHOD_LABELS[method]}", action)
+    elif choice == "6":
+        val = input("Колонки для группировки через запятую (например, Pclass,Sex): ").strip()
+        keys = [c.strip() for c in val.split(",") if c.strip()]
+        missing = [c for c in keys if c not in current_df.columns]
+        if not keys or missing:
+            print(f"Ошибка: колонки не найдены: {', '.join(missing) or '-'}")
+            return
+
+        def action(df):
+            stats_module = stats_for(df)
+            print(f"\n[Основные показатели по группам: {', '.join(keys)}]")
+            print(stats_module.get_basic_stats(group_by=keys))
+            print(f"\n[Матрица корреляции по группам: {', '.join(keys)}]")
+            print(stats_module.get_correlation(group_by=keys))
+        run_action(f"Статистика по группам: {', '.join(keys)}", action)
     elif choice == "0":
         return
     else:
@@ -128,14 +499,12 @@ def show_plots():
         return
 
     # Pandas находит все колонки с числами, как бы они ни назывались
-    numeric_cols = current_df.select_dtypes(include=['number']).columns.tolist()
+    numeric_cols = get_numeric_columns(current_df)
     
     if not numeric_cols:
         print("В этом файле нет числовых колонок для построения графиков.")
         return
 
-    viz = DataVisualizer(current_df)
-    
     print("\n--- Визуализация ---")
     print(f"Доступные колонки: {', '.join(numeric_cols)}")
     print("1. Гистограмма")
@@ -154,22 +523,19 @@ def show_plots():
             print("Ошибка: такой колонки нет.")
             return
 
-        if choice == "1":
-            viz.plot_histogram(col)
-        elif choice == "2":
-            viz.plot_density(col)
-        elif choice == "3":
-            viz.plot_boxplot(col)
-        elif choice == "4":
-            viz.plot_boxplot_mean_std(col)
-        elif choice == "5":
-            viz.plot_violin(col)
+        plot = {"1": "plot_histogram", "2": "plot_density", "3": "plot_boxplot",
+                "4": "plot_boxplot_mean_std", "5": "plot_violin"}[choice]
+        run_action(f"График {plot} '{col}'",
+                   lambda df: getattr(DataVisualizer(df, versions=versions_for(df)), plot)(col),
+                   columns=[col])
 
     elif choice == "6":
         col_x = input("Введите колонку для оси X: ")
         col_y = input("Введите колонку для оси Y: ")
         if col_x in numeric_cols and col_y in numeric_cols:
-            viz.plot_scatter(col_x, col_y)
+            run_action(f"График plot_scatter '{col_x}' - '{col_y}'",
+                       lambda df: DataVisualizer(df, versions=versions_for(df)).plot_scatter(col_x, col_y),
+                       columns=[col_x, col_y])
         else:
             print("Ошибка: неверные названия колонок.")
             
@@ -178,14 +544,49 @@ def show_plots():
     else:
         print("Неверный выбор.")
 
+def score_with_saved_model():
+    """Прогноз сохраненной моделью для нового CSV (без обучения)."""
+    entries = model_registry.entries()
+    if not entries:
+        print("Сохраненных моделей нет. Сначала обучите модель.")
+        return
+    print("\nСохраненные модели:")
+    for i, meta in enumerate(entries, 1):
+        print(f"{i}. {meta['name']}: {meta['target']} <- {', '.join(meta['features'])} "
+              f"(MAE {meta['mae']:.2f}, R2 {meta['r2']:.2f}, строк {meta['rows']})")
+    val = input("Номер модели: ").strip()
+    if not (val.isdigit() and 1 <= int(val) <= len(entries)):
+        print("Неверный выбор.")
+        return
+    path = input("Путь к CSV с новыми строками: ").strip()
+    if not os.path.exists(path):
+        print("Файл не найден!")
+        return
+    output_path = os.path.splitext(path)[0] + "_predictions.csv"
+    try:
+        rows = model_registry.score(entries[int(val) - 1]["key"], path, output_path)
+    except KeyError as e:
+        print(f"Ошибка: {e}")
+        return
+    print(f"Прогноз готов для {rows} строк: {output_path}")
+
 def run_ml():
     global current_df
+    print("\n--- Машинное обучение ---")
+    print("1. Обучить модель на текущих данных")
+    print("2. Прогноз сохраненной моделью для нового CSV")
+    print("3. Сравнить модели (кросс-валидация)")
+    mode = input("Ваш выбор: ").strip()
+    if mode == "2":
+        score_with_saved_model()
+        return
+
     if current_df is None:
         print("Сначала загрузите данные!")
         return
 
     # Ищем только числовые колонки
-    numeric_cols = current_df.select_dtypes(include=['number']).columns.tolist()
+    numeric_cols = get_numeric_columns(current_df)
     if len(numeric_cols) < 2:
         print("Для прогноза нужно минимум 2 числовые колонки.")
         return
@@ -215,21 +616,141 @@ def run_ml():
         print("Не выбрано ни одной корректной колонки для X.")
         return
 
+    if mode == "3":
+        val = input("Число фолдов (Enter - 5): ").strip()
+        folds = int(val) if val.isdigit() and int(val) >= 2 else 5
+        run_action(f"Сравнение моделей: {target}",
+                   lambda df: DataPredictor(df).compare_models(target, valid_features, folds=folds),
+                   columns=[target] + valid_features)
+        return
+
     print("\nВыберите модель:")
     print("1. Линейная регрессия")
     print("2. Дерево решений")
     print("3. Случайный лес")
+    print("4. Линейная регрессия по частям (SGD, для очень больших данных)")
+    print("5. Градиентный бустинг по частям (для очень больших данных)")
     
     m_choice = input("Ваш выбор: ")
+    if m_choice in ("4", "5"):
+        # Данные читаются блоками, таблица целиком в память не собирается
+        model_type = "sgd" if m_choice == "4" else "hist"
+        run_action(f"Модель {model_type}: {target}",
+                   lambda df: DataPredictor(df).fit_incremental(target, valid_features, model_type),
+                   columns=[target] + valid_features)
+        return
     model_type = "linear"
     if m_choice == "2":
         model_type = "tree"
     elif m_choice == "3":
         model_type = "forest"
 
-    # Запускаем
-    predictor = DataPredictor(current_df)
-    predictor.predict(target, valid_features, model_type)
+    # Запускаем (в кэш моделей попадают только модели, обученные на всей таблице)
+    run_action(f"Модель {model_type}: {target}",
+               lambda df: DataPredictor(df, registry=model_registry if df is current_df else None)
+               .predict(target, valid_features, model_type),
+               columns=[target] + valid_features)
+
+def show_profile():
+    print("\n--- Профиль выполнения ---")
+    print(f"Замер памяти (tracemalloc): {'вкл' if PROFILER.trace_memory else 'выкл'}, "
+          f"cProfile: {'вкл' if PROFILER.profile else 'выкл'}")
+    print("1. Показать этапы")
+    print("2. Сохранить в JSON lines")
+    print("3. Сохранить Chrome trace (chrome://tracing, Perfetto)")
+    print("4. Сохранить cProfile самого медленного этапа")
+    print("5. Включить/выключить замер памяти (замедляет работу)")
+    print("6. Включить/выключить cProfile")
+    print("7. Очистить журнал")
+    print("0. Назад")
+
+    choice = input("Выберите действие: ")
+
+    if choice == "1":
+        if not PROFILER.records:
+            print("Журнал пуст.")
+            return
+        print(PROFILER.frame().round(4).to_string(index=False))
+    elif choice in ("2", "3", "4"):
+        default = {"2": "profile.jsonl", "3": "trace.json", "4": "slowest.prof"}[choice]
+        path = input(f"Имя файла (Enter - {default}): ").strip() or default
+        if choice == "2":
+            PROFILER.to_jsonl(path)
+        elif choice == "3":
+            PROFILER.to_chrome_trace(path)
+        else:
+            slowest = PROFILER.dump_slowest(path)
+            if slowest is None:
+                print("Нет профиля: включите cProfile (пункт 6) и повторите действия.")
+                return
+            name, text = slowest
+            print(f"Самый медленный этап: {name}")
+            print(text)
+        print(f"Сохранено: {path}")
+    elif choice == "5":
+        PROFILER.trace_memory = not PROFILER.trace_memory
+        print(f"Замер памяти {'включен' if PROFILER.trace_memory else 'выключен'}.")
+    elif choice == "6":
+        PROFILER.profile = not PROFILER.profile
+        print(f"cProfile {'включен' if PROFILER.profile else 'выключен'}.")
+    elif choice == "7":
+        PROFILER.clear()
+        print("Журнал очищен.")
+    elif choice == "0":
+        return
+    else:
+        print("Неверный выбор.")
+
+def sampling_menu():
+    """Настройка выборки: статистика, графики и модели считаются по ней, а не по всей таблице."""
+    global sample_settings, current_sample
+    if current_df is None:
+        print("Сначала загрузите данные!")
+        return
+    print("\n--- Режим выборки ---")
+    print("1. Равномерная выборка")
+    print("2. Выборка по слоям колонки (доли значений как во всей таблице)")
+    print("3. Резервуар (один проход по потоку, число строк заранее не нужно)")
+    print("4. Доверительные интервалы по текущей выборке")
+    print("5. Выключить (работать со всей таблицей)")
+    print("0. Назад")
+    choice = input("Выберите действие: ").strip()
+    if choice in ("1", "2", "3"):
+        val = input(f"Размер выборки в строках (по умолчанию {DEFAULT_SAMPLE_SIZE}): ").strip()
+        if val and not val.isdigit():
+            print("Ошибка: нужно ввести целое число.")
+            return
+        settings = {"method": {"1": "uniform", "2": "stratified", "3": "reservoir"}[choice],
+                    "size": int(val) if val else DEFAULT_SAMPLE_SIZE}
+        if choice == "2":
+            column = input("Колонка слоев: ").strip()
+            if column not in current_df.columns:
+                print("Ошибка: такой колонки нет.")
+                return
+            settings["column"] = column
+        sample_settings, current_sample = settings, None
+        try:
+            get_sample()
+        except Exception as e:
+            sample_settings = None
+            print(f"Ошибка при построении выборки: {e}")
+            return
+        print(f"Режим выборки включен ({SAMPLE_METHODS[settings['method']]}): статистика, графики "
+              f"и модели считаются по выборке.")
+    elif choice == "4":
+        if sample_settings is None:
+            print("Режим выборки выключен.")
+            return
+        sample = get_sample()
+        print(f"\n{sample.describe()}. Оценки для всей таблицы (95% интервалы):")
+        print(sample.confidence_intervals())
+    elif choice == "5":
+        sample_settings, current_sample = None, None
+        print("Режим выборки выключен: все действия идут по всей таблице.")
+    elif choice == "0":
+        return
+    else:
+        print("Неверный выбор.")
 
 def main_menu():
     while True:
@@ -240,6 +761,11 @@ def main_menu():
         print("4. Построить графики")
         print("5. Прогнозирование")
         print("6. Показать таблицу")
+        print("7. Профиль выполнения (время и память этапов)")
+        mode = current_sample.describe() if sample_settings and current_sample else \
+            ("вкл" if sample_settings else "выкл")
+        print(f"8. Режим выборки для огромных таблиц [{mode}]")
+        print("9. Повторить последнее действие на полных данных")
         print("0. Выход")
         
         choice = input("Выберите действие: ")
@@ -256,11 +782,44 @@ def main_menu():
             run_ml()
         elif choice == "6":
             show_current_data()
+        elif choice == "7":
+            show_profile()
+        elif choice == "8":
+            sampling_menu()
+        elif choice == "9":
+            rerun_on_full_data()
         elif choice == "0":
             print("Выход...")
             break
         else:
             print("Неверная команда.")
 
+def run_batch(argv):
+    """Пакетный (неинтерактивный) режим: python main.py --job job.json"""
+    import argparse
+    from src.batch import load_job, run_job
+
+    parser = argparse.ArgumentParser(description="Пакетная обработка CSV файлов по заданию")
+    parser.add_argument("--job", required=True, help="JSON файл с описанием задания")
+    parser.add_argument("--output", help="папка для результатов (вместо output_dir из задания)")
+    parser.add_argument("--workers", type=int, help="число процессов (вместо workers из задания)")
+    args = parser.parse_args(argv)
+
+    spec = load_job(args.job)
+    if args.output:
+        spec["output_dir"] = args.output
+    if args.workers:
+        spec["workers"] = args.workers
+    summary = run_job(spec)
+    failed = 0
+    for item in summary["files"]:
+        status = "OK" if item["status"] == "ok" else f"ОШИБКА ({item['error']})"
+        print(f"{item['input']}: {status}, {item['seconds']:.1f} с")
+        failed += item["status"] != "ok"
+    print(f"Готово за {summary['job_seconds']:.1f} с, файлов: {len(summary['files'])}, с ошибками: {failed}")
+    return 1 if failed else 0
+
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        sys.exit(run_batch(sys.argv[1:]))
     main_menu()
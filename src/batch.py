@@ -0,0 +1,284 @@
+import os
+import io
+import glob
+import json
+import time
+import contextlib
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+import matplotlib
+import pandas as pd
+import joblib
+from .loader import ChunkedCSV, DEFAULT_CHUNKSIZE, is_stream
+from .cleaner import DataCleaner
+from .statistics import DataStats
+from .visualizer import render_batch
+from .machine_learning import DataPredictor, INCREMENTAL_NAMES
+from .pipeline import STEP_LABELS
+from .correlation import CORR_METHODS
+from .memory import optimize_dtypes, memory_report
+from .profiling import PROFILER, stage, count_rows
+
+# Пример описания задания (JSON):
+# {
+#   "inputs": ["data/*.csv"],
+#   "output_dir": "results",
+#   "workers": 4,
+#   "load": {"mode": "memory", "chunksize": 100000, "optimize": true},
+#   "lazy": true,
+#   "cleaning": [{"step": "remove_duplicates"},
+#                {"step": "fill_missing_values", "strategy": "median", "group_by": ["Pclass", "Sex"]},
+#                {"step": "remove_outliers", "threshold": 3, "method": "zscore"}],
+#   "stats": {"basic": true, "correlation": true, "approx": false,
+#             "method": "pearson", "top_pairs": 50, "group_by": ["Pclass"]},
+#   "plot_format": "png",
+#   "plots": [{"type": "histogram", "column": "Age"},
+#             {"type": "scatter", "x": "Age", "y": "Fare"}],
+#   "models": [{"target": "Fare", "features": ["Age", "Pclass"], "model": "forest"}],
+#   "profile": {"memory": false, "cprofile": false}
+#   (модель "sgd" обучается по частям - для файлов больше памяти; "hist" по частям
+#    только готовит коды корзин, бустинг обучается в памяти на выборке до 5 млн строк)
+# }
+
+PLOT_TYPES = ("histogram", "density", "boxplot", "boxplot_mean_std", "violin", "scatter")
+PLOT_FORMATS = ("png", "svg")
+MODEL_TYPES = ("linear", "tree", "forest") + tuple(INCREMENTAL_NAMES)
+
+
+def load_job(path):
+    """Читает и проверяет описание задания из JSON файла."""
+    with open(path, encoding="utf-8") as f:
+        spec = json.load(f)
+    validate_job(spec)
+    return spec
+
+
+def validate_job(spec):
+    """Проверяет задание до запуска, чтобы не упасть посреди ночного прогона."""
+    if not spec.get("inputs"):
+        raise ValueError("В задании нет входных файлов (inputs).")
+    for step in spec.get("cleaning", []):
+        if step.get("step") not in STEP_LABELS:
+            raise ValueError(f"Неизвестный шаг очистки: {step.get('step')}")
+    for plot in spec.get("plots", []):
+        if plot.get("type") not in PLOT_TYPES:
+            raise ValueError(f"Неизвестный тип графика: {plot.get('type')}")
+    if spec.get("plot_format", "png") not in PLOT_FORMATS:
+        raise ValueError(f"Неизвестный формат графиков: {spec.get('plot_format')}")
+    if spec.get("stats", {}).get("method", "pearson") not in CORR_METHODS:
+        raise ValueError(f"Неизвестный метод корреляции: {spec['stats']['method']}")
+    for model in spec.get("models", []):
+        if model.get("model", "linear") not in MODEL_TYPES:
+            raise ValueError(f"Неизвестная модель: {model.get('model')}")
+        if not model.get("target") or not model.get("features"):
+            raise ValueError("Для модели нужны target и features.")
+
+
+def expand_inputs(patterns):
+    """Раскрывает шаблоны путей (glob) в отсортированный список файлов без повторов."""
+    paths = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) or ([pattern] if os.path.exists(pattern) else [])
+        for path in matches:
+            if path not in paths:
+                paths.append(path)
+    return paths
+
+
+def run_job(spec):
+    """Выполняет задание для всех входных файлов параллельно в пуле процессов.
+
+    Результаты каждого файла пишутся в свою папку output_dir/<путь файла>/
+    (см. _file_output_dirs), общая сводка - в output_dir/summary.json. Ошибка в одном файле не
+    останавливает обработку остальных.
+    """
+    validate_job(spec)
+    output_dir = spec.get("output_dir", "results")
+    os.makedirs(output_dir, exist_ok=True)
+    paths = expand_inputs(spec["inputs"])
+    if not paths:
+        raise ValueError("Ни один входной файл не найден.")
+
+    out_dirs = _file_output_dirs(paths, output_dir)
+    workers = spec.get("workers") or min(len(paths), os.cpu_count() or 1)
+    start = time.perf_counter()
+    if workers <= 1 or len(paths) == 1:
+        results = [process_file(path, spec, out_dir) for path, out_dir in zip(paths, out_dirs)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(process_file, paths, [spec] * len(paths), out_dirs))
+
+    summary = {
+        "job_seconds": time.perf_counter() - start,
+        "workers": workers,
+        "files": results,
+    }
+    with open(os.path.join(output_dir, "summary.json"), "w", encoding="utf-8") as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2, default=str)
+    return summary
+
+
+def _file_output_dirs(paths, output_dir):
+    """Папка результатов для каждого файла - своя, даже если имена файлов совпадают.
+
+    Путь берется относительно общей папки всех входных файлов без
+    расширения: drops/a/data.csv и drops/b/data.csv -> output_dir/a/data и
+    output_dir/b/data; файлы из одной папки - output_dir/<имя файла>.
+    Если имена все равно совпали (data.csv и data.tsv), добавляется номер.
+    """
+    full = [os.path.abspath(path) for path in paths]
+    try:
+        common = os.path.commonpath([os.path.dirname(path) for path in full])
+    except ValueError:
+        # Файлы на разных дисках: общей папки нет
+        common = None
+    dirs, seen = [], set()
+    for path in full:
+        name = os.path.relpath(path, common) if common else os.path.basename(path)
+        name = os.path.splitext(name)[0]
+        if os.path.normcase(name) in seen:
+            name = f"{name}_{len(dirs)}"
+        seen.add(os.path.normcase(name))
+        dirs.append(os.path.join(output_dir, name))
+    return dirs
+
+
+def process_file(path, spec, out_dir=None):
+    """Полный прогон одного файла: загрузка, очистка, статистика, графики, модели.
+
+    out_dir - папка результатов (по умолчанию output_dir/<имя файла>).
+    """
+    # В рабочих процессах нет экрана: рисуем только в файлы
+    matplotlib.use("Agg")
+    if out_dir is None:
+        out_dir = _file_output_dirs([path], spec.get("output_dir", "results"))[0]
+    os.makedirs(out_dir, exist_ok=True)
+    result = {"input": path, "output_dir": out_dir, "status": "ok", "outputs": []}
+    start = time.perf_counter()
+    log = io.StringIO()
+    # Журнал этапов - свой для каждого файла (в пуле процессы переиспользуются)
+    profile = spec.get("profile", {})
+    PROFILER.clear()
+    PROFILER.trace_memory = profile.get("memory", False)
+    PROFILER.profile = profile.get("cprofile", False)
+    try:
+        with contextlib.redirect_stdout(log):
+            _process(path, spec, out_dir, result)
+    except Exception as e:
+        result["status"] = "error"
+        result["error"] = f"{type(e).__name__}: {e}"
+        log.write(traceback.format_exc())
+    result["seconds"] = time.perf_counter() - start
+    _write_profile(out_dir, result)
+    with open(os.path.join(out_dir, "run.log"), "w", encoding="utf-8") as f:
+        f.write(log.getvalue())
+    return result
+
+
+def _process(path, spec, out_dir, result):
+    load = spec.get("load", {})
+    with stage("batch.load") as record:
+        if load.get("mode") == "stream":
+            df = ChunkedCSV(path, chunksize=load.get("chunksize", DEFAULT_CHUNKSIZE))
+        else:
+            df = pd.read_csv(path)
+            if load.get("optimize", True):
+                df, report = optimize_dtypes(df)
+                _write_lines(os.path.join(out_dir, "memory.txt"), memory_report(report), result)
+        record['rows_out'] = count_rows(df)
+
+    steps = spec.get("cleaning", [])
+    if steps:
+        cleaner = DataCleaner(df, lazy=spec.get("lazy", True))
+        for step in steps:
+            params = {k: v for k, v in step.items() if k != "step"}
+            getattr(cleaner, step["step"])(**params)
+        df = cleaner.collect()
+        _write_lines(os.path.join(out_dir, "cleaning.txt"), cleaner.history, result)
+
+    stats = spec.get("stats", {})
+    if stats:
+        stats_module = DataStats(df, approx=stats.get("approx"))
+        if stats.get("basic", True):
+            _write_table(stats_module.get_basic_stats(), os.path.join(out_dir, "stats_basic.csv"), result)
+        method = stats.get("method", "pearson")
+        if stats.get("correlation"):
+            _write_table(stats_module.get_correlation(method),
+                         os.path.join(out_dir, "correlation.csv"), result)
+        group_by = stats.get("group_by")
+        if group_by:
+            # Файлы уже обрабатываются в пуле процессов - группы одного файла считаем в одном
+            _write_table(stats_module.get_basic_stats(group_by=group_by, workers=1),
+                         os.path.join(out_dir, "stats_by_group.csv"), result)
+            if stats.get("correlation"):
+                _write_table(stats_module.get_correlation(method, group_by=group_by, workers=1),
+                             os.path.join(out_dir, "correlation_by_group.csv"), result)
+        if stats.get("top_pairs"):
+            # Для широких таблиц: только самые коррелированные пары, без полной матрицы
+            pairs = stats_module.get_correlated_pairs(k=stats["top_pairs"], method=method)
+            _write_table(pairs, os.path.join(out_dir, "correlated_pairs.csv"), result)
+
+    plots = spec.get("plots", [])
+    if plots:
+        # Файлы уже обрабатываются в пуле процессов - графики одного файла рисуем по очереди
+        saved = render_batch(df, plots, os.path.join(out_dir, "plots"),
+                             fmt=spec.get("plot_format", "png"), workers=spec.get("plot_workers", 1))
+        result["outputs"].extend(path for path in saved if path)
+
+    models = spec.get("models", [])
+    if models:
+        models_dir = os.path.join(out_dir, "models")
+        os.makedirs(models_dir, exist_ok=True)
+        predictor = DataPredictor(df)
+        metrics = []
+        for i, model_spec in enumerate(models):
+            model_type = model_spec.get("model", "linear")
+            name = f"{i}_{model_spec['target']}_{model_type}"
+            save_path = os.path.join(models_dir, f"{name}.png")
+            if model_type in INCREMENTAL_NAMES:
+                fitted = predictor.fit_incremental(model_spec["target"], model_spec["features"],
+                                                   model_type, save_path=save_path)
+            else:
+                fitted = predictor.predict(model_spec["target"], model_spec["features"], model_type,
+                                           save_path=save_path)
+            if fitted is None:
+                metrics.append({"name": name, "status": "error"})
+                continue
+            model_path = os.path.join(models_dir, f"{name}.joblib")
+            joblib.dump(fitted["model"], model_path)
+            result["outputs"].append(model_path)
+            metrics.append({k: v for k, v in fitted.items() if k != "model"} | {"name": name})
+        with open(os.path.join(models_dir, "metrics.json"), "w", encoding="utf-8") as f:
+            json.dump(metrics, f, ensure_ascii=False, indent=2)
+        result["outputs"].append(os.path.join(models_dir, "metrics.json"))
+
+    result["rows"] = None if is_stream(df) else len(df)
+
+
+def _write_profile(out_dir, result):
+    """Этапы обработки файла: profile.jsonl, trace.json и, если включен cProfile, slowest.prof."""
+    if not PROFILER.records:
+        return
+    result["outputs"].append(PROFILER.to_jsonl(os.path.join(out_dir, "profile.jsonl")))
+    result["outputs"].append(PROFILER.to_chrome_trace(os.path.join(out_dir, "trace.json")))
+    slowest = PROFILER.dump_slowest(os.path.join(out_dir, "slowest.prof"))
+    if slowest is not None:
+        name, text = slowest
+        result["outputs"].append(os.path.join(out_dir, "slowest.prof"))
+        _write_lines(os.path.join(out_dir, "slowest.txt"), [f"Самый медленный этап: {name}", text], result)
+    result["slowest_stage"] = max(PROFILER.records, key=lambda r: r['wall'])['name']
+
+
+def _write_table(table, path, result):
+    if isinstance(table, str):
+        # Модули статистики возвращают строку, если считать нечего
+        _write_lines(path.replace(".csv", ".txt"), [table], result)
+        return
+    table.to_csv(path)
+    result["outputs"].append(path)
+
+
+def _write_lines(path, lines, result):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    result["outputs"].append(path)
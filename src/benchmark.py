@@ -0,0 +1,281 @@
+import os
+import io
+import gc
+import json
+import time
+import platform
+import tempfile
+import tracemalloc
+import contextlib
+import matplotlib
+import numpy as np
+import pandas as pd
+from .loader import ChunkedCSV
+from .cache import DatasetCache
+from .cleaner import DataCleaner
+from .statistics import DataStats
+from .visualizer import DataVisualizer
+from .machine_learning import DataPredictor
+from .memory import optimize_dtypes
+
+# Размеры таблиц (в строках) по умолчанию
+BENCH_SIZES = (10_000, 100_000)
+# Типы колонок синтетической таблицы (повторяются по кругу)
+BENCH_DTYPES = ("float", "int", "category", "text", "numtext")
+BENCH_GROUPS = ("load", "clean", "stats", "plot", "ml")
+# Допустимое замедление относительно базы (0.25 - на 25%)
+TOLERANCE = 0.25
+# Разница во времени меньше этой считается шумом, а не регрессией
+MIN_SECONDS = 0.005
+CATEGORIES = np.array(["alpha", "beta", "gamma", "delta", "epsilon", "zeta", "eta", "theta"], dtype=object)
+
+
+def make_dataset(rows, columns=8, dtypes=BENCH_DTYPES, missing_rate=0.05, duplicate_rate=0.01, seed=0):
+    """Синтетическая таблица для замеров (одинаковая при одинаковом seed).
+
+    Колонки типов dtypes идут по кругу: float - нормальные числа, int -
+    целые, category - несколько повторяющихся строк, text - почти
+    уникальные строки, numtext - числа, записанные текстом (для
+    convert_to_numeric). Плюс колонка target - линейная комбинация
+    числовых колонок с шумом (для моделей). missing_rate - доля пропусков
+    в каждой колонке, duplicate_rate - доля строк, замененных копиями
+    других строк.
+    """
+    rng = np.random.default_rng(seed)
+    data = {}
+    for i in range(columns):
+        kind = dtypes[i % len(dtypes)]
+        name = f"{kind}_{i}"
+        if kind == "float":
+            data[name] = rng.normal(50, 15, rows)
+        elif kind == "int":
+            data[name] = rng.integers(0, 1000, rows)
+        elif kind == "category":
+            data[name] = CATEGORIES[rng.integers(0, len(CATEGORIES), rows)]
+        elif kind == "text":
+            data[name] = np.char.add("id_", rng.integers(0, 10 * rows, rows).astype(str)).astype(object)
+        elif kind == "numtext":
+            data[name] = np.round(rng.exponential(100, rows), 2).astype(str).astype(object)
+        else:
+            raise ValueError(f"Неизвестный тип колонки: {kind}")
+    df = pd.DataFrame(data)
+    numeric = df.select_dtypes(include=['number']).to_numpy(dtype='float64')
+    weights = rng.normal(size=numeric.shape[1])
+    df['target'] = numeric @ weights + rng.normal(0, 5, rows)
+
+    for col in df.columns:
+        if col != 'target' and missing_rate > 0:
+            df.loc[rng.random(rows) < missing_rate, col] = np.nan
+    if duplicate_rate > 0 and rows > 1:
+        # Часть строк заменяется копиями случайных строк (вместе с пропусками)
+        order = np.arange(rows)
+        copies = rng.choice(rows, int(rows * duplicate_rate), replace=False)
+        order[copies] = rng.integers(0, rows, len(copies))
+        df = df.iloc[order].reset_index(drop=True)
+    return df
+
+
+def scaled_titanic(rows, path="titanic.csv", seed=0):
+    """titanic.csv, увеличенный до rows строк: выборка с возвратом и небольшой шум в Age/Fare."""
+    rng = np.random.default_rng(seed)
+    base = pd.read_csv(path)
+    df = base.iloc[rng.integers(0, len(base), rows)].reset_index(drop=True)
+    for col in ("Age", "Fare"):
+        if col in df.columns:
+            df[col] = (df[col] * rng.normal(1, 0.05, rows)).round(2)
+    if "PassengerId" in df.columns:
+        df["PassengerId"] = np.arange(1, rows + 1)
+    return df
+
+
+def _roles(df):
+    """Колонки для замеров: цель и признаки модели, две числовые колонки, колонка групп."""
+    numeric = list(df.select_dtypes(include=['number']).columns)
+    target = 'target' if 'target' in df.columns else ('Fare' if 'Fare' in df.columns else numeric[-1])
+    features = [c for c in numeric if c != target and not c.endswith('Id')][:4]
+    text = [c for c in df.columns if c not in numeric]
+    group = next((c for c in text if df[c].nunique() <= 100), None)
+    if group is None and 'Pclass' in df.columns:
+        group = 'Pclass'
+    return {'target': target, 'features': features, 'x': features[0], 'y': target, 'group': group}
+
+
+def _cleaner(ctx, *steps, lazy=False):
+    """Фабрика замера шагов очистки: таблица копируется при подготовке, а не в замере."""
+    def prepare():
+        cleaner = DataCleaner(ctx['df'].copy(), lazy=lazy)
+
+        def run():
+            for step, params in steps:
+                getattr(cleaner, step)(**params)
+            return cleaner.collect() if lazy else cleaner.df
+        return run
+    return prepare
+
+
+def _plot(ctx, method, *columns):
+    def prepare():
+        visualizer = DataVisualizer(ctx['df'], save_dir=os.path.join(ctx['tmp'], 'plots'))
+        return lambda: getattr(visualizer, method)(*columns)
+    return prepare
+
+
+def _once(func):
+    """Фабрика замера без подготовки."""
+    return lambda: func
+
+
+def bench_cases(ctx):
+    """Замеры: [(группа, имя, фабрика)]. Фабрика готовит данные и возвращает функцию для замера."""
+    df, path, tmp, roles = ctx['df'], ctx['path'], ctx['tmp'], ctx['roles']
+    target, features = roles['target'], roles['features']
+    cache = DatasetCache(os.path.join(tmp, 'cache'))
+
+    def cache_roundtrip():
+        cache.save(df, path)
+        return cache.load(path)
+
+    cases = [
+        ("load", "read_csv", _once(lambda: pd.read_csv(path))),
+        ("load", "optimize_dtypes", _once(lambda: optimize_dtypes(df))),
+        ("load", "stream_pass", _once(lambda: sum(len(chunk) for chunk in ChunkedCSV(path)))),
+        ("load", "cache_roundtrip", _once(cache_roundtrip)),
+        ("clean", "remove_duplicates", _cleaner(ctx, ("remove_duplicates", {}))),
+        ("clean", "remove_missing_values", _cleaner(ctx, ("remove_missing_values", {}))),
+        ("clean", "fill_missing_values", _cleaner(ctx, ("fill_missing_values", {}))),
+        ("clean", "convert_to_numeric", _cleaner(ctx, ("convert_to_numeric", {}))),
+        ("clean", "remove_outliers", _cleaner(ctx, ("remove_outliers", {}))),
+        ("clean", "optimize_memory", _cleaner(ctx, ("optimize_memory", {}))),
+        ("clean", "lazy_plan", _cleaner(ctx, ("remove_duplicates", {}), ("fill_missing_values", {}),
+                                        ("remove_outliers", {}), lazy=True)),
+        ("stats", "basic", _once(lambda: DataStats(df).get_basic_stats())),
+        ("stats", "basic_approx", _once(lambda: DataStats(df, approx=True).get_basic_stats())),
+        ("stats", "correlation", _once(lambda: DataStats(df).get_correlation())),
+        ("stats", "correlation_spearman", _once(lambda: DataStats(df).get_correlation("spearman"))),
+        ("stats", "correlated_pairs", _once(lambda: DataStats(df).get_correlated_pairs(k=20))),
+        ("plot", "histogram", _plot(ctx, "plot_histogram", roles['x'])),
+        ("plot", "density", _plot(ctx, "plot_density", roles['x'])),
+        ("plot", "boxplot", _plot(ctx, "plot_boxplot", roles['x'])),
+        ("plot", "scatter", _plot(ctx, "plot_scatter", roles['x'], roles['y'])),
+        ("ml", "predict_linear", _once(lambda: DataPredictor(df).predict(
+            target, features, "linear", save_path=os.path.join(tmp, 'ml.png')))),
+        ("ml", "predict_tree", _once(lambda: DataPredictor(df).predict(
+            target, features, "tree", save_path=os.path.join(tmp, 'ml.png')))),
+        ("ml", "fit_incremental_sgd", _once(lambda: DataPredictor(ChunkedCSV(path)).fit_incremental(
+            target, features, "sgd", save_path=os.path.join(tmp, 'ml.png'), epochs=2))),
+    ]
+    if roles['group']:
+        cases.append(("stats", "basic_by_group", _once(
+            lambda: DataStats(df).get_basic_stats(group_by=roles['group'], workers=1))))
+    return cases
+
+
+def measure(prepare, repeat=3, memory=True):
+    """Время (лучшее и все повторы) и пиковая память одного замера.
+
+    Каждый повтор готовится заново (prepare не входит во время). Память
+    меряется отдельным прогоном под tracemalloc - он замедляет код и
+    исказил бы время.
+    """
+    times = []
+    for _ in range(repeat):
+        run = prepare()
+        gc.collect()
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    peak_mb = None
+    if memory:
+        run = prepare()
+        gc.collect()
+        tracemalloc.start()
+        try:
+            run()
+            peak_mb = tracemalloc.get_traced_memory()[1] / 1024 ** 2
+        finally:
+            tracemalloc.stop()
+    return {'seconds': min(times), 'seconds_all': times, 'peak_mb': peak_mb}
+
+
+def run_benchmarks(sizes=BENCH_SIZES, source="synthetic", groups=BENCH_GROUPS, repeat=3, memory=True,
+                   dataset_options=None, titanic_path="titanic.csv", progress=print):
+    """Прогоняет все замеры групп groups на таблицах каждого размера из sizes.
+
+    source: 'synthetic' (make_dataset с dataset_options) или 'titanic'
+    (увеличенная копия titanic.csv). Возвращает словарь с описанием
+    окружения и списком результатов - его можно сохранить в JSON.
+    """
+    matplotlib.use("Agg")
+    dataset_options = dict(dataset_options or {})
+    results = []
+    for rows in sizes:
+        if source == "titanic":
+            df = scaled_titanic(rows, titanic_path)
+        else:
+            df = make_dataset(rows, **dataset_options)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "data.csv")
+            df.to_csv(path, index=False)
+            ctx = {'df': df, 'path': path, 'tmp': tmp, 'roles': _roles(df)}
+            for group, name, prepare in bench_cases(ctx):
+                if group not in groups:
+                    continue
+                # Методы печатают ход работы - в замерах это лишний шум
+                with contextlib.redirect_stdout(io.StringIO()):
+                    result = measure(prepare, repeat, memory)
+                result.update({'group': group, 'case': name, 'rows': rows})
+                results.append(result)
+                if progress:
+                    peak = f", {result['peak_mb']:.1f} МБ" if result['peak_mb'] is not None else ""
+                    progress(f"[Замер] {group}.{name} @ {rows}: {result['seconds']:.4f} с{peak}")
+    return {
+        'meta': {
+            'source': source,
+            'dataset': dataset_options,
+            'repeat': repeat,
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'date': time.strftime("%Y-%m-%d %H:%M:%S"),
+        },
+        'results': results,
+    }
+
+
+def save_results(results, path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+def load_results(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def compare_results(current, baseline, tolerance=TOLERANCE, min_seconds=MIN_SECONDS):
+    """Сравнение с базой: таблица по замерам и статус каждого.
+
+    'регрессия' - время или пиковая память выросли больше чем на
+    tolerance (а по времени еще и больше чем на min_seconds), 'ускорение'
+    - время упало на столько же, 'нет в базе' - новый замер.
+    """
+    base = {(r['group'], r['case'], r['rows']): r for r in baseline['results']}
+    rows = []
+    for r in current['results']:
+        b = base.get((r['group'], r['case'], r['rows']))
+        row = {'Замер': f"{r['group']}.{r['case']}", 'Строк': r['rows'],
+               'Время, с': r['seconds'], 'База, с': None, 'Отношение': None,
+               'Память, МБ': r['peak_mb'], 'База, МБ': None, 'Статус': 'нет в базе'}
+        if b is not None:
+            ratio = r['seconds'] / b['seconds'] if b['seconds'] > 0 else 1.0
+            slower = ratio > 1 + tolerance and r['seconds'] - b['seconds'] > min_seconds
+            faster = ratio < 1 / (1 + tolerance) and b['seconds'] - r['seconds'] > min_seconds
+            more_memory = (r['peak_mb'] is not None and b['peak_mb'] is not None
+                           and r['peak_mb'] > b['peak_mb'] * (1 + tolerance) and r['peak_mb'] - b['peak_mb'] > 1)
+            row.update({'База, с': b['seconds'], 'Отношение': ratio, 'База, МБ': b['peak_mb'],
+                        'Статус': 'регрессия' if slower or more_memory else ('ускорение' if faster else 'ок')})
+        rows.append(row)
+    return pd.DataFrame(rows)
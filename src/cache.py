@@ -0,0 +1,219 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+    HAS_ARROW = True
+except ImportError:
+    HAS_ARROW = False
+
+# Папка кэша по умолчанию (рядом с местом запуска программы)
+CACHE_DIR = ".cache"
+# Сколько байт из начала, середины и конца файла попадает в быстрый хэш
+HASH_BLOCK = 1024 * 1024
+
+
+def file_fingerprint(path, full_hash=False):
+    """Отпечаток исходного файла: размер, время изменения и хэш содержимого.
+
+    По умолчанию хэшируются только три блока (начало, середина, конец) -
+    этого хватает, чтобы заметить перезапись файла, и это не требует
+    чтения всех гигабайт. full_hash=True хэширует файл целиком.
+    """
+    stat = os.stat(path)
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        if full_hash or stat.st_size <= 3 * HASH_BLOCK:
+            for block in iter(lambda: f.read(HASH_BLOCK), b""):
+                digest.update(block)
+        else:
+            for offset in (0, stat.st_size // 2, stat.st_size - HASH_BLOCK):
+                f.seek(offset)
+                digest.update(f.read(HASH_BLOCK))
+    return {
+        "path": os.path.abspath(path),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "hash": digest.hexdigest(),
+    }
+
+
+def recipe_to_json(recipe):
+    """Рецепт очистки (список шагов с параметрами) в виде JSON-совместимого списка."""
+    return [[name, dict(sorted(params.items()))] for name, params in (recipe or [])]
+
+
+class DatasetCache:
+    """Кэш разобранных (и, при желании, очищенных) таблиц на диске.
+
+    Ключ записи - отпечаток исходного CSV плюс рецепт очистки, поэтому при
+    изменении файла или шагов очистки запись просто перестает находиться.
+    Формат 'npy': каждая колонка - отдельный .npy файл, который при загрузке
+    отображается в память (memory-map), так что таблица открывается без
+    разбора и без копирования чисел. Формат 'feather' доступен, если
+    установлен pyarrow.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, fmt="npy", full_hash=False):
+        if fmt == "feather" and not HAS_ARROW:
+            raise ImportError("Для формата feather нужен пакет pyarrow.")
+        self.cache_dir = cache_dir
+        self.fmt = fmt
+        self.full_hash = full_hash
+
+    def _key(self, fingerprint, recipe):
+        payload = json.dumps({"source": fingerprint, "recipe": recipe_to_json(recipe)},
+                             sort_keys=True, ensure_ascii=False)
+        return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+    def _entries(self):
+        if not os.path.isdir(self.cache_dir):
+            return
+        for name in os.listdir(self.cache_dir):
+            meta_path = os.path.join(self.cache_dir, name, "meta.json")
+            if os.path.exists(meta_path):
+                with open(meta_path, encoding="utf-8") as f:
+                    yield name, json.load(f)
+
+    def load(self, path, recipe=None):
+        """Таблица из кэша или None, если подходящей записи нет."""
+        fingerprint = file_fingerprint(path, self.full_hash)
+        entry = os.path.join(self.cache_dir, self._key(fingerprint, recipe))
+        meta_path = os.path.join(entry, "meta.json")
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta["format"] == "feather":
+            return pd.read_feather(os.path.join(entry, "data.feather"), memory_map=True)
+        return _read_npy(entry, meta)
+
+    def save(self, df, path, recipe=None):
+        """Сохраняет таблицу; устаревшие записи этого же файла удаляются."""
+        fingerprint = file_fingerprint(path, self.full_hash)
+        key = self._key(fingerprint, recipe)
+        self.prune(path, fingerprint)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Пишем во временную папку и переименовываем, чтобы не оставить полузаписанный кэш
+        tmp = os.path.join(self.cache_dir, f".tmp-{key}-{os.getpid()}")
+        shutil.rmtree(tmp, ignore_errors=True)
+        os.makedirs(tmp)
+        meta = {
+            "format": self.fmt,
+            "source": fingerprint,
+            "recipe": recipe_to_json(recipe),
+            "shape": list(df.shape),
+            "created": time.time(),
+        }
+        if self.fmt == "feather":
+            df.reset_index(drop=isinstance(df.index, pd.RangeIndex)).to_feather(
+                os.path.join(tmp, "data.feather"))
+        else:
+            meta.update(_write_npy(df, tmp))
+        with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        target = os.path.join(self.cache_dir, key)
+        shutil.rmtree(target, ignore_errors=True)
+        os.replace(tmp, target)
+        return target
+
+    def cleaned_recipes(self, path):
+        """Рецепты очищенных версий этого файла, которые уже лежат в кэше."""
+        fingerprint = file_fingerprint(path, self.full_hash)
+        recipes = []
+        for _, meta in self._entries():
+            if meta["source"] == fingerprint and meta["recipe"]:
+                recipes.append([(name, params) for name, params in meta["recipe"]])
+        return recipes
+
+    def prune(self, path, fingerprint=None):
+        """Удаляет записи этого файла, сделанные по его старой версии."""
+        fingerprint = fingerprint or file_fingerprint(path, self.full_hash)
+        removed = 0
+        for name, meta in list(self._entries()):
+            if meta["source"]["path"] == fingerprint["path"] and meta["source"] != fingerprint:
+                shutil.rmtree(os.path.join(self.cache_dir, name), ignore_errors=True)
+                removed += 1
+        return removed
+
+
+def _write_npy(df, folder):
+    """Каждая колонка - отдельный .npy; строки хранятся кодами + словарем значений."""
+    columns = []
+    for i, col in enumerate(df.columns):
+        columns.append(_write_column(df[col], os.path.join(folder, f"c{i}")))
+    if isinstance(df.index, pd.RangeIndex):
+        index = {"kind": "range", "start": df.index.start, "stop": df.index.stop,
+                 "step": df.index.step}
+    else:
+        index = _write_column(pd.Series(df.index), os.path.join(folder, "index"))
+    # Имена колонок как есть (числа, кортежи): в meta.json они только для чтения человеком
+    pd.to_pickle(df.columns, os.path.join(folder, "columns.pkl"))
+    return {"columns": [str(c) for c in df.columns], "column_meta": columns, "index": index}
+
+
+def _write_column(series, prefix):
+    dtype = series.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        np.save(prefix + ".codes.npy", series.cat.codes.to_numpy())
+        np.save(prefix + ".values.npy", series.cat.categories.to_numpy(), allow_pickle=True)
+        return {"kind": "category", "dtype": str(dtype), "ordered": bool(dtype.ordered)}
+    if isinstance(dtype, np.dtype) and dtype.kind in "biufcmM":
+        np.save(prefix + ".npy", series.to_numpy())
+        return {"kind": "numpy", "dtype": str(dtype)}
+    if isinstance(dtype, pd.api.extensions.ExtensionDtype) and hasattr(series.array, "_mask"):
+        # Nullable типы (Int64, boolean, Float64): значения + маска пропусков
+        np.save(prefix + ".npy", series.to_numpy(dtype=dtype.numpy_dtype, na_value=0))
+        np.save(prefix + ".mask.npy", series.isna().to_numpy())
+        return {"kind": "masked", "dtype": str(dtype)}
+    # Строки и прочие объекты: коды + словарь уникальных значений
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    np.save(prefix + ".codes.npy", codes)
+    np.save(prefix + ".values.npy", np.asarray(uniques, dtype=object), allow_pickle=True)
+    return {"kind": "factorized", "dtype": str(dtype)}
+
+
+def _read_npy(folder, meta):
+    labels_path = os.path.join(folder, "columns.pkl")
+    labels = pd.read_pickle(labels_path) if os.path.exists(labels_path) else pd.Index(meta["columns"])
+    # По номерам колонок, а не по именам: одинаковые имена не сливаются
+    data = {i: _read_column(os.path.join(folder, f"c{i}"), col_meta)
+            for i, col_meta in enumerate(meta["column_meta"])}
+    index_meta = meta["index"]
+    if index_meta.get("kind") == "range":
+        index = pd.RangeIndex(index_meta["start"], index_meta["stop"], index_meta["step"])
+    else:
+        index = pd.Index(_read_column(os.path.join(folder, "index"), index_meta))
+    # copy=False: колонки остаются отображенными в память, без копирования
+    df = pd.DataFrame(data, index=index, copy=False)
+    df.columns = labels
+    return df
+
+
+def _read_column(prefix, meta):
+    kind = meta["kind"]
+    if kind == "numpy":
+        # mmap_mode='c' - копирование при записи: изменения не попадут в файл кэша
+        return np.load(prefix + ".npy", mmap_mode="c")
+    if kind == "masked":
+        values = np.load(prefix + ".npy", mmap_mode="c")
+        mask = np.load(prefix + ".mask.npy", mmap_mode="c")
+        dtype = pd.api.types.pandas_dtype(meta["dtype"])
+        return dtype.construct_array_type()(values, mask)
+    codes = np.load(prefix + ".codes.npy", mmap_mode="c")
+    values = np.load(prefix + ".values.npy", allow_pickle=True)
+    if kind == "category":
+        dtype = pd.CategoricalDtype(values, ordered=meta["ordered"])
+        return pd.Categorical.from_codes(codes, dtype=dtype)
+    result = np.empty(len(codes), dtype=object)
+    result[:] = np.nan
+    present = codes >= 0
+    result[present] = values[codes[present]]
+    if meta["dtype"] != "object":
+        return pd.array(result, dtype=meta["dtype"])
+    return result
@@ -1,16 +1,175 @@
 import pandas as pd
 import numpy as np
+import time
 import warnings
+import functools
+import inspect
+from .loader import is_stream
+from .statistics import DataStats
+from .moments import MomentAccumulator
+from .pipeline import CleaningPlan, STEP_LABELS
+from .snapshots import SnapshotStore, DEFAULT_BUDGET_MB
+from .transforms import (OUTLIER_LABELS, CONVERSIONS, convert_columns, conversion_message,
+                         infer_conversion, outlier_reference, outlier_reference_from_sketches,
+                         outlier_keep_mask, duplicated_rows, StreamDeduplicator,
+                         text_columns)
+from .memory import optimize_dtypes, memory_report
+from .imputation import Imputer, imputation_report
+from .profiling import instrument
+
+
+def undoable(kind=None):
+    """Декоратор шага очистки: после шага состояние запоминается для отмены.
+
+    kind подсказывает, что делает шаг ('rows' - только удаляет строки,
+    'columns' - только меняет колонки), чтобы не сравнивать лишнее.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if self.lazy:
+                return method(self, *args, **kwargs)
+            result = method(self, *args, **kwargs)
+            bound = inspect.signature(method).bind(self, *args, **kwargs)
+            bound.apply_defaults()
+            params = {k: v for k, v in bound.arguments.items() if k != "self"}
+            self._commit(STEP_LABELS[method.__name__], kind, [(method.__name__, params)])
+            return result
+        return wrapper
+    return decorator
+
 
 class DataCleaner:
-    def __init__(self, df):
+    def __init__(self, df, lazy=False, snapshot_budget_mb=DEFAULT_BUDGET_MB,
+                 workers=None, use_processes=False, recipe=None):
         self.df = df
         self.history = []
+        # Пул для преобразования типов: число потоков/процессов (None - по числу ядер)
+        self.convert_options = {'max_workers': workers, 'use_processes': use_processes}
+        # В ленивом режиме шаги только записываются в план и выполняются в collect()
+        self.lazy = lazy
+        self.plan = CleaningPlan()
+        # Снимки для отмены/повтора (без глубоких копий таблицы)
+        # recipe - шаги, уже примененные к df (например, если он взят из кэша очищенным)
+        self.snapshots = SnapshotStore(df, snapshot_budget_mb, recipe or ())
+        # Версия данных: растет при каждом изменении таблицы (шаг, отмена, повтор, возврат)
+        self.version = 0
+        # Значения последнего заполнения пропусков (можно сохранить и применить к новым данным)
+        self.imputer = None
+
+    @property
+    def column_versions(self):
+        """Версии колонок текущей таблицы - ключ кэша статистики (StatsCache).
+
+        Шаг, который поменял одну колонку, меняет только ее версию; отмена
+        возвращает прежние версии, и посчитанная раньше статистика снова
+        берется из кэша.
+        """
+        return dict(self.snapshots.current.versions)
+
+    @property
+    def recipe(self):
+        """Шаги очистки, которые привели к текущей таблице: [(имя, параметры), ...]."""
+        return list(self.snapshots.current.recipe)
+
+    def _commit(self, label, kind=None, steps=()):
+        evicted = self.snapshots.commit(self.df, label, kind, steps)
+        self.version += 1
+        if evicted:
+            self._log(f"[Снимки] Вытеснено старых снимков (бюджет памяти): {evicted}")
+
+    def undo(self):
+        """Отменяет последний шаг очистки."""
+        df, label = self.snapshots.undo()
+        if df is None:
+            print("Нечего отменять.")
+            return self.df
+        self.df = df
+        self.version += 1
+        self._log(f"[Отмена] Отменен шаг: {label}")
+        return self.df
+
+    def redo(self):
+        """Повторяет последний отмененный шаг."""
+        df, label = self.snapshots.redo()
+        if df is None:
+            print("Нечего повторять.")
+            return self.df
+        self.df = df
+        self.version += 1
+        self._log(f"[Повтор] Повторен шаг: {label}")
+        return self.df
+
+    def checkpoint(self, name):
+        """Запоминает текущее состояние под именем name."""
+        evicted = self.snapshots.checkpoint(name)
+        self._log(f"[Снимки] Сохранена контрольная точка '{name}'")
+        if evicted:
+            self._log(f"[Снимки] Вытеснено старых снимков (бюджет памяти): {evicted}")
+        return self.df
 
-    def remove_duplicates(self):
-        """Удаляет полные дубликаты строк."""
+    def restore(self, name):
+        """Возвращается к контрольной точке name."""
+        df = self.snapshots.restore(name)
+        if df is None:
+            print(f"Контрольная точка '{name}' не найдена.")
+            return self.df
+        self.df = df
+        self.version += 1
+        self._log(f"[Снимки] Возврат к контрольной точке '{name}'")
+        return self.df
+
+    def _record(self, name, **params):
+        self.plan.add(name, **params)
+        print(f"[План] Добавлен шаг: {STEP_LABELS[name]}")
+        return self.df
+
+    @instrument(skip_lazy=False)
+    def collect(self):
+        """Выполняет накопленный план, сливая совместимые шаги в общие проходы."""
+        if not len(self.plan):
+            return self.df
+        plan, self.plan = self.plan, CleaningPlan()
+        if is_stream(self.df):
+            # Каждый шаг ниже сам запоминается для отмены
+            # Поток и так ленивый: шаги просто добавляются к чтению чанков
+            self.lazy = False
+            try:
+                for name, params in plan.steps:
+                    getattr(self, name)(**params)
+            finally:
+                self.lazy = True
+        else:
+            self.df = plan.execute(self.df, self._log, **self.convert_options)
+            self._commit("выполнение плана", steps=plan.steps)
+        return self.df
+
+    def print_plan(self):
+        print("\n--- План очистки ---")
+        print(self.plan.describe())
+
+    def _log(self, msg):
+        print(msg)
+        self.history.append(msg)
+
+    @instrument()
+    @undoable("rows")
+    def remove_duplicates(self, subset=None, hashed=True):
+        """Удаляет дубликаты строк.
+
+        subset - ключевые колонки (по умолчанию строки сравниваются целиком).
+        hashed=True - сравнение по хэшам строк вместо построения огромных
+        промежуточных массивов по всем колонкам (результат тот же).
+        """
+        if self.lazy:
+            return self._record("remove_duplicates", subset=subset, hashed=hashed)
+        if is_stream(self.df):
+            # Хэши строк копятся между чанками: повторы на границах чанков тоже удаляются
+            self.df = self.df.pipe(StreamDeduplicator(subset))
+            self._log("[Очистка] Дубликаты будут удаляться при чтении (по хэшам строк всего файла)")
+            return self.df
         before = len(self.df)
-        self.df = self.df.drop_duplicates()
+        self.df = self.df[~duplicated_rows(self.df, subset, hashed)]
         after = len(self.df)
         count = before - after
         msg = f"[Очистка] Удалено дубликатов: {count}"
@@ -18,8 +177,16 @@ class DataCleaner:
         self.history.append(msg)
         return self.df
 
+    @instrument()
+    @undoable("rows")
     def remove_missing_values(self):
         """Удаляет строки, где есть хотя бы одно пустое значение (NaN)."""
+        if self.lazy:
+            return self._record("remove_missing_values")
+        if is_stream(self.df):
+            self.df = self.df.pipe(lambda chunk: chunk.dropna())
+            self._log("[Очистка] Строки с пустыми значениями будут удаляться при чтении")
+            return self.df
         before = len(self.df)
         self.df = self.df.dropna()
         after = len(self.df)
@@ -29,72 +196,244 @@ class DataCleaner:
         self.history.append(msg)
         return self.df
 
-    def fill_missing_values(self):
-        """Заполняет пустые числа средним значением (альтернатива удалению)."""
-        numeric_cols = self.df.select_dtypes(include=['number']).columns
-        for col in numeric_cols:
-            if self.df[col].isnull().sum() > 0:
-                mean_val = self.df[col].mean()
-                self.df[col] = self.df[col].fillna(mean_val)
-                msg = f"[Очистка] В колонке '{col}' пропуски заменены на {mean_val:.2f}"
-                print(msg)
-                self.history.append(msg)
+    @instrument()
+    @undoable("columns")
+    def fill_missing_values(self, strategy="mean", group_by=None, fitted=None):
+        """Заполняет пропуски (альтернатива удалению).
+
+        strategy: 'mean' - среднее, 'median' - медиана, 'mode' - мода (и для текста).
+        group_by - считать значение внутри групп (например, Age по Pclass и Sex).
+        fitted - путь к сохраненному Imputer: его значения применяются без пересчета.
+        """
+        if self.lazy:
+            return self._record("fill_missing_values", strategy=strategy, group_by=group_by,
+                                fitted=fitted)
+        if is_stream(self.df):
+            return self._stream_fill_missing_values(strategy, group_by, fitted)
+        imputer = Imputer.load(fitted) if fitted else Imputer.from_data(self.df, strategy, group_by)
+        self.df, report = imputer.transform(self.df)
+        self.imputer = imputer
+        for line in imputation_report(imputer, report):
+            self._log(line)
         return self.df
 
+    @instrument()
+    @undoable("columns")
     def convert_to_numeric(self):
         """Пытается превратить строки в числа (исправление форматирования)."""
-        for col in self.df.select_dtypes(include=['object']).columns:
-            try:
-                converted = pd.to_numeric(self.df[col], errors='coerce')
-                if converted.notna().sum() > 0:
-                    self.df[col] = converted
-                    msg = f"[Очистка] Колонка '{col}' преобразована в числа."
-                    print(msg)
-                    self.history.append(msg)
-            except:
-                pass
-        return self.df
+        if self.lazy:
+            return self._record("convert_to_numeric")
+        return self._convert("numeric")
 
+    @instrument()
+    @undoable("columns")
     def convert_to_datetime(self):
         """Пытается превратить строки в даты."""
-        for col in self.df.select_dtypes(include=['object']).columns:
-            try:
-                with warnings.catch_warnings():
-                    warnings.simplefilter("ignore")
-                    converted = pd.to_datetime(self.df[col], errors='coerce')
-                
-                if converted.notna().mean() > 0.5:
-                    self.df[col] = converted
-                    msg = f"[Очистка] Колонка '{col}' преобразована в даты."
-                    print(msg)
-                    self.history.append(msg)
-            except:
-                pass
+        if self.lazy:
+            return self._record("convert_to_datetime")
+        return self._convert("datetime")
+
+    def _convert(self, kind):
+        """Тип и формат даты выбираются по выборке, колонки преобразуются параллельно."""
+        if is_stream(self.df):
+            return self._stream_convert(kind)
+        columns = text_columns(self.df)
+        if not columns:
+            return self.df
+        start = time.perf_counter()
+        results = convert_columns(self.df, columns, kind, **self.convert_options)
+        converted = 0
+        for result in results:
+            if result['converted'] is not None:
+                if not converted:
+                    # Новая таблица, а не замена на месте: прежняя нужна снимку для отмены
+                    # (поверхностная копия - остальные колонки общие)
+                    self.df = self.df.copy(deep=False)
+                self.df[result['column']] = result['converted']
+                converted += 1
+                msg = conversion_message(result, kind)
+                print(msg)
+                self.history.append(msg)
+        skipped = [r['column'] for r in results if r['converted'] is None]
+        msg = (f"[Типы] Проверено текстовых колонок: {len(columns)}, "
+               f"преобразовано в {CONVERSIONS[kind][1]}: {converted}, "
+               f"время: {time.perf_counter() - start:.2f} с")
+        if skipped:
+            msg += f"; без изменений: {', '.join(map(str, skipped))}"
+        self._log(msg)
         return self.df
 
-    def remove_outliers(self, threshold=3.0):
-        """Удаляет выбросы используя Z-score (порог вводится пользователем)."""
+    @instrument()
+    @undoable("rows")
+    def remove_outliers(self, threshold=3.0, method="zscore", sequential=False):
+        """Удаляет выбросы (порог вводится пользователем).
+
+        method: 'zscore' - |x - среднее| / стд. отклонение,
+                'iqr' - расстояние от ящика [Q1, Q3] в долях IQR,
+                'mad' - модифицированный Z-score по медиане и MAD.
+        По умолчанию все колонки проверяются сразу одной матрицей и строки
+        отбрасываются одной общей маской, поэтому результат не зависит от
+        порядка колонок. sequential=True - старый режим: колонки по очереди,
+        статистика каждой пересчитывается по оставшимся строкам.
+        """
+        if method not in OUTLIER_LABELS:
+            raise ValueError(f"Неизвестный метод поиска выбросов: {method}")
+        if self.lazy:
+            return self._record("remove_outliers", threshold=threshold, method=method,
+                                sequential=sequential)
+        if is_stream(self.df):
+            return self._stream_remove_outliers(threshold, method)
         numeric_cols = self.df.select_dtypes(include=['number']).columns
         if len(numeric_cols) == 0:
             return self.df
         
         before = len(self.df)
-        
-        for col in numeric_cols:
-            mean = self.df[col].mean()
-            std = self.df[col].std()
-            if std == 0:
-                continue
-            z_scores = ((self.df[col] - mean) / std).abs()
-            self.df = self.df[z_scores < threshold]
-            
+
+        if sequential:
+            for col in numeric_cols:
+                x = self.df[[col]].to_numpy(dtype='float64')
+                low, high, scale = outlier_reference(x, method)
+                if not scale[0] > 0:
+                    continue
+                self.df = self.df[outlier_keep_mask(x, method, threshold, low, high, scale)]
+        else:
+            x = self.df[numeric_cols].to_numpy(dtype='float64')
+            low, high, scale = outlier_reference(x, method)
+            valid = scale > 0
+            keep = outlier_keep_mask(x[:, valid], method, threshold,
+                                     low[valid], high[valid], scale[valid])
+            self.df = self.df[keep]
+
         after = len(self.df)
         count = before - after
-        msg = f"[Очистка] Удалено строк с выбросами (Z-score > {threshold}): {count}"
+        msg = f"[Очистка] Удалено строк с выбросами ({OUTLIER_LABELS[method]} > {threshold}): {count}"
         print(msg)
         self.history.append(msg)
         return self.df
 
+    @instrument()
+    @undoable("columns")
+    def optimize_memory(self):
+        """Сжимает типы колонок (int8, float32, category...) и печатает отчет о памяти."""
+        if self.lazy:
+            return self._record("optimize_memory")
+        if is_stream(self.df):
+            self._log("[Память] Поток не хранится в памяти - сжимать нечего")
+            return self.df
+        self.df, report = optimize_dtypes(self.df)
+        for line in memory_report(report):
+            self._log(line)
+        return self.df
+
+    def _stream_moments(self, cols):
+        """Один проход по потоку: среднее, стд. отклонение и число пропусков колонок.
+
+        Моменты чанков объединяются MomentAccumulator (формулы Pébay), без
+        сумм квадратов, которые теряют точность при большом среднем.
+        """
+        acc = MomentAccumulator(cols)
+        rows = 0
+        for chunk in self.df:
+            acc.update(chunk[cols].to_numpy(dtype='float64', na_value=np.nan))
+            rows += len(chunk)
+        mean = pd.Series(acc.get_mean(), index=cols)
+        std = pd.Series(acc.std(), index=cols)
+        missing = pd.Series(rows - acc.n.astype('int64'), index=cols)
+        return mean, std, missing
+
+    def _stream_fill_missing_values(self, strategy="mean", group_by=None, fitted=None):
+        """Сначала считает значения за один проход, затем подставляет их в каждый чанк.
+
+        По потоку считаются среднее и медиана (по скетчу KLL) без групп;
+        для моды и групп нужны сохраненные значения (fitted).
+        """
+        if fitted:
+            imputer = Imputer.load(fitted)
+        elif strategy in ("mean", "median") and not group_by:
+            numeric_cols = self.df.numeric_columns()
+            if not numeric_cols:
+                return self.df
+            if strategy == "mean":
+                values, _, missing = self._stream_moments(numeric_cols)
+            else:
+                sketches = DataStats(self.df).get_quantile_sketches()
+                values = pd.Series({col: sketches[col].quantile(0.5) for col in numeric_cols})
+                # Скетч видит только значения: пропуски = строки файла минус значения
+                rows = self.df.count_rows()
+                missing = pd.Series({col: rows - sketches[col].n for col in numeric_cols})
+            imputer = Imputer(strategy)
+            imputer.values = values[values.notna()].to_dict()
+        else:
+            self._log("[Очистка] В потоковом режиме по файлу считаются только среднее и медиана "
+                      "без групп; для моды и групп используйте сохраненные значения")
+            return self.df
+        self.df = self.df.pipe(lambda chunk: imputer.transform(chunk)[0])
+        self.imputer = imputer
+        for col in imputer.values:
+            if fitted is None and not missing[col]:
+                continue
+            self._log(f"[Очистка] В колонке '{col}' пропуски будут заменены на {imputer.describe(col)}")
+        return self.df
+
+    def _stream_convert(self, kind):
+        """Решение о преобразовании принимается по выборке, применяется ко всем чанкам.
+
+        Так у колонки во всех чанках получается один и тот же тип (и формат даты).
+        """
+        func, label, _ = CONVERSIONS[kind]
+        sample = self.df.sample()
+        formats = {}
+        for col in text_columns(sample):
+            ok, fmt = infer_conversion(sample[col], kind)
+            if ok:
+                formats[col] = fmt
+        if not formats:
+            return self.df
+
+        def convert(chunk):
+            chunk = chunk.copy()
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                for col, fmt in formats.items():
+                    if fmt:
+                        chunk[col] = pd.to_datetime(chunk[col], format=fmt, errors='coerce')
+                    else:
+                        chunk[col] = func(chunk[col], errors='coerce')
+            return chunk
+
+        self.df = self.df.pipe(convert)
+        for col, fmt in formats.items():
+            suffix = f" (формат {fmt})" if fmt else ""
+            self._log(f"[Очистка] Колонка '{col}' будет преобразована в {label}{suffix} при чтении.")
+        return self.df
+
+    def _stream_remove_outliers(self, threshold, method):
+        """Статистика всего файла за один проход, затем одна маска на каждый чанк."""
+        numeric_cols = self.df.numeric_columns()
+        if not numeric_cols:
+            return self.df
+        if method == "zscore":
+            mean, std, _ = self._stream_moments(numeric_cols)
+            low = high = mean.to_numpy()
+            scale = std.to_numpy()
+        else:
+            sketches = DataStats(self.df).get_quantile_sketches()
+            low, high, scale = outlier_reference_from_sketches(
+                [sketches[col] for col in numeric_cols], method)
+        valid = scale > 0
+        cols = [col for col, ok in zip(numeric_cols, valid) if ok]
+        low, high, scale = low[valid], high[valid], scale[valid]
+
+        def drop_outliers(chunk):
+            x = chunk[cols].to_numpy(dtype='float64')
+            # Как и в обычном режиме, строка с NaN в числовой колонке тоже отбрасывается
+            return chunk[outlier_keep_mask(x, method, threshold, low, high, scale)]
+
+        self.df = self.df.pipe(drop_outliers)
+        self._log(f"[Очистка] Строки с выбросами ({OUTLIER_LABELS[method]} > {threshold}) "
+                  f"будут удаляться при чтении")
+        return self.df
+
     def print_summary(self):
         """Выводит сводку удаленных данных."""
         print("\n--- Сводка действий по очистке ---")
@@ -103,3 +442,11 @@ class DataCleaner:
         else:
             for item in self.history:
                 print(f"- {item}")
+        if self.snapshots.checkpoints:
+            print(f"\nКонтрольные точки: {', '.join(self.snapshots.checkpoints)}")
+        usage = self.snapshots.memory_usage() / 1024 / 1024
+        print(f"Шагов для отмены: {len(self.snapshots.undo_stack)}, память снимков: {usage:.1f} МБ")
+        if len(self.plan):
+            print("\nЕще не выполнено:")
+            print(self.plan.describe())
+
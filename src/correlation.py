@@ -0,0 +1,304 @@
+import numpy as np
+import pandas as pd
+from scipy.stats import rankdata, kendalltau
+
+# Сколько колонок в одном блоке при поиске пар (блок результата - CORR_BLOCK x CORR_BLOCK)
+CORR_BLOCK = 512
+CORR_METHODS = ("pearson", "spearman", "kendall")
+METHOD_LABELS = {
+    "pearson": "Пирсон",
+    "spearman": "Спирмен",
+    "kendall": "Кендалл",
+}
+
+
+class _Prepared:
+    """Данные, подготовленные к перемножению блоков.
+
+    Без пропусков каждая колонка центрируется и нормируется на единичную
+    длину - тогда корреляция блока это одно матричное произведение
+    Z[:, A].T @ Z[:, B]. С пропусками корреляция считается попарно по
+    строкам, где заполнены обе колонки (как DataFrame.corr()): для этого
+    хранятся центрированные значения (0 вместо пропуска) и маска.
+    """
+
+    def __init__(self, x, dtype="float64"):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mask = ~np.isnan(x)
+            self.complete = bool(mask.all())
+            # Центрирование до суммирования уменьшает потерю точности
+            centered = x - np.nanmean(x, axis=0) if x.shape[0] else x
+            if self.complete:
+                norm = np.sqrt((centered ** 2).sum(axis=0))
+                norm[norm == 0] = np.nan
+                self.z = (centered / norm).astype(dtype)
+            else:
+                self.c = np.where(mask, centered, 0.0).astype(dtype)
+                self.m = mask.astype(dtype)
+
+    def block(self, a, b):
+        """Корреляции колонок среза a с колонками среза b."""
+        if self.complete:
+            return self.z[:, a].T @ self.z[:, b]
+        ca, ma, cb, mb = self.c[:, a], self.m[:, a], self.c[:, b], self.m[:, b]
+        n = ma.T @ mb
+        sx = ca.T @ mb
+        sy = ma.T @ cb
+        with np.errstate(invalid='ignore', divide='ignore'):
+            cov = ca.T @ cb - sx * sy / n
+            var_x = (ca ** 2).T @ mb - sx ** 2 / n
+            var_y = ma.T @ (cb ** 2) - sy ** 2 / n
+            corr = cov / np.sqrt(var_x * var_y)
+        corr[n < 2] = np.nan
+        return corr
+
+
+class PairwiseSums:
+    """Попарные центрированные моменты для корреляции Пирсона по частям данных.
+
+    Для пары колонок (i, j) берутся строки, где заполнены обе: n[i, j] -
+    их число, mean[i, j] - среднее колонки i по ним, m2[i, j] - сумма
+    квадратов отклонений колонки i от этого среднего, cxy[i, j] - сумма
+    произведений отклонений колонок i и j. Новые строки (чанк, дописанный
+    файл) объединяются с накопленными формулой Чана/Пебая, как в
+    MomentAccumulator: сырые суммы x и x^2 при больших средних теряли бы
+    точность. Результат совпадает с DataFrame.corr() по всем строкам сразу.
+    """
+
+    def __init__(self, k):
+        self.n = np.zeros((k, k))
+        self.mean = np.zeros((k, k))
+        self.m2 = np.zeros((k, k))
+        self.cxy = np.zeros((k, k))
+
+    def update(self, x):
+        """Добавляет блок строк (строки x колонки, NaN - пропуск)."""
+        if not len(x):
+            return self
+        other = PairwiseSums(x.shape[1])
+        m = (~np.isnan(x)).astype('float64')
+        with np.errstate(invalid='ignore', divide='ignore'):
+            # Сдвиг на среднее блока: суммы ниже считаются по малым отклонениям
+            shift = np.nan_to_num(np.nanmean(x, axis=0)) if m.any() else np.zeros(x.shape[1])
+        z = np.where(m > 0, x - shift, 0.0)
+        n = m.T @ m
+        # s[i, j] - сумма отклонений колонки i по строкам, где заполнена колонка j
+        s = z.T @ m
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(n > 0, s / n, 0.0)
+        other.n = n
+        other.mean = mean + shift[:, None]
+        other.m2 = np.maximum((z ** 2).T @ m - s * mean, 0.0)
+        other.cxy = z.T @ z - s * mean.T
+        return self.merge(other)
+
+    def merge(self, other):
+        n = self.n + other.n
+        with np.errstate(invalid='ignore', divide='ignore'):
+            weight = np.where(n > 0, other.n / n, 0.0)
+        delta = other.mean - self.mean
+        # n_a * n_b / n - общий множитель поправок, симметричный по i и j
+        scale = self.n * weight
+        self.m2 = self.m2 + other.m2 + delta ** 2 * scale
+        self.cxy = self.cxy + other.cxy + delta * delta.T * scale
+        self.mean = self.mean + delta * weight
+        self.n = n
+        return self
+
+    def grow(self, k):
+        """Добавляет пустые колонки до k (новая колонка в дописанных данных)."""
+        extra = k - self.n.shape[0]
+        if extra > 0:
+            for name in ("n", "mean", "m2", "cxy"):
+                setattr(self, name, np.pad(getattr(self, name), ((0, extra), (0, extra))))
+        return self
+
+    def corr(self):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            corr = self.cxy / np.sqrt(self.m2 * self.m2.T)
+        return np.clip(corr, -1, 1)
+
+
+class _Spearman:
+    """Спирмен: Пирсон по рангам, ранги считаются один раз на колонку.
+
+    Если пропуски у двух колонок в разных строках, общие строки пары
+    ранжируются заново (как DataFrame.corr()): ранги по всей колонке
+    тогда дали бы другой результат. Такие пары считаются по одной.
+    """
+
+    def __init__(self, x, dtype="float64"):
+        self.x = x
+        self.mask = ~np.isnan(x)
+        self.gaps = ~self.mask.all(axis=0)
+        self.ranked = _Prepared(rankdata(x, axis=0, nan_policy='omit'), dtype)
+        # Порядок строк каждой колонки (пропуски в конце): ранги по подмножеству строк без сортировки
+        self.order = np.argsort(x, axis=0, kind='stable') if self.gaps.any() else None
+
+    def block(self, a, b):
+        corr = self.ranked.block(a, b)
+        if not self.gaps.any():
+            return corr
+        cols_a = np.arange(self.x.shape[1])[a]
+        cols_b = np.arange(self.x.shape[1])[b]
+        # Проверяются только пары, где хотя бы у одной колонки есть пропуски
+        for i, j in zip(*np.nonzero(self.gaps[cols_a][:, None] | self.gaps[cols_b][None, :])):
+            ci, cj = cols_a[i], cols_b[j]
+            if not np.array_equal(self.mask[:, ci], self.mask[:, cj]):
+                corr[i, j] = self._pair(ci, cj)
+        return corr
+
+    def _ranks(self, col, both):
+        """Средние ранги значений колонки по строкам both (в порядке строк)."""
+        rows = self.order[:, col]
+        rows = rows[both[rows]]
+        values = self.x[rows, col]
+        starts = np.flatnonzero(np.r_[True, values[1:] != values[:-1]])
+        ends = np.r_[starts[1:], len(values)]
+        ranks = np.empty(len(self.x))
+        ranks[rows] = np.repeat((starts + ends + 1) / 2, ends - starts)
+        return ranks[both]
+
+    def _pair(self, ci, cj):
+        both = self.mask[:, ci] & self.mask[:, cj]
+        if both.sum() < 2:
+            return np.nan
+        rx, ry = self._ranks(ci, both), self._ranks(cj, both)
+        rx -= rx.mean()
+        ry -= ry.mean()
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return (rx @ ry) / np.sqrt((rx @ rx) * (ry @ ry))
+
+
+def _prepare(x, method, dtype):
+    if method == "spearman":
+        return _Spearman(x, dtype)
+    return _Prepared(x, dtype)
+
+
+def _kendall_block(x, a, b):
+    """Кендалл (tau-b) попарно: без матричного вида, O(n log n) на пару.
+
+    Каждая пара колонок считается один раз (зеркальная берется готовой),
+    диагональ - без расчета: 1 или NaN для постоянной колонки.
+    """
+    cols_a = np.arange(x.shape[1])[a]
+    cols_b = np.arange(x.shape[1])[b]
+    mask = ~np.isnan(x)
+    corr = np.full((len(cols_a), len(cols_b)), np.nan)
+    done = {}
+    for i, ci in enumerate(cols_a):
+        for j, cj in enumerate(cols_b):
+            if ci == cj:
+                values = x[mask[:, ci], ci]
+                corr[i, j] = 1.0 if len(values) >= 2 and (values != values[0]).any() else np.nan
+                continue
+            pair = (min(ci, cj), max(ci, cj))
+            if pair not in done:
+                both = mask[:, ci] & mask[:, cj]
+                done[pair] = kendalltau(x[both, pair[0]], x[both, pair[1]]).statistic \
+                    if both.sum() >= 2 else np.nan
+            corr[i, j] = done[pair]
+    return corr
+
+
+def correlation_matrix(x, columns, method="pearson", dtype="float64"):
+    """Полная матрица корреляции для матрицы x (строки - наблюдения).
+
+    dtype='float32' вдвое уменьшает память и ускоряет произведение
+    матриц ценой точности около 1e-6.
+    """
+    if method == "kendall":
+        corr = _kendall_block(x, slice(None), slice(None))
+    else:
+        prepared = _prepare(x, method, dtype)
+        everything = slice(None)
+        corr = prepared.block(everything, everything).astype('float64')
+    corr = np.clip(corr, -1, 1)
+    if len(columns):
+        # На диагонали ровно 1 (кроме пустых/постоянных колонок)
+        diag = np.diagonal(corr).copy()
+        np.fill_diagonal(corr, np.where(np.isnan(diag), np.nan, 1.0))
+    return pd.DataFrame(corr, index=columns, columns=columns)
+
+
+def update_correlation(corr, x, changed, method="pearson", dtype="float64"):
+    """Матрица корреляции, в которой заново посчитаны только колонки changed.
+
+    corr - прежняя матрица для тех же строк; если изменились значения
+    нескольких колонок, достаточно пересчитать их строки и столбцы:
+    O(n * k) на колонку вместо O(n * k^2) для всей матрицы.
+    """
+    corr = np.array(corr, dtype='float64')
+    changed = np.asarray(changed, dtype=int)
+    everything = slice(None)
+    if method == "kendall":
+        block = _kendall_block(x, changed, everything)
+    else:
+        block = _prepare(x, method, dtype).block(changed, everything).astype('float64')
+    block = np.clip(block, -1, 1)
+    corr[changed, :] = block
+    corr[:, changed] = block.T
+    diag = block[np.arange(len(changed)), changed]
+    corr[changed, changed] = np.where(np.isnan(diag), np.nan, 1.0)
+    return corr
+
+
+def correlated_pairs(x, columns, k=None, threshold=None, method="pearson", dtype="float64",
+                     block_size=CORR_BLOCK):
+    """Самые коррелированные пары колонок без построения полной матрицы.
+
+    Матрица считается блоками block_size x block_size (только над
+    диагональю); из каждого блока остаются пары с |r| >= threshold и/или
+    k лучших по модулю. Возвращает таблицу пар по убыванию |r|.
+    method='matrix' - x уже матрица корреляции, из нее только выбираются пары.
+    """
+    n_cols = x.shape[1]
+    if method == "matrix":
+        # x - уже посчитанная матрица корреляции (например, накопленная по чанкам потока)
+        block_of = lambda a, b: x[a, b]
+    elif method == "kendall":
+        block_of = lambda a, b: _kendall_block(x, a, b)
+    else:
+        block_of = _prepare(x, method, dtype).block
+    found_i, found_j, found_r = [], [], []
+    for start_a in range(0, n_cols, block_size):
+        a = slice(start_a, min(start_a + block_size, n_cols))
+        for start_b in range(start_a, n_cols, block_size):
+            b = slice(start_b, min(start_b + block_size, n_cols))
+            corr = block_of(a, b)
+            rows, cols = np.nonzero(np.isfinite(corr))
+            rows, cols = rows + start_a, cols + start_b
+            keep = rows < cols
+            rows, cols = rows[keep], cols[keep]
+            values = np.clip(corr[rows - start_a, cols - start_b].astype('float64'), -1, 1)
+            if threshold is not None:
+                keep = np.abs(values) >= threshold
+                rows, cols, values = rows[keep], cols[keep], values[keep]
+            found_i.append(rows)
+            found_j.append(cols)
+            found_r.append(values)
+            if k is not None:
+                # Держим в памяти не больше k лучших пар
+                found_i, found_j, found_r = _top_k(found_i, found_j, found_r, k)
+
+    rows = np.concatenate(found_i) if found_i else np.empty(0, dtype=int)
+    cols = np.concatenate(found_j) if found_j else np.empty(0, dtype=int)
+    values = np.concatenate(found_r) if found_r else np.empty(0)
+    order = np.argsort(-np.abs(values), kind='stable')
+    if k is not None:
+        order = order[:k]
+    names = np.asarray(columns, dtype=object)
+    return pd.DataFrame({
+        'Колонка 1': names[rows[order]],
+        'Колонка 2': names[cols[order]],
+        'Корреляция': values[order],
+    })
+
+
+def _top_k(found_i, found_j, found_r, k):
+    rows, cols, values = np.concatenate(found_i), np.concatenate(found_j), np.concatenate(found_r)
+    if len(values) > k:
+        top = np.argpartition(-np.abs(values), k - 1)[:k]
+        rows, cols, values = rows[top], cols[top], values[top]
+    return [rows], [cols], [values]
@@ -0,0 +1,242 @@
+import os
+import numpy as np
+import pandas as pd
+import joblib
+from pandas.api.types import is_numeric_dtype, is_bool_dtype, is_integer_dtype
+from .moments import sorted_within_groups, grouped_quantiles, grouped_modes
+
+IMPUTE_LABELS = {"mean": "среднее", "median": "медиана", "mode": "мода"}
+
+
+def _impute_values(x, group, starts, strategy):
+    """Значение заполнения каждой колонки в каждой группе (группы x колонки).
+
+    Строки x упорядочены по группам, starts - начала групп. Все колонки
+    считаются сразу: среднее - одной суммой по маске, медиана и мода -
+    по отсортированным внутри групп значениям.
+    """
+    if len(starts) == 0:
+        return np.full((0, x.shape[1]), np.nan)
+    mask = ~np.isnan(x)
+    if strategy == "mean" and len(starts) == 1:
+        # Одна группа: сумма по колонкам (та же, что у pandas mean)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return (np.where(mask, x, 0.0).sum(axis=0) / mask.sum(axis=0))[None, :]
+    counts = np.add.reduceat(mask, starts, axis=0)
+    if strategy == "mean":
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.add.reduceat(np.where(mask, x, 0.0), starts, axis=0) / counts
+    s = sorted_within_groups(x, group)
+    if strategy == "median":
+        return grouped_quantiles(s, starts, counts, 0.5)
+    return grouped_modes(s, group, starts, counts)
+
+
+def _format_value(value):
+    if isinstance(value, (float, np.floating)):
+        return f"{value:.2f}"
+    return repr(value) if isinstance(value, str) else str(value)
+
+
+class Imputer:
+    """Заполнение пропусков: значения считаются один раз (fit), применяются к любым данным (transform).
+
+    strategy - 'mean', 'median' или 'mode' (мода годится и для текста).
+    group_by - колонки групп: значение считается внутри каждой группы
+    (например, возраст по классу и полу), а для пустой или незнакомой
+    группы берется общее значение колонки. Посчитанные значения хранятся
+    в объекте, его можно сохранить (save) и заполнить новые данные без
+    пересчета.
+    """
+
+    def __init__(self, strategy="mean", group_by=None, columns=None):
+        if strategy not in IMPUTE_LABELS:
+            raise ValueError(f"Неизвестный способ заполнения: {strategy}")
+        self.strategy = strategy
+        self.group_by = [group_by] if isinstance(group_by, str) else list(group_by or [])
+        self.columns = columns
+        # Общие значения {колонка: значение} и значения по группам (ключи групп x колонки)
+        self.values = {}
+        self.group_values = None
+
+    @classmethod
+    def from_data(cls, df, strategy="mean", group_by=None, columns=None):
+        return cls(strategy, group_by, columns).fit(df)
+
+    def _select(self, df):
+        if self.columns is not None:
+            cols = [col for col in self.columns if col in df.columns]
+        elif self.strategy == "mode":
+            cols = list(df.columns)
+        else:
+            # Выбор по пустому срезу: select_dtypes по всей таблице ее копирует
+            cols = df.iloc[:0].select_dtypes(include=['number']).columns.tolist()
+        return [col for col in cols if col not in self.group_by]
+
+    def _encode(self, df, cols):
+        """Колонки в одну матрицу float64: текст и прочее - номерами разных значений."""
+        # По колонкам подряд: суммы и сортировки идут вдоль непрерывной памяти
+        x = np.empty((len(df), len(cols)), order='F')
+        uniques = {}
+        for j, col in enumerate(cols):
+            series = df[col]
+            if is_numeric_dtype(series.dtype) and not is_bool_dtype(series.dtype):
+                x[:, j] = series.to_numpy(dtype='float64', na_value=np.nan)
+            else:
+                codes, uniques[col] = pd.factorize(series, sort=True)
+                x[:, j] = np.where(codes >= 0, codes, np.nan)
+        return x, uniques
+
+    @staticmethod
+    def _decode(values, uniques):
+        """Номера значений обратно в значения (для текстовых колонок)."""
+        if uniques is None:
+            return values
+        result = np.full(len(values), np.nan, dtype=object)
+        present = ~np.isnan(values)
+        result[present] = np.asarray(uniques, dtype=object)[values[present].astype(int)]
+        return result
+
+    def fit(self, df):
+        cols = self._select(df)
+        if self.strategy != "mode":
+            cols = [col for col in cols if is_numeric_dtype(df[col].dtype)
+                    and not is_bool_dtype(df[col].dtype)]
+        x, uniques = self._encode(df, cols)
+        overall = _impute_values(x, np.zeros(len(x), dtype=int), np.array([0]) if len(x) else np.empty(0, int),
+                                 self.strategy)
+        overall = overall[0] if len(overall) else np.full(len(cols), np.nan)
+        self.values = {col: self._decode(overall[j:j + 1], uniques.get(col))[0]
+                       for j, col in enumerate(cols)}
+        self.group_values = None
+        if self.group_by:
+            grouped = df.groupby(self.group_by, sort=True, observed=True, dropna=True)
+            # При пропусках в ключе ngroup дает NaN (float) для таких строк
+            gid = grouped.ngroup().fillna(-1).to_numpy(dtype='int64')
+            rows = np.flatnonzero(gid >= 0)
+            rows = rows[np.argsort(gid[rows], kind='stable')]
+            group = gid[rows]
+            starts = np.flatnonzero(np.r_[True, group[1:] != group[:-1]]) if len(group) else np.empty(0, int)
+            values = _impute_values(x[rows], group, starts, self.strategy)
+            self.group_values = pd.DataFrame(
+                {col: self._decode(values[:, j], uniques.get(col)) for j, col in enumerate(cols)},
+                index=grouped.size().index, columns=cols)
+        return self
+
+    def _positions(self, df):
+        """Номер группы каждой строки df в group_values; -1 - незнакомая группа или пустой ключ."""
+        if self.group_values is None or not all(col in df.columns for col in self.group_by):
+            return None
+        if len(self.group_by) == 1:
+            return self.group_values.index.get_indexer(df[self.group_by[0]])
+        return self.group_values.index.get_indexer(pd.MultiIndex.from_frame(df[self.group_by]))
+
+    def _row_values(self, positions, cols, dtype):
+        """Значения заполнения по строкам (строки x колонки) или одна строка общих значений.
+
+        Пустое значение группы заменяется общим значением колонки.
+        """
+        overall = np.array([self.values[col] for col in cols], dtype=dtype)
+        if positions is None:
+            return overall[None, :]
+        # Последняя строка таблицы - общие значения для строк с номером группы -1
+        table = np.vstack([self.group_values[cols].to_numpy(dtype=dtype), overall])
+        table = np.where(pd.isna(table), overall, table)
+        return table[positions]
+
+    def transform(self, df):
+        """Заполняет пропуски посчитанными значениями.
+
+        Маска пропусков строится одним проходом по всем колонкам, числовые
+        колонки заполняются одной операцией над матрицей. Исходная таблица
+        не меняется (от нее зависят снимки для отмены): незатронутые
+        колонки новой таблицы общие с ней. Целая колонка, которой нужно
+        дробное значение, переводится в float (как в fill_missing).
+        Возвращает (новая таблица, отчет: список словарей по колонкам).
+        """
+        cols = [col for col in self.values if col in df.columns]
+        if not cols or len(df) == 0:
+            return df, []
+        mask = df[cols].isna().to_numpy()
+        todo = [j for j in range(len(cols)) if mask[:, j].any()]
+        if not todo:
+            return df, []
+        cols = [cols[j] for j in todo]
+        mask = mask[:, todo]
+        positions = self._positions(df)
+        numeric = [j for j, col in enumerate(cols)
+                   if is_numeric_dtype(df[col].dtype) and not is_bool_dtype(df[col].dtype)]
+        other = [j for j in range(len(cols)) if j not in numeric]
+        if numeric:
+            names = [cols[j] for j in numeric]
+            x = df[names].to_numpy(dtype='float64', na_value=np.nan)
+            filled = np.where(mask[:, numeric], self._row_values(positions, names, 'float64'), x)
+        if other:
+            fill = self._row_values(positions, [cols[j] for j in other], object)
+        converted, report = {}, []
+        for j, col in enumerate(cols):
+            series = df[col]
+            cast = None
+            if j in numeric:
+                values = filled[:, numeric.index(j)]
+                dtype = series.dtype
+                if is_integer_dtype(dtype):
+                    present = values[~np.isnan(values)]
+                    if (present == np.round(present)).all():
+                        new = pd.Series(values, index=df.index, name=col).astype(dtype)
+                    else:
+                        cast = 'float32' if dtype.itemsize <= 2 else 'float64'
+                        new = pd.Series(values.astype(cast), index=df.index, name=col)
+                else:
+                    new = pd.Series(values.astype(dtype), index=df.index, name=col)
+            else:
+                values = fill[:, other.index(j)]
+                if len(values) == 1:
+                    values = np.repeat(values, len(df))
+                if isinstance(series.dtype, pd.CategoricalDtype):
+                    extra = pd.Index(pd.unique(values[mask[:, j]])).dropna().difference(series.cat.categories)
+                    if len(extra):
+                        series = series.cat.add_categories(extra)
+                new = series.where(~mask[:, j], values)
+            converted[col] = new
+            report.append({'column': col, 'missing': int(mask[:, j].sum()),
+                           'left': int(new.isna().sum()), 'cast': cast})
+        df = df.copy(deep=False)
+        for col, series in converted.items():
+            df[col] = series
+        return df, report
+
+    def fit_transform(self, df):
+        return self.fit(df).transform(df)
+
+    def describe(self, col):
+        """Чем заполнена колонка: значение или способ и группы."""
+        label = IMPUTE_LABELS[self.strategy]
+        if self.group_values is not None:
+            return f"{label} по группам {', '.join(map(str, self.group_by))} ({len(self.group_values)} групп)"
+        value = _format_value(self.values[col])
+        return value if self.strategy == "mean" else f"{label} {value}"
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        joblib.dump(self, path)
+        return path
+
+    @staticmethod
+    def load(path):
+        return joblib.load(path)
+
+
+def imputation_report(imputer, report):
+    """Строки истории: что и чем заполнено, и где тип пришлось расширить."""
+    lines = []
+    for item in report:
+        col = item['column']
+        line = f"[Очистка] В колонке '{col}' пропуски заменены на {imputer.describe(col)}"
+        if imputer.group_values is not None or item['left']:
+            line += f" (заполнено {item['missing'] - item['left']} из {item['missing']})"
+        lines.append(line)
+        if item['cast']:
+            lines.append(f"[Память] Колонка '{col}' переведена в {item['cast']} "
+                         f"(целый тип не хранит дробное значение)")
+    return lines
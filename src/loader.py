@@ -0,0 +1,159 @@
+import pandas as pd
+
+# Сколько строк читать за один раз в потоковом режиме
+DEFAULT_CHUNKSIZE = 100_000
+# Сколько строк смотреть, чтобы определить типы колонок
+SAMPLE_ROWS = 10_000
+
+
+def infer_dtypes(path, sample_rows=SAMPLE_ROWS):
+    """Определяет явные типы колонок по первым строкам файла.
+
+    Числа всегда читаются как float64: в следующих частях файла в целой
+    колонке могут встретиться пропуски, и int64 тогда сломал бы чтение.
+    Если дальше в файле встретится текст, чанк приводится к этим типам
+    (см. _reconcile_chunk), а не обрывает чтение.
+    """
+    sample = pd.read_csv(path, nrows=sample_rows)
+    dtypes = {}
+    for col in sample.columns:
+        if pd.api.types.is_bool_dtype(sample[col]):
+            dtypes[col] = 'boolean'
+        elif pd.api.types.is_numeric_dtype(sample[col]):
+            dtypes[col] = 'float64'
+        else:
+            dtypes[col] = 'object'
+    return dtypes
+
+
+def _reconcile_chunk(chunk, dtypes, coerced):
+    """Приводит колонки чанка к типам dtypes.
+
+    Значения, которые в тип не переводятся (текст или метка вроде "n/a?"
+    в числовой колонке после первых SAMPLE_ROWS строк), становятся
+    пропусками; такие колонки добавляются в множество coerced.
+    """
+    for col, dtype in dtypes.items():
+        if col not in chunk.columns or chunk[col].dtype == dtype:
+            continue
+        series = chunk[col]
+        try:
+            chunk[col] = series.astype(dtype)
+            continue
+        except (TypeError, ValueError):
+            pass
+        if dtype == 'boolean':
+            text = series.astype(str).str.lower()
+            values = text.map({'true': True, 'false': False}).astype('boolean')
+        else:
+            values = pd.to_numeric(series, errors='coerce').astype(dtype)
+        if (values.isna() & series.notna()).any():
+            coerced.add(col)
+        chunk[col] = values
+    return chunk
+
+
+class ChunkedCSV:
+    """Потоковое представление CSV файла, который не помещается в память.
+
+    Файл читается частями (чанками) по chunksize строк с заранее заданными
+    типами. Каждый обход объекта заново читает файл, поэтому по нему можно
+    проходить сколько угодно раз. Преобразования (очистка) не выполняются
+    сразу, а запоминаются и применяются к каждому чанку при чтении.
+    """
+
+    def __init__(self, path, chunksize=DEFAULT_CHUNKSIZE, dtypes=None, transforms=None):
+        self.path = path
+        self.chunksize = chunksize
+        self.dtypes = dtypes if dtypes is not None else infer_dtypes(path)
+        self.transforms = list(transforms) if transforms else []
+        # Колонки, где встретились значения не их типа (общее для потоков из pipe)
+        self.coerced = set()
+
+    def _read(self, **kwargs):
+        """read_csv с типами: текст задается сразу, числа и логические приводятся по чанкам.
+
+        Явный числовой тип в read_csv оборвал бы чтение на первом тексте
+        в колонке, когда часть файла уже обработана.
+        """
+        fixed = {col: dtype for col, dtype in self.dtypes.items() if dtype == 'object'}
+        return pd.read_csv(self.path, dtype=fixed, **kwargs)
+
+    def _warn_coerced(self, known):
+        for col in sorted(self.coerced - known):
+            print(f"Внимание: в колонке '{col}' есть значения, которые не подходят к типу "
+                  f"{self.dtypes[col]} (определен по первым {SAMPLE_ROWS} строкам), "
+                  f"они считаются пропусками.")
+
+    def _start_transforms(self):
+        # Преобразования с состоянием (например, общий набор хэшей строк для
+        # поиска дубликатов между чанками) заводят свежее состояние на каждый проход
+        return [func.start() if hasattr(func, "start") else func for func in self.transforms]
+
+    def __iter__(self):
+        reader = self._read(chunksize=self.chunksize)
+        transforms = self._start_transforms()
+        for chunk in reader:
+            known = set(self.coerced)
+            chunk = _reconcile_chunk(chunk, self.dtypes, self.coerced)
+            self._warn_coerced(known)
+            for func in transforms:
+                chunk = func(chunk)
+            yield chunk
+
+    def pipe(self, func):
+        """Возвращает новый поток, в котором к каждому чанку применяется func."""
+        stream = ChunkedCSV(self.path, self.chunksize, self.dtypes, self.transforms + [func])
+        stream.coerced = self.coerced
+        return stream
+
+    def sample(self, n=1000):
+        """Первые n строк файла после всех преобразований."""
+        chunk = _reconcile_chunk(self._read(nrows=n), self.dtypes, set())
+        for func in self._start_transforms():
+            chunk = func(chunk)
+        return chunk
+
+    def head(self, n=5):
+        return self.sample(n).head(n)
+
+    @property
+    def columns(self):
+        return self.sample().columns
+
+    def numeric_columns(self):
+        """Список числовых колонок (с учетом уже записанных преобразований)."""
+        return self.sample().select_dtypes(include=['number']).columns.tolist()
+
+    def column(self, name):
+        """Собирает в память только одну колонку."""
+        parts = [chunk[name] for chunk in self]
+        if not parts:
+            return pd.Series(dtype='float64', name=name)
+        return pd.concat(parts, ignore_index=True)
+
+    def select(self, columns, dropna=False):
+        """Собирает в память только нужные колонки (например, для обучения модели)."""
+        parts = []
+        for chunk in self:
+            part = chunk[columns]
+            if dropna:
+                part = part.dropna()
+            parts.append(part)
+        if not parts:
+            return pd.DataFrame(columns=columns)
+        return pd.concat(parts, ignore_index=True)
+
+    def count_rows(self):
+        return sum(len(chunk) for chunk in self)
+
+    def to_frame(self):
+        """Полностью загружает поток в память (только для небольших файлов!)."""
+        parts = list(self)
+        if not parts:
+            return self.sample(0)
+        return pd.concat(parts, ignore_index=True)
+
+
+def is_stream(data):
+    return isinstance(data, ChunkedCSV)
@@ -1,26 +1,156 @@
+import time
+import numpy as np
 import pandas as pd
+from joblib import Parallel, delayed
+from .loader import is_stream, DEFAULT_CHUNKSIZE
+from .models import data_fingerprint
+from .sketch import KLLSketch
+from .moments import MomentAccumulator
+from .profiling import instrument
 import matplotlib.pyplot as plt
-from sklearn.model_selection import train_test_split
-from sklearn.linear_model import LinearRegression
-from sklearn.ensemble import RandomForestRegressor
+from sklearn.base import BaseEstimator, TransformerMixin, clone
+from sklearn.model_selection import train_test_split, KFold
+from sklearn.linear_model import LinearRegression, SGDRegressor
+from sklearn.ensemble import RandomForestRegressor, HistGradientBoostingRegressor
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import StandardScaler
 from sklearn.tree import DecisionTreeRegressor
 from sklearn.metrics import mean_absolute_error, r2_score
 
+MODEL_NAMES = {
+    "linear": "Линейная регрессия",
+    "tree": "Дерево решений",
+    "forest": "Случайный лес",
+}
+MODEL_CLASSES = {
+    "linear": LinearRegression,
+    "tree": DecisionTreeRegressor,
+    "forest": RandomForestRegressor,
+}
+# Гиперпараметры по умолчанию (входят в ключ кэша моделей)
+MODEL_PARAMS = {
+    "linear": {},
+    "tree": {"random_state": 42},
+    "forest": {"n_estimators": 100, "random_state": 42},
+}
+
+# Модели, которые обучаются по частям (данные не собираются в память целиком)
+INCREMENTAL_NAMES = {
+    "sgd": "Линейная регрессия (SGD, по частям)",
+    "hist": "Градиентный бустинг (гистограммы, по частям)",
+}
+# Доля строк, отложенных для оценки, и сколько из них рисовать на графике
+TEST_SIZE = 0.2
+PLOT_POINTS = 10_000
+# Число корзин для признаков бустинга (коды помещаются в uint8)
+MAX_BINS = 255
+# Сколько обучающих строк бустинг держит в памяти (коды корзин): при большем
+# числе строк берется случайная выборка такого размера
+HIST_MAX_ROWS = 5_000_000
+
+
+class QuantileBinner(TransformerMixin, BaseEstimator):
+    """Заменяет значения признаков номерами квантильных корзин (uint8).
+
+    Границы корзин задаются заранее (из скетчей квантилей), поэтому
+    преобразование не требует данных целиком. Пропуски остаются NaN.
+    """
+
+    def __init__(self, edges=None):
+        self.edges = edges
+
+    def fit(self, X, y=None):
+        return self
+
+    def transform(self, X):
+        X = np.asarray(X, dtype='float64')
+        binned = np.empty(X.shape, dtype='float32')
+        for j, edges in enumerate(self.edges):
+            binned[:, j] = np.searchsorted(edges, X[:, j], side='right')
+        binned[np.isnan(X)] = np.nan
+        return binned
+
+
+class _StreamScore:
+    """MAE и R2 по частям плюс равномерная выборка точек для графика.
+
+    Разброс цели для R2 копится центрированно (MomentAccumulator): сумма
+    y^2 минус квадрат суммы теряет точность, если среднее цели велико.
+    """
+
+    def __init__(self, seed=42):
+        self.n = 0
+        self.abs_err = 0.0
+        self.sq_err = 0.0
+        self.target = MomentAccumulator(["y"])
+        self.rng = np.random.default_rng(seed)
+        self.keys = np.empty(0)
+        self.points = np.empty((0, 2))
+
+    def update(self, y, y_pred):
+        self.n += len(y)
+        self.abs_err += np.abs(y - y_pred).sum()
+        self.sq_err += ((y - y_pred) ** 2).sum()
+        self.target.merge(MomentAccumulator.from_array(y[:, None], ["y"]))
+        # Случайный ключ каждой точке; оставляем PLOT_POINTS наименьших - равномерная выборка
+        keys = np.concatenate([self.keys, self.rng.random(len(y))])
+        points = np.concatenate([self.points, np.column_stack([y, y_pred])])
+        if len(keys) > PLOT_POINTS:
+            top = np.argpartition(keys, PLOT_POINTS)[:PLOT_POINTS]
+            keys, points = keys[top], points[top]
+        self.keys, self.points = keys, points
+
+    def mae(self):
+        return self.abs_err / self.n
+
+    def r2(self):
+        total = self.target.m2[0]
+        return 1 - self.sq_err / total if total > 0 else 0.0
+
+
+def _fit_fold(model, X, y, train_idx, test_idx):
+    """Обучение и оценка одной модели на одном фолде (выполняется в рабочем процессе)."""
+    start = time.perf_counter()
+    model.fit(X[train_idx], y[train_idx])
+    fit_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    y_pred = model.predict(X[test_idx])
+    predict_seconds = time.perf_counter() - start
+    return {
+        'mae': mean_absolute_error(y[test_idx], y_pred),
+        'r2': r2_score(y[test_idx], y_pred),
+        'fit': fit_seconds,
+        'predict': predict_seconds,
+    }
+
+
 class DataPredictor:
-    def __init__(self, df):
+    def __init__(self, df, registry=None):
         self.df = df
+        # Хранилище обученных моделей (ModelRegistry); None - всегда обучать заново
+        self.registry = registry
 
-    def predict(self, target_col, feature_cols, model_type="linear"):
+    @instrument()
+    def predict(self, target_col, feature_cols, model_type="linear", save_path=None, params=None):
         """
         Множественная регрессия.
         target_col: строка (что предсказываем)
         feature_cols: список строк (на основе чего)
         model_type: 'linear', 'tree', 'forest'
+        save_path: если задан, график сохраняется в этот файл вместо показа
+        params: гиперпараметры модели поверх MODEL_PARAMS
+        Если задан registry и модель с теми же данными, колонками и
+        параметрами уже обучалась, она берется с диска без обучения.
+        Возвращает словарь с моделью и метриками (None при ошибке).
         """
         # Подготовка данных
         # Собираем все нужные колонки и чистим от NaN
         cols_needed = [target_col] + feature_cols
-        data = self.df[cols_needed].dropna()
+        if is_stream(self.df):
+            # Из потока читаем только нужные колонки, остальное не попадает в память
+            data = self.df.select(cols_needed, dropna=True)
+        else:
+            data = self.df[cols_needed].dropna()
 
         if data.empty:
             print("Ошибка: После удаления пустых строк данных не осталось.")
@@ -33,21 +163,27 @@ class DataPredictor:
         X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
 
         # Выбор модели
-        if model_type == "linear":
-            model = LinearRegression()
-            name = "Линейная регрессия"
-        elif model_type == "tree":
-            model = DecisionTreeRegressor(random_state=42)
-            name = "Дерево решений"
-        elif model_type == "forest":
-            model = RandomForestRegressor(n_estimators=100, random_state=42)
-            name = "Случайный лес"
-        else:
+        if model_type not in MODEL_CLASSES:
             print("Неизвестная модель.")
             return
+        name = MODEL_NAMES[model_type]
+        params = {**MODEL_PARAMS[model_type], **(params or {})}
+
+        model, key, cached = None, None, False
+        if self.registry is not None:
+            key = self.registry.key(data_fingerprint(data), target_col, feature_cols, model_type, params)
+            model, _ = self.registry.get(key)
+            cached = model is not None
+            if cached:
+                print("Модель с такими данными и параметрами уже обучена - взята из кэша.")
 
-        # Обучение
-        model.fit(X_train, y_train)
+        if model is None:
+            # Обучение
+            model = MODEL_CLASSES[model_type](**params)
+            if 'n_jobs' in model.get_params() and 'n_jobs' not in params:
+                # Деревья леса строятся на всех ядрах (на результат не влияет)
+                model.set_params(n_jobs=-1)
+            model.fit(X_train, y_train)
 
         # Прогноз
         y_pred = model.predict(X_test)
@@ -56,6 +192,13 @@ class DataPredictor:
         mae = mean_absolute_error(y_test, y_pred)
         r2 = r2_score(y_test, y_pred)
 
+        if self.registry is not None and not cached:
+            self.registry.put(key, model, {
+                'name': name, 'target': target_col, 'features': list(feature_cols),
+                'model_type': model_type, 'params': params, 'rows': len(data),
+                'mae': mae, 'r2': r2,
+            })
+
         print(f"\n[Результаты обучения: {name}]")
         print(f"Использованы параметры: {', '.join(feature_cols)}")
         print(f"Средняя ошибка (MAE): {mae:.2f}")
@@ -68,6 +211,21 @@ class DataPredictor:
             for feature, coef in coeffs:
                 print(f"  {feature}: {coef:.4f}")
 
+        self._plot_results(y_test, y_pred, target_col, name, save_path)
+
+        return {
+            'model': model,
+            'name': name,
+            'target': target_col,
+            'features': list(feature_cols),
+            'model_type': model_type,
+            'mae': mae,
+            'r2': r2,
+            'key': key,
+            'cached': cached,
+        }
+
+    def _plot_results(self, y_test, y_pred, target_col, name, save_path):
         # График "Реальность vs Прогноз"
         # Так как X многомерный, мы не можем построить простой 2D график.
         # Строим график, где по X - реальные значения, по Y - предсказанные.
@@ -84,5 +242,218 @@ class DataPredictor:
         plt.ylabel(f'Предсказанные значения ({target_col})')
         plt.title(f'Качество модели: {name}')
         plt.legend()
-        print("График сравнения открыт.")
-        plt.show()
+        if save_path:
+            plt.savefig(save_path, bbox_inches='tight')
+            plt.close()
+            print(f"График сравнения сохранен: {save_path}")
+        else:
+            print("График сравнения открыт.")
+            plt.show()
+
+    def _matrix(self, target_col, feature_cols):
+        """Признаки и цель как NumPy-массивы без строк с пропусками."""
+        cols_needed = [target_col] + feature_cols
+        if is_stream(self.df):
+            data = self.df.select(cols_needed, dropna=True)
+        else:
+            data = self.df[cols_needed].dropna()
+        X = np.ascontiguousarray(data[feature_cols].to_numpy(dtype='float64'))
+        y = data[target_col].to_numpy(dtype='float64')
+        return X, y
+
+    @instrument()
+    def compare_models(self, target_col, feature_cols, model_types=("linear", "tree", "forest"),
+                       folds=5, n_jobs=-1, params=None):
+        """
+        Сравнение моделей k-кратной кросс-валидацией.
+        Все пары (модель, фолд) обучаются параллельно на всех ядрах. Матрица
+        признаков извлекается один раз; joblib передает ее процессам через
+        общий файл, отображенный в память, а не копией на каждый фолд.
+        params: словарь {тип модели: гиперпараметры} поверх MODEL_PARAMS
+        Возвращает таблицу: среднее и стд. отклонение MAE и R2, время
+        обучения и прогноза по каждой модели (None при ошибке).
+        """
+        unknown = [m for m in model_types if m not in MODEL_CLASSES]
+        if unknown:
+            print(f"Неизвестная модель: {', '.join(unknown)}")
+            return
+        X, y = self._matrix(target_col, feature_cols)
+        if len(y) < folds:
+            print(f"Ошибка: для {folds} фолдов нужно минимум {folds} строк без пропусков.")
+            return
+
+        splits = list(KFold(n_splits=folds, shuffle=True, random_state=42).split(X))
+        models = {}
+        for model_type in model_types:
+            model_params = {**MODEL_PARAMS[model_type], **(params or {}).get(model_type, {})}
+            model = MODEL_CLASSES[model_type](**model_params)
+            if 'n_jobs' in model.get_params():
+                # Параллелим по фолдам, а не внутри леса, чтобы не делить ядра дважды
+                model.set_params(n_jobs=1)
+            models[model_type] = model
+
+        tasks = [(model_type, train_idx, test_idx)
+                 for model_type in model_types for train_idx, test_idx in splits]
+        start = time.perf_counter()
+        results = Parallel(n_jobs=n_jobs)(
+            delayed(_fit_fold)(clone(models[model_type]), X, y, train_idx, test_idx)
+            for model_type, train_idx, test_idx in tasks)
+        total = time.perf_counter() - start
+
+        rows = {}
+        for model_type in model_types:
+            scores = pd.DataFrame([r for (m, _, _), r in zip(tasks, results) if m == model_type])
+            rows[MODEL_NAMES[model_type]] = {
+                'MAE (среднее)': scores['mae'].mean(),
+                'MAE (стд.)': scores['mae'].std(),
+                'R2 (среднее)': scores['r2'].mean(),
+                'R2 (стд.)': scores['r2'].std(),
+                'Обучение, с': scores['fit'].mean(),
+                'Прогноз, с': scores['predict'].mean(),
+            }
+        report = pd.DataFrame(rows).T
+
+        print(f"\n[Сравнение моделей: {folds}-кратная кросс-валидация, {len(y)} строк]")
+        print(f"Использованы параметры: {', '.join(feature_cols)}")
+        print(report.round(4).to_string())
+        print(f"Общее время: {total:.2f} с (время обучения и прогноза - среднее на фолд)")
+        best = report['MAE (среднее)'].idxmin()
+        print(f"Лучшая модель по MAE: {best}")
+        return report
+
+    def _batches(self, target_col, feature_cols, chunksize):
+        """Мини-пакеты (X, y, тестовые строки) без пропусков, в постоянной памяти.
+
+        Из потока читаются чанки CSV, из таблицы (в том числе из кэша,
+        отображенного в память) - срезы по chunksize строк. Отложенные для
+        оценки строки выбираются генератором с фиксированным зерном, поэтому
+        при каждом проходе они одни и те же.
+        """
+        cols_needed = [target_col] + feature_cols
+        rng = np.random.default_rng(42)
+        if is_stream(self.df):
+            blocks = (chunk[cols_needed] for chunk in self.df)
+        else:
+            blocks = (self.df.iloc[start:start + chunksize][cols_needed]
+                      for start in range(0, len(self.df), chunksize))
+        for block in blocks:
+            values = block.to_numpy(dtype='float64')
+            values = values[~np.isnan(values).any(axis=1)]
+            test = rng.random(len(values)) < TEST_SIZE
+            yield values[:, 1:], values[:, 0], test
+
+    @instrument()
+    def fit_incremental(self, target_col, feature_cols, model_type="sgd", save_path=None,
+                        chunksize=DEFAULT_CHUNKSIZE, epochs=5, max_rows=HIST_MAX_ROWS):
+        """
+        Обучение по частям для таблиц, которые не помещаются в память.
+        model_type: 'sgd' - линейная регрессия градиентным спуском (partial_fit
+                    по мини-пакетам, epochs проходов по данным);
+                    'hist' - градиентный бустинг по признакам, замененным
+                    номерами квантильных корзин (uint8, в 8 раз меньше float64).
+        Данные читаются блоками по chunksize строк; в памяти одновременно
+        только один блок. 'hist' по частям только готовит данные (границы
+        корзин и коды): сам бустинг обучается на матрице кодов в памяти, и
+        если обучающих строк больше max_rows, берется случайная выборка
+        max_rows строк (с предупреждением).
+        Результаты (MAE, R2, график) такие же, как у predict(); оценка идет
+        на отложенных 20% строк. Возвращает словарь с моделью и метриками.
+        """
+        if model_type not in INCREMENTAL_NAMES:
+            print("Неизвестная модель.")
+            return
+        name = INCREMENTAL_NAMES[model_type]
+        batches = lambda: self._batches(target_col, feature_cols, chunksize)
+
+        if model_type == "sgd":
+            model = self._fit_sgd(batches, epochs)
+        else:
+            model = self._fit_hist(batches, len(feature_cols), max_rows)
+        if model is None:
+            print("Ошибка: После удаления пустых строк данных не осталось.")
+            return
+
+        score = _StreamScore()
+        for X, y, test in batches():
+            if test.any():
+                score.update(y[test], model.predict(X[test]))
+        if score.n == 0:
+            print("Ошибка: не осталось строк для оценки модели.")
+            return
+        mae, r2 = score.mae(), score.r2()
+
+        print(f"\n[Результаты обучения: {name}]")
+        print(f"Использованы параметры: {', '.join(feature_cols)}")
+        print(f"Средняя ошибка (MAE): {mae:.2f}")
+        print(f"Коэффициент R2: {r2:.2f}")
+
+        if model_type == "sgd":
+            # Коэффициенты в исходных единицах признаков
+            scaler, sgd = model[0], model[-1]
+            print("Вклад параметров (коэффициенты):")
+            for feature, coef in zip(feature_cols, sgd.coef_ / scaler.scale_):
+                print(f"  {feature}: {coef:.4f}")
+
+        self._plot_results(score.points[:, 0], score.points[:, 1], target_col, name, save_path)
+
+        return {
+            'model': model,
+            'name': name,
+            'target': target_col,
+            'features': list(feature_cols),
+            'model_type': model_type,
+            'mae': mae,
+            'r2': r2,
+        }
+
+    def _fit_sgd(self, batches, epochs):
+        # Проход 1: среднее и разброс признаков и цели (для масштабирования)
+        scaler = StandardScaler()
+        y_scaler = StandardScaler()
+        for X, y, test in batches():
+            if (~test).any():
+                scaler.partial_fit(X[~test])
+                y_scaler.partial_fit(y[~test, None])
+        if not hasattr(scaler, 'n_samples_seen_'):
+            return None
+        sgd = SGDRegressor(random_state=42)
+        for _ in range(epochs):
+            for X, y, test in batches():
+                if (~test).any():
+                    y_scaled = y_scaler.transform(y[~test, None])[:, 0]
+                    sgd.partial_fit(scaler.transform(X[~test]), y_scaled)
+        # Цель масштабировалась; модель линейна, поэтому возвращаем ее в исходные единицы
+        sgd.coef_ = sgd.coef_ * y_scaler.scale_[0]
+        sgd.intercept_ = sgd.intercept_ * y_scaler.scale_[0] + y_scaler.mean_[0]
+        return make_pipeline(scaler, sgd)
+
+    def _fit_hist(self, batches, n_features, max_rows=HIST_MAX_ROWS):
+        # Проход 1: скетчи квантилей признаков -> границы корзин (и число обучающих строк)
+        sketches = [KLLSketch() for _ in range(n_features)]
+        for X, y, test in batches():
+            for j, sketch in enumerate(sketches):
+                sketch.update(X[~test, j])
+        if sketches[0].n == 0:
+            return None
+        qs = np.linspace(0, 1, MAX_BINS + 1)[1:-1]
+        edges = [np.unique(sketch.quantiles(qs)) for sketch in sketches]
+        binner = QuantileBinner(edges)
+
+        # Проход 2: коды корзин обучающих строк (1 байт на значение вместо 8).
+        # Бустинг обучается в памяти: больше max_rows строк - случайная выборка
+        rows = sketches[0].n
+        fraction = min(1.0, max_rows / rows)
+        if fraction < 1.0:
+            print(f"Внимание: обучающих строк {rows}, бустинг обучается на случайной "
+                  f"выборке около {max_rows} ({100 * fraction:.1f}%).")
+        rng = np.random.default_rng(42)
+        codes, targets = [], []
+        for X, y, test in batches():
+            train = ~test
+            if fraction < 1.0:
+                train &= rng.random(len(y)) < fraction
+            codes.append(binner.transform(X[train]).astype('uint8'))
+            targets.append(y[train].astype('float32'))
+        booster = HistGradientBoostingRegressor(max_bins=MAX_BINS, random_state=42)
+        booster.fit(np.concatenate(codes), np.concatenate(targets))
+        return make_pipeline(binner, booster)
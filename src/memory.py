@@ -0,0 +1,140 @@
+import numpy as np
+import pandas as pd
+from pandas.api.types import (is_bool_dtype, is_integer_dtype, is_float_dtype,
+                              is_object_dtype, is_string_dtype, infer_dtype, union_categoricals)
+from .cache import HAS_ARROW
+
+# Строки превращаются в category, если уникальных значений не больше этой доли
+CATEGORY_RATIO = 0.5
+
+
+def memory_usage(df):
+    """Размер таблицы в байтах (включая строки внутри объектов)."""
+    return int(df.memory_usage(deep=True).sum())
+
+
+def _optimize_column(series, category_ratio):
+    """Компактный вариант колонки без потери значений (или сама колонка)."""
+    dtype = series.dtype
+    if is_bool_dtype(dtype) or isinstance(dtype, pd.CategoricalDtype):
+        return series
+    if is_integer_dtype(dtype):
+        return pd.to_numeric(series, downcast='integer')
+    if is_float_dtype(dtype) and isinstance(dtype, np.dtype):
+        values = series.to_numpy()
+        present = values[~np.isnan(values)]
+        if present.size and np.isfinite(present).all() and (present == np.round(present)).all() \
+                and np.abs(present).max() < 2 ** 53:
+            # Целые числа, которые стали float только из-за пропусков -> nullable Int
+            if present.size < len(values):
+                return pd.to_numeric(series.astype('Int64'), downcast='integer')
+            return pd.to_numeric(series.astype('int64'), downcast='integer')
+        if dtype != np.float32:
+            compact = values.astype('float32')
+            # float32 только если все значения представимы точно
+            same = (compact.astype('float64') == values) | np.isnan(values)
+            if same.all():
+                return series.astype('float32')
+        return series
+    if is_object_dtype(dtype) or is_string_dtype(dtype):
+        if infer_dtype(series, skipna=True) != "string":
+            return series
+        present = series.count()
+        if present and series.nunique() <= category_ratio * present:
+            return series.astype('category')
+        if HAS_ARROW and is_object_dtype(dtype):
+            return series.astype('string[pyarrow]')
+    return series
+
+
+def optimize_dtypes(df, category_ratio=CATEGORY_RATIO):
+    """Сжимает типы колонок без потери значений.
+
+    - целые понижаются до int8/int16/int32;
+    - дробные, у которых все значения целые (float из-за пропусков), - в
+      nullable Int8/Int16/...; остальные - во float32, если он хранит все
+      значения точно;
+    - строки с небольшим числом разных значений - в category (остальные -
+      в строки Arrow, если установлен pyarrow).
+    Возвращает (новая таблица, отчет по колонкам).
+    """
+    converted = {}
+    rows = []
+    for col in df.columns:
+        series = df[col]
+        compact = _optimize_column(series, category_ratio)
+        before = int(series.memory_usage(index=False, deep=True))
+        after = int(compact.memory_usage(index=False, deep=True)) if compact is not series else before
+        if compact is not series and after < before:
+            converted[col] = compact
+        else:
+            compact, after = series, before
+        rows.append({'Колонка': col, 'Тип до': str(series.dtype), 'Тип после': str(compact.dtype),
+                     'Байт до': before, 'Байт после': after})
+    if converted:
+        # Поверхностная копия: несжатые колонки остаются общими с исходной таблицей
+        df = df.copy(deep=False)
+        for col, series in converted.items():
+            df[col] = series
+    return df, pd.DataFrame(rows).set_index('Колонка')
+
+
+def _missing_column(like, n):
+    """Колонка из n пропусков того же типа, что like (если тип хранит пропуски)."""
+    return like.iloc[:0].reset_index(drop=True).reindex(range(n))
+
+
+def _append_column(old, new):
+    """Колонка old с дописанной new; тип old сохраняется, если new в него помещается без потерь."""
+    if isinstance(old.dtype, pd.CategoricalDtype) and (
+            isinstance(new.dtype, pd.CategoricalDtype) or infer_dtype(new, skipna=True) in ("string", "empty")):
+        # Категории объединяются, а не превращают колонку в object
+        new = new if isinstance(new.dtype, pd.CategoricalDtype) else new.astype('category')
+        try:
+            return pd.Series(union_categoricals([old.array, new.array]))
+        except TypeError:
+            pass
+    elif new.dtype != old.dtype:
+        try:
+            cast = new.astype(old.dtype)
+            same = (cast.to_numpy(dtype=object) == new.to_numpy(dtype=object)) | (cast.isna() & new.isna()).to_numpy()
+            if same.all():
+                new = cast
+        except (TypeError, ValueError, OverflowError):
+            pass
+    return pd.concat([old, new], ignore_index=True)
+
+
+def append_rows(df, new_rows, category_ratio=CATEGORY_RATIO):
+    """Дописывает строки new_rows к df без расширения компактных типов df.
+
+    Новые строки сначала сжимаются (optimize_dtypes), затем по колонкам
+    приводятся к типу df, если значения помещаются без потерь; у category
+    объединяются категории (union_categoricals). Иначе тип колонки - общий
+    для обеих частей, как у pd.concat (int8 с int16 - int16, а не int64).
+    Колонки, которых нет в одной из частей, там заполняются пропусками.
+    """
+    new_rows, _ = optimize_dtypes(new_rows, category_ratio)
+    new_rows = new_rows.reset_index(drop=True)
+    columns = list(df.columns) + [col for col in new_rows.columns if col not in df.columns]
+    data = {}
+    for col in columns:
+        old = df[col].reset_index(drop=True) if col in df.columns else \
+            _missing_column(new_rows[col], len(df))
+        new = new_rows[col] if col in new_rows.columns else _missing_column(old, len(new_rows))
+        data[col] = _append_column(old, new)
+    return pd.DataFrame(data, columns=columns)
+
+
+def memory_report(report):
+    """Строки отчета: изменившиеся колонки и общий итог."""
+    lines = []
+    changed = report[report['Тип до'] != report['Тип после']]
+    for col, row in changed.iterrows():
+        lines.append(f"[Память] {col}: {row['Тип до']} -> {row['Тип после']}, "
+                     f"{row['Байт до'] / 1024:.1f} КБ -> {row['Байт после'] / 1024:.1f} КБ")
+    before, after = report['Байт до'].sum(), report['Байт после'].sum()
+    saved = 100 * (1 - after / before) if before else 0.0
+    lines.append(f"[Память] Таблица: {before / 1024 ** 2:.2f} МБ -> {after / 1024 ** 2:.2f} МБ "
+                 f"(-{saved:.0f}%), сжато колонок: {len(changed)}")
+    return lines
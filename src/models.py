@@ -0,0 +1,141 @@
+import os
+import json
+import time
+import hashlib
+import numpy as np
+import pandas as pd
+import joblib
+from .loader import ChunkedCSV, DEFAULT_CHUNKSIZE
+
+# Папка сохраненных моделей по умолчанию
+MODELS_DIR = os.path.join(".cache", "models")
+# Сколько места на диске могут занимать модели (в мегабайтах)
+DEFAULT_MODELS_BUDGET_MB = 512
+
+
+def data_fingerprint(data):
+    """Хэш содержимого таблицы (значения, индекс и названия колонок)."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(json.dumps([str(c) for c in data.columns]).encode("utf-8"))
+    digest.update(pd.util.hash_pandas_object(data, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+class ModelRegistry:
+    """Обученные модели на диске (joblib), чтобы не обучать одно и то же заново.
+
+    Ключ модели - хэш данных, на которых она обучалась, плюс цель,
+    признаки, тип модели и гиперпараметры. Рядом с моделью лежит JSON с
+    описанием и метриками. Если модели занимают больше бюджета, удаляются
+    те, которые дольше всего не использовались (LRU).
+    """
+
+    def __init__(self, models_dir=MODELS_DIR, budget_mb=DEFAULT_MODELS_BUDGET_MB):
+        self.models_dir = models_dir
+        self.budget = budget_mb * 1024 * 1024
+
+    def key(self, fingerprint, target, features, model_type, params):
+        payload = json.dumps({"data": fingerprint, "target": target, "features": list(features),
+                              "model_type": model_type, "params": params},
+                             sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+    def _paths(self, key):
+        base = os.path.join(self.models_dir, key)
+        return base + ".joblib", base + ".json"
+
+    def _write_meta(self, key, meta):
+        _, meta_path = self._paths(key)
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2, default=str)
+
+    def entries(self):
+        """Описания сохраненных моделей, от недавно использованных к старым."""
+        if not os.path.isdir(self.models_dir):
+            return []
+        metas = []
+        for name in os.listdir(self.models_dir):
+            if name.endswith(".json"):
+                with open(os.path.join(self.models_dir, name), encoding="utf-8") as f:
+                    metas.append(json.load(f))
+        return sorted(metas, key=lambda meta: meta["last_used"], reverse=True)
+
+    def get(self, key):
+        """Модель и ее описание или (None, None), если такой модели нет."""
+        model_path, meta_path = self._paths(key)
+        if not (os.path.exists(model_path) and os.path.exists(meta_path)):
+            return None, None
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        model = joblib.load(model_path)
+        meta["last_used"] = time.time()
+        self._write_meta(key, meta)
+        return model, meta
+
+    def put(self, key, model, meta):
+        """Сохраняет модель; возвращает число удаленных старых моделей."""
+        os.makedirs(self.models_dir, exist_ok=True)
+        model_path, _ = self._paths(key)
+        # Пишем во временный файл и переименовываем, чтобы не оставить полузаписанную модель
+        tmp = f"{model_path}.tmp-{os.getpid()}"
+        joblib.dump(model, tmp)
+        os.replace(tmp, model_path)
+        now = time.time()
+        meta = dict(meta, key=key, size=os.path.getsize(model_path), created=now, last_used=now)
+        self._write_meta(key, meta)
+        return self.evict(keep=key)
+
+    def remove(self, key):
+        for path in self._paths(key):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def evict(self, keep=None):
+        """Удаляет давно не использованные модели, пока суммарный размер больше бюджета."""
+        metas = self.entries()
+        total = sum(meta["size"] for meta in metas)
+        removed = 0
+        for meta in reversed(metas):
+            if total <= self.budget:
+                break
+            if meta["key"] == keep:
+                continue
+            self.remove(meta["key"])
+            total -= meta["size"]
+            removed += 1
+        return removed
+
+    def score(self, key, path, output_path=None, chunksize=DEFAULT_CHUNKSIZE):
+        """Прогноз сохраненной моделью для строк нового CSV без переобучения.
+
+        Файл читается по частям. Строки, где не хватает признаков, получают
+        пустой прогноз. Если задан output_path, исходные строки с колонкой
+        прогноза пишутся в CSV и возвращается число строк; иначе
+        возвращается таблица с прогнозами.
+        """
+        model, meta = self.get(key)
+        if model is None:
+            raise KeyError(f"Модель {key} не найдена.")
+        features = meta["features"]
+        column = f"prediction_{meta['target']}"
+        parts = []
+        rows = 0
+        for i, chunk in enumerate(ChunkedCSV(path, chunksize=chunksize)):
+            missing = [col for col in features if col not in chunk.columns]
+            if missing:
+                raise KeyError(f"В файле нет признаков: {', '.join(missing)}")
+            X = chunk[features].apply(pd.to_numeric, errors="coerce")
+            complete = X.notna().all(axis=1).to_numpy()
+            prediction = np.full(len(chunk), np.nan)
+            if complete.any():
+                # Модель обучалась на таблице с этими колонками - передаем так же
+                prediction[complete] = model.predict(X[complete])
+            chunk = chunk.assign(**{column: prediction})
+            rows += len(chunk)
+            if output_path:
+                chunk.to_csv(output_path, mode="w" if i == 0 else "a", header=i == 0, index=False)
+            else:
+                parts.append(chunk)
+        if output_path:
+            return rows
+        return pd.concat(parts) if parts else pd.DataFrame()
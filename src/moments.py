@@ -0,0 +1,221 @@
+import numpy as np
+
+
+class MomentAccumulator:
+    """Накопитель моментов сразу для всех колонок (векторно, за один проход).
+
+    Хранит для каждой колонки количество, среднее, центральные суммы M2..M4,
+    минимум и максимум. Два накопителя можно объединить (merge) без потери
+    точности - это позволяет считать статистику по чанкам или в разных
+    процессах, а потом сложить результаты. Формулы объединения - Pébay (2008).
+    """
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        k = len(self.columns)
+        self.n = np.zeros(k)
+        self.mean = np.zeros(k)
+        self.m2 = np.zeros(k)
+        self.m3 = np.zeros(k)
+        self.m4 = np.zeros(k)
+        self.min = np.full(k, np.inf)
+        self.max = np.full(k, -np.inf)
+
+    @classmethod
+    def from_array(cls, x, columns):
+        """Моменты по двумерному массиву (строки x колонки), NaN пропускаются."""
+        acc = cls(columns)
+        x = np.asarray(x, dtype='float64')
+        if x.size == 0:
+            return acc
+        mask = ~np.isnan(x)
+        n = mask.sum(axis=0).astype('float64')
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.where(mask, x, 0.0).sum(axis=0) / n
+            d = np.where(mask, x - mean, 0.0)
+            d2 = d * d
+            acc.m2 = d2.sum(axis=0)
+            acc.m3 = (d2 * d).sum(axis=0)
+            acc.m4 = (d2 * d2).sum(axis=0)
+        acc.n = n
+        acc.mean = np.where(n > 0, mean, 0.0)
+        acc.min = np.where(mask, x, np.inf).min(axis=0)
+        acc.max = np.where(mask, x, -np.inf).max(axis=0)
+        return acc
+
+    @classmethod
+    def from_groups(cls, x, starts, columns):
+        """Моменты каждой группы сразу: строки x отсортированы по группам,
+        starts - номера первых строк групп. Массивы накопителя - (группы x колонки).
+        """
+        acc = cls(columns)
+        x = np.asarray(x, dtype='float64')
+        mask = ~np.isnan(x)
+        sizes = np.diff(np.r_[starts, len(x)])
+        n = np.add.reduceat(mask, starts, axis=0).astype('float64')
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = np.add.reduceat(np.where(mask, x, 0.0), starts, axis=0) / n
+            d = np.where(mask, x - np.repeat(mean, sizes, axis=0), 0.0)
+            d2 = d * d
+            acc.m2 = np.add.reduceat(d2, starts, axis=0)
+            acc.m3 = np.add.reduceat(d2 * d, starts, axis=0)
+            acc.m4 = np.add.reduceat(d2 * d2, starts, axis=0)
+        acc.n = n
+        acc.mean = np.where(n > 0, mean, 0.0)
+        acc.min = np.minimum.reduceat(np.where(mask, x, np.inf), starts, axis=0)
+        acc.max = np.maximum.reduceat(np.where(mask, x, -np.inf), starts, axis=0)
+        return acc
+
+    def update(self, x):
+        """Добавляет новый блок строк (например, очередной чанк)."""
+        self.merge(MomentAccumulator.from_array(x, self.columns))
+        return self
+
+    def merge(self, other):
+        """Объединяет с другим накопителем по тем же колонкам (на месте)."""
+        na, nb = self.n, other.n
+        n = na + nb
+        with np.errstate(invalid='ignore', divide='ignore'):
+            delta = other.mean - self.mean
+            d_n = np.where(n > 0, delta / n, 0.0)
+            d_n2 = d_n * d_n
+            term1 = delta * d_n * na * nb
+
+            mean = self.mean + d_n * nb
+            m2 = self.m2 + other.m2 + term1
+            m3 = (self.m3 + other.m3 + term1 * d_n * (na - nb)
+                  + 3 * d_n * (na * other.m2 - nb * self.m2))
+            m4 = (self.m4 + other.m4 + term1 * d_n2 * (na * na - na * nb + nb * nb)
+                  + 6 * d_n2 * (na * na * other.m2 + nb * nb * self.m2)
+                  + 4 * d_n * (na * other.m3 - nb * self.m3))
+
+        self.n, self.mean, self.m2, self.m3, self.m4 = n, mean, m2, m3, m4
+        self.min = np.minimum(self.min, other.min)
+        self.max = np.maximum(self.max, other.max)
+        return self
+
+    def var(self):
+        """Несмещенная дисперсия (ddof=1), как в pandas."""
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(self.n > 1, self.m2 / (self.n - 1), np.nan)
+
+    def std(self):
+        return np.sqrt(self.var())
+
+    def skew(self):
+        """Несмещенная асимметрия, как в pandas.Series.skew()."""
+        n = self.n
+        with np.errstate(invalid='ignore', divide='ignore'):
+            g1 = np.sqrt(n) * self.m3 / self.m2 ** 1.5
+            result = np.sqrt(n * (n - 1)) / (n - 2) * g1
+        return np.where((n >= 3) & (self.m2 > 0), result, np.nan)
+
+    def kurt(self):
+        """Несмещенный эксцесс, как в pandas.Series.kurt()."""
+        n = self.n
+        with np.errstate(invalid='ignore', divide='ignore'):
+            g2 = n * self.m4 / self.m2 ** 2 - 3
+            result = (n - 1) / ((n - 2) * (n - 3)) * ((n + 1) * g2 + 6)
+        return np.where((n >= 4) & (self.m2 > 0), result, np.nan)
+
+    def get_min(self):
+        return np.where(self.n > 0, self.min, np.nan)
+
+    def get_max(self):
+        return np.where(self.n > 0, self.max, np.nan)
+
+    def get_mean(self):
+        return np.where(self.n > 0, self.mean, np.nan)
+
+
+def sorted_columns(x):
+    """Сортирует все колонки одним вызовом; NaN уходят в конец каждой колонки."""
+    s = np.sort(np.asarray(x, dtype='float64'), axis=0)
+    counts = (~np.isnan(s)).sum(axis=0)
+    return s, counts
+
+
+def quantiles_from_sorted(s, counts, q):
+    """Квантиль q для каждой колонки отсортированного массива (линейная интерполяция, как в pandas)."""
+    k = s.shape[1]
+    result = np.full(k, np.nan)
+    has = counts > 0
+    if not has.any() or s.shape[0] == 0:
+        return result
+    pos = (counts[has] - 1) * q
+    lo = np.floor(pos).astype(int)
+    hi = np.minimum(lo + 1, counts[has] - 1)
+    frac = pos - lo
+    idx = np.flatnonzero(has)
+    low_val = s[lo, idx]
+    high_val = s[hi, idx]
+    result[has] = low_val + (high_val - low_val) * frac
+    return result
+
+
+def modes_from_sorted(s, counts):
+    """Мода каждой колонки по отсортированному массиву (при равенстве - наименьшее значение)."""
+    k = s.shape[1]
+    result = np.full(k, np.nan)
+    for j in range(k):
+        values = s[:counts[j], j]
+        if len(values) == 0:
+            continue
+        # Начала серий одинаковых значений
+        starts = np.flatnonzero(np.r_[True, values[1:] != values[:-1]])
+        lengths = np.diff(np.r_[starts, len(values)])
+        result[j] = values[starts[lengths.argmax()]]
+    return result
+
+
+def sorted_within_groups(x, group):
+    """Сортирует каждую колонку внутри групп (group - номера групп, строки уже
+    упорядочены по группам); NaN уходят в конец своей группы."""
+    x = np.asarray(x, dtype='float64')
+    s = np.empty_like(x)
+    # Каждая группа - непрерывный блок строк: один np.sort на блок сразу по всем
+    # колонкам намного быстрее lexsort по (группа, значение) для каждой колонки
+    bounds = np.flatnonzero(np.r_[True, group[1:] != group[:-1], True]) if len(group) else []
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        s[lo:hi] = np.sort(x[lo:hi], axis=0)
+    return s
+
+
+def grouped_quantiles(s, starts, counts, q):
+    """Квантиль q каждой колонки в каждой группе (как quantiles_from_sorted).
+
+    s - результат sorted_within_groups, counts - число значений без NaN
+    (группы x колонки).
+    """
+    result = np.full(counts.shape, np.nan)
+    has = counts > 0
+    if not has.any():
+        return result
+    g, j = np.nonzero(has)
+    pos = (counts[g, j] - 1) * q
+    lo = np.floor(pos).astype(int)
+    hi = np.minimum(lo + 1, counts[g, j] - 1)
+    low_val = s[starts[g] + lo, j]
+    high_val = s[starts[g] + hi, j]
+    result[g, j] = low_val + (high_val - low_val) * (pos - lo)
+    return result
+
+
+def grouped_modes(s, group, starts, counts):
+    """Мода каждой колонки в каждой группе (при равенстве - наименьшее значение)."""
+    result = np.full(counts.shape, np.nan)
+    position = np.arange(len(s)) - starts[group]
+    for j in range(s.shape[1]):
+        valid = position < counts[group, j]
+        values, groups = s[valid, j], group[valid]
+        if len(values) == 0:
+            continue
+        # Серии одинаковых значений внутри группы
+        run_starts = np.flatnonzero(np.r_[True, (values[1:] != values[:-1]) | (groups[1:] != groups[:-1])])
+        lengths = np.diff(np.r_[run_starts, len(values)])
+        run_groups = groups[run_starts]
+        # По группе, затем по убыванию длины серии, затем по значению (серии уже по возрастанию)
+        order = np.lexsort((run_starts, -lengths, run_groups))
+        first = order[np.r_[True, run_groups[order][1:] != run_groups[order][:-1]]]
+        result[run_groups[first], j] = values[run_starts[first]]
+    return result
@@ -0,0 +1,226 @@
+import numpy as np
+from .transforms import (OUTLIER_LABELS, convert_columns, conversion_message,
+                         outlier_reference, outlier_keep_mask, duplicated_rows,
+                         text_columns, fill_missing)
+from .memory import optimize_dtypes, memory_report
+from .imputation import Imputer, IMPUTE_LABELS, imputation_report
+from .profiling import stage, count_rows, format_record
+
+STEP_LABELS = {
+    "remove_duplicates": "Удалить дубликаты",
+    "remove_missing_values": "Удалить строки с пропусками",
+    "fill_missing_values": "Заполнить пропуски",
+    "convert_to_numeric": "Текст -> числа",
+    "convert_to_datetime": "Текст -> даты",
+    "remove_outliers": "Удалить выбросы",
+    "optimize_memory": "Сжать типы колонок",
+}
+CONVERT_STEPS = {"convert_to_numeric": "numeric", "convert_to_datetime": "datetime"}
+
+
+class CleaningPlan:
+    """Ленивый план очистки: шаги записываются, а выполняются только в execute().
+
+    При выполнении соседние совместимые шаги сливаются в стадии:
+    - подряд идущие преобразования типов - один проход по текстовым колонкам;
+    - подряд идущие шаги над строками (дубликаты, пропуски, заполнение,
+      выбросы) - один общий скан пропусков и одна общая маска строк,
+      таблица материализуется один раз в конце стадии.
+    Каждый шаг внутри стадии видит только строки, оставшиеся после
+    предыдущих шагов, поэтому результат совпадает с пошаговым выполнением.
+    """
+
+    def __init__(self):
+        self.steps = []
+
+    def add(self, name, **params):
+        self.steps.append((name, params))
+
+    def __len__(self):
+        return len(self.steps)
+
+    def stages(self):
+        """Разбивает план на стадии: список пар (тип стадии, шаги)."""
+        stages = []
+        for name, params in self.steps:
+            if name in CONVERT_STEPS:
+                kind = "coerce"
+            elif name == "optimize_memory":
+                kind = "optimize"
+            else:
+                kind = "rows"
+            if stages and stages[-1][0] == kind:
+                stages[-1][1].append((name, params))
+            else:
+                stages.append((kind, [(name, params)]))
+        return stages
+
+    def describe(self):
+        """Текстовое описание плана (логические шаги и стадии после слияния)."""
+        if not self.steps:
+            return "План пуст."
+        lines = ["Шаги плана:"]
+        for i, (name, params) in enumerate(self.steps, 1):
+            lines.append(f"  {i}. {_step_text(name, params)}")
+        lines.append("Будет выполнено (после слияния):")
+        for i, (kind, steps) in enumerate(self.stages(), 1):
+            names = ", ".join(_step_text(name, params) for name, params in steps)
+            if kind == "coerce":
+                lines.append(f"  Стадия {i}: один проход по текстовым колонкам [{names}]")
+            elif kind == "optimize":
+                lines.append(f"  Стадия {i}: {names}")
+            else:
+                lines.append(f"  Стадия {i}: один скан пропусков, одна маска строк [{names}]")
+        return "\n".join(lines)
+
+    def execute(self, df, log, **convert_options):
+        """Выполняет план над таблицей; log - функция записи в историю.
+
+        convert_options передаются в convert_columns (размер пула и т.п.).
+        """
+        for kind, steps in self.stages():
+            with stage(f"CleaningPlan.{kind}", count_rows(df)) as record:
+                if kind == "coerce":
+                    df = _run_coerce_stage(df, steps, log, **convert_options)
+                elif kind == "optimize":
+                    # Подряд идущие сжатия равносильны одному
+                    df, report = optimize_dtypes(df)
+                    for line in memory_report(report):
+                        log(line)
+                else:
+                    df = _run_rows_stage(df, steps, log)
+                record['rows_out'] = count_rows(df)
+            log(format_record(record))
+        return df
+
+
+def _step_text(name, params):
+    text = STEP_LABELS[name]
+    if name == "remove_duplicates" and params.get("subset"):
+        text += f" (по колонкам: {', '.join(params['subset'])})"
+    if name == "fill_missing_values":
+        if params.get("fitted"):
+            text += f" (сохраненными значениями из {params['fitted']})"
+        else:
+            text += f" ({IMPUTE_LABELS[params.get('strategy', 'mean')]}"
+            if params.get("group_by"):
+                group_by = params["group_by"]
+                text += f" по группам {group_by if isinstance(group_by, str) else ', '.join(group_by)}"
+            text += ")"
+    if name == "remove_outliers":
+        mode = ", по очереди" if params.get("sequential") else ""
+        text += f" ({OUTLIER_LABELS[params['method']]} > {params['threshold']}{mode})"
+    return text
+
+
+def _run_coerce_stage(df, steps, log, **convert_options):
+    """Все преобразования типов стадии: одна копия таблицы в конце."""
+    kinds = []
+    for name, _ in steps:
+        if CONVERT_STEPS[name] not in kinds:
+            kinds.append(CONVERT_STEPS[name])
+    converted = {}
+    remaining = text_columns(df)
+    # Как и при пошаговом выполнении: колонку забирает первое подошедшее преобразование
+    for kind in kinds:
+        for result in convert_columns(df, remaining, kind, **convert_options):
+            if result['converted'] is not None:
+                converted[result['column']] = result['converted']
+                log(conversion_message(result, kind))
+        remaining = [col for col in remaining if col not in converted]
+    if converted:
+        df = df.assign(**converted)
+    return df
+
+
+def _run_rows_stage(df, steps, log):
+    """Шаги над строками с общей маской и одним сканом пропусков."""
+    numeric_cols = df.select_dtypes(include=['number']).columns
+    num_idx = [df.columns.get_loc(col) for col in numeric_cols]
+    keep = np.ones(len(df), dtype=bool)
+    isna = df.isna().to_numpy()
+    x = df[numeric_cols].to_numpy(dtype='float64')
+    work = df
+    pending_fill = {}
+
+    for name, params in steps:
+        before = int(keep.sum())
+        if name == "remove_missing_values":
+            keep &= ~isna.any(axis=1)
+            log(f"[Очистка] Удалено строк с пустыми значениями: {before - int(keep.sum())}")
+
+        elif name == "fill_missing_values" and (params.get("strategy", "mean") != "mean"
+                                                or params.get("group_by") or params.get("fitted")):
+            if pending_fill:
+                work = _fill(work, pending_fill, log)
+                pending_fill = {}
+            if not keep.all():
+                # Значения по группам считаются только по оставшимся строкам
+                work, x, isna, keep = work[keep], x[keep], isna[keep], keep[keep]
+            if params.get("fitted"):
+                imputer = Imputer.load(params["fitted"])
+            else:
+                imputer = Imputer.from_data(work, params.get("strategy", "mean"), params.get("group_by"))
+            work, report = imputer.transform(work)
+            for line in imputation_report(imputer, report):
+                log(line)
+            isna = work.isna().to_numpy()
+            x = work[numeric_cols].to_numpy(dtype='float64', na_value=np.nan)
+
+        elif name == "fill_missing_values":
+            missing = isna[keep][:, num_idx].sum(axis=0) if num_idx else []
+            for j, col in enumerate(numeric_cols):
+                if missing[j] == 0:
+                    continue
+                values = x[keep, j]
+                values = values[~np.isnan(values)]
+                mean_val = values.mean() if len(values) else np.nan
+                if not np.isnan(mean_val):
+                    x[:, j] = np.where(np.isnan(x[:, j]), mean_val, x[:, j])
+                    isna[:, num_idx[j]] = np.isnan(x[:, j])
+                    pending_fill[col] = mean_val
+                log(f"[Очистка] В колонке '{col}' пропуски заменены на {mean_val:.2f}")
+
+        elif name == "remove_duplicates":
+            if pending_fill:
+                # Дубликаты ищутся уже по заполненным значениям
+                work = _fill(work, pending_fill, log)
+                pending_fill = {}
+            subset, hashed = params.get("subset"), params.get("hashed", True)
+            if keep.all():
+                keep &= ~duplicated_rows(work, subset, hashed)
+            else:
+                dup = np.zeros(len(keep), dtype=bool)
+                dup[keep] = duplicated_rows(work[keep], subset, hashed)
+                keep &= ~dup
+            log(f"[Очистка] Удалено дубликатов: {before - int(keep.sum())}")
+
+        elif name == "remove_outliers" and len(numeric_cols) > 0:
+            method, threshold = params["method"], params["threshold"]
+            if params.get("sequential"):
+                for j in range(x.shape[1]):
+                    col = x[:, j:j + 1]
+                    low, high, scale = outlier_reference(col[keep], method)
+                    if scale[0] > 0:
+                        keep &= outlier_keep_mask(col, method, threshold, low, high, scale)
+            else:
+                low, high, scale = outlier_reference(x if keep.all() else x[keep], method)
+                valid = scale > 0
+                keep &= outlier_keep_mask(x[:, valid], method, threshold,
+                                          low[valid], high[valid], scale[valid])
+            log(f"[Очистка] Удалено строк с выбросами ({OUTLIER_LABELS[method]} > {threshold}): "
+                f"{before - int(keep.sum())}")
+
+    if pending_fill:
+        work = _fill(work, pending_fill, log)
+    if not keep.all():
+        work = work[keep]
+    return work
+
+
+def _fill(df, values, log):
+    df, cast = fill_missing(df, values)
+    for col in cast:
+        log(f"[Память] Колонка '{col}' переведена в {df[col].dtype} "
+            f"(целый тип не хранит дробное среднее)")
+    return df
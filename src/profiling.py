@@ -0,0 +1,279 @@
+import io
+import os
+import sys
+import json
+import time
+import pstats
+import cProfile
+import functools
+import threading
+import contextlib
+import tracemalloc
+from collections import deque
+import pandas as pd
+
+try:
+    import psutil
+    HAS_PSUTIL = True
+except ImportError:
+    HAS_PSUTIL = False
+
+try:
+    import resource
+    HAS_RESOURCE = True
+except ImportError:
+    HAS_RESOURCE = False
+
+MB = 1024 ** 2
+# Сколько последних этапов хранит журнал (более старые вытесняются)
+MAX_RECORDS = 10_000
+# Сколько строк "[Профиль]" instrument оставляет в истории объекта
+HISTORY_LINES = 50
+PROFILE_PREFIX = "[Профиль]"
+
+
+def _rss():
+    """Текущий размер процесса в памяти (RSS) в байтах или None, если узнать нельзя."""
+    if HAS_PSUTIL:
+        return psutil.Process().memory_info().rss
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _max_rss():
+    """Максимальный RSS процесса за все время работы (байты) или None."""
+    if not HAS_RESOURCE:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # В Linux - килобайты, в macOS - байты
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def count_rows(data):
+    """Число строк таблицы (для потока и прочих объектов - None: считать их дорого)."""
+    return len(data) if isinstance(data, pd.DataFrame) else None
+
+
+class Profiler:
+    """Журнал этапов работы: время, CPU, память и строки на входе/выходе.
+
+    Время (wall и CPU) и RSS записываются всегда - это дешево. Пиковое
+    выделение памяти (tracemalloc) включается trace_memory=True: оно
+    заметно замедляет numpy/pandas. profile=True - каждый этап верхнего
+    уровня выполняется под cProfile, профиль самого медленного
+    сохраняется (dump_slowest). Этапы могут быть вложенными (plan ->
+    шаги), у записи есть depth и parent.
+
+    Журнал хранит не больше max_records последних этапов. Стек вложенных
+    этапов у каждого потока свой (этапы вызываются и из пулов потоков);
+    tracemalloc общий для процесса, поэтому пик памяти этапа, который шел
+    одновременно с другими потоками, включает и их выделения.
+    """
+
+    def __init__(self, trace_memory=False, profile=False, max_records=MAX_RECORDS,
+                 history_lines=HISTORY_LINES):
+        self.trace_memory = trace_memory
+        self.profile = profile
+        self.max_records = max_records
+        self.history_lines = history_lines
+        self.records = deque(maxlen=max_records)
+        self.slowest = None
+        self._local = threading.local()
+        # tracemalloc включен этим журналом (а не внешним кодом) - его и выключаем,
+        # когда закончится последний этап с замером памяти во всех потоках
+        self._started_tracing = False
+        self._tracing_stages = 0
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+
+    @property
+    def _stack(self):
+        """Стек открытых этапов текущего потока."""
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def clear(self):
+        self.records = deque(maxlen=self.max_records)
+        self.slowest = None
+        self._origin = time.perf_counter()
+
+    @contextlib.contextmanager
+    def stage(self, name, rows_in=None):
+        """Контекст этапа: with profiler.stage("Загрузка") as record: ...
+
+        Внутри можно записать record['rows_out'] (и любые другие поля).
+        Запись попадает в records после выхода из блока, даже при ошибке.
+        """
+        stack = self._stack
+        parent = stack[-1] if stack else None
+        record = {
+            'name': name,
+            'depth': len(stack),
+            'parent': parent['name'] if parent else None,
+            'rows_in': rows_in,
+            'rows_out': None,
+        }
+        memory = self.trace_memory
+        if memory:
+            with self._lock:
+                if not tracemalloc.is_tracing():
+                    tracemalloc.start()
+                    self._started_tracing = True
+                self._tracing_stages += 1
+            current, peak = tracemalloc.get_traced_memory()
+            if parent is not None:
+                # Пик родителя до начала вложенного этапа, иначе reset_peak его потеряет
+                parent['_peak'] = max(parent.get('_peak', 0), peak)
+            tracemalloc.reset_peak()
+            record['_base'] = current
+            record['_peak'] = current
+        profiler = None
+        if self.profile and parent is None:
+            profiler = cProfile.Profile()
+        stack.append(record)
+        rss_before = _rss()
+        start = time.perf_counter()
+        cpu_start = time.process_time()
+        if profiler:
+            profiler.enable()
+        try:
+            yield record
+        except BaseException as e:
+            record['error'] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            if profiler:
+                profiler.disable()
+            record['wall'] = time.perf_counter() - start
+            record['cpu'] = time.process_time() - cpu_start
+            record['start'] = start - self._origin
+            stack.pop()
+            rss_after = _rss()
+            record['rss_mb'] = rss_after / MB if rss_after is not None else None
+            record['rss_delta_mb'] = (rss_after - rss_before) / MB if rss_after is not None else None
+            max_rss = _max_rss()
+            record['max_rss_mb'] = max_rss / MB if max_rss is not None else None
+            if memory:
+                peak = max(record.pop('_peak'), tracemalloc.get_traced_memory()[1])
+                record['peak_alloc_mb'] = (peak - record.pop('_base')) / MB
+                if parent is not None:
+                    parent['_peak'] = max(parent.get('_peak', 0), peak)
+                tracemalloc.reset_peak()
+                with self._lock:
+                    self._tracing_stages -= 1
+                    if not self._tracing_stages and self._started_tracing:
+                        tracemalloc.stop()
+                        self._started_tracing = False
+            else:
+                record['peak_alloc_mb'] = None
+            with self._lock:
+                if profiler and (self.slowest is None or record['wall'] > self.slowest[0]['wall']):
+                    self.slowest = (record, profiler)
+                self.records.append(record)
+
+    def instrument(self, name=None, skip_lazy=True):
+        """Декоратор метода: каждый вызов - этап.
+
+        Строки на входе и выходе берутся из self.df до и после вызова.
+        Если у объекта есть history (DataCleaner), строка с итогом этапа
+        добавляется туда (остаются history_lines последних). Вызовы в ленивом режиме (только запись шага в
+        план) не замеряются, если не задан skip_lazy=False.
+        """
+        def decorator(method):
+            label = name or method.__name__
+
+            @functools.wraps(method)
+            def wrapper(obj, *args, **kwargs):
+                if skip_lazy and getattr(obj, "lazy", False):
+                    return method(obj, *args, **kwargs)
+                stage_name = f"{type(obj).__name__}.{label}"
+                with self.stage(stage_name, count_rows(getattr(obj, "df", None))) as record:
+                    result = method(obj, *args, **kwargs)
+                    record['rows_out'] = count_rows(getattr(obj, "df", None))
+                if isinstance(getattr(obj, "history", None), list):
+                    self._add_to_history(obj.history, format_record(record))
+                return result
+            return wrapper
+        return decorator
+
+    def _add_to_history(self, history, line):
+        """Добавляет строку профиля в историю, убирая самые старые строки профиля сверх лимита."""
+        history.append(line)
+        if self.history_lines is None:
+            return
+        profiled = [i for i, item in enumerate(history)
+                    if isinstance(item, str) and item.startswith(PROFILE_PREFIX)]
+        for i in reversed(profiled[:max(len(profiled) - self.history_lines, 0)]):
+            del history[i]
+
+    def frame(self):
+        """Записи в виде таблицы (в порядке начала этапов)."""
+        columns = ['name', 'depth', 'start', 'wall', 'cpu', 'peak_alloc_mb', 'rss_mb',
+                   'rss_delta_mb', 'rows_in', 'rows_out']
+        records = sorted(self.records, key=lambda r: r['start'])
+        return pd.DataFrame(records, columns=columns)
+
+    def to_jsonl(self, path):
+        """Записи - по одной JSON строке на этап."""
+        with open(path, "w", encoding="utf-8") as f:
+            for record in sorted(self.records, key=lambda r: r['start']):
+                f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        return path
+
+    def to_chrome_trace(self, path):
+        """Файл для chrome://tracing или Perfetto (события 'X', время в микросекундах)."""
+        pid = os.getpid()
+        events = []
+        for record in self.records:
+            events.append({
+                'name': record['name'],
+                'cat': record['name'].split('.')[0],
+                'ph': 'X',
+                'ts': record['start'] * 1e6,
+                'dur': record['wall'] * 1e6,
+                'pid': pid,
+                'tid': 0,
+                'args': {k: v for k, v in record.items() if k not in ('name', 'start', 'wall')},
+            })
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, f, ensure_ascii=False, default=str)
+        return path
+
+    def dump_slowest(self, path, limit=20):
+        """Сохраняет cProfile самого медленного этапа (.prof для snakeviz/pstats).
+
+        Возвращает (имя этапа, текст с limit самыми затратными функциями)
+        или None, если профилирование было выключено.
+        """
+        if self.slowest is None:
+            return None
+        record, profiler = self.slowest
+        profiler.dump_stats(path)
+        text = io.StringIO()
+        pstats.Stats(profiler, stream=text).sort_stats("cumulative").print_stats(limit)
+        return record['name'], text.getvalue()
+
+
+def format_record(record):
+    """Одна строка для истории и экрана: время, CPU, память, строки."""
+    parts = [f"{record['wall']:.3f} с (CPU {record['cpu']:.3f} с)"]
+    if record.get('peak_alloc_mb') is not None:
+        parts.append(f"пик памяти +{record['peak_alloc_mb']:.1f} МБ")
+    elif record.get('rss_delta_mb') is not None:
+        parts.append(f"RSS {record['rss_delta_mb']:+.1f} МБ")
+    if record.get('rows_in') is not None and record.get('rows_out') is not None:
+        parts.append(f"строк {record['rows_in']} -> {record['rows_out']}")
+    if record.get('error'):
+        parts.append(f"ошибка: {record['error']}")
+    return f"{PROFILE_PREFIX} {record['name']}: " + ", ".join(parts)
+
+
+# Общий журнал программы: все модули пишут этапы сюда
+PROFILER = Profiler()
+instrument = PROFILER.instrument
+stage = PROFILER.stage
@@ -0,0 +1,241 @@
+import warnings
+import numpy as np
+import pandas as pd
+from scipy.stats import norm
+from .loader import is_stream
+
+SAMPLE_METHODS = {
+    "uniform": "равномерная",
+    "stratified": "по слоям колонки",
+    "reservoir": "резервуар (один проход по потоку)",
+}
+# Размер выборки по умолчанию: графики и статистика по ней считаются за доли секунды
+DEFAULT_SAMPLE_SIZE = 100_000
+# Уровень доверия для интервалов
+CONFIDENCE = 0.95
+
+
+def _allocate(sizes, n):
+    """Пропорциональное распределение n строк по слоям размеров sizes.
+
+    Остаток после округления вниз отдается слоям с наибольшей дробной
+    частью; каждый непустой слой получает хотя бы одну строку - она
+    забирается у слоя, получившего больше всего сверх своей доли, так что
+    всего строк по-прежнему n (если слоев не больше n).
+    """
+    sizes = np.asarray(sizes, dtype='int64')
+    n = min(n, int(sizes.sum()))
+    exact = n * sizes / max(sizes.sum(), 1)
+    quota = np.floor(exact).astype('int64')
+    rest = n - int(quota.sum())
+    quota[np.argsort(quota - exact, kind='stable')[:rest]] += 1
+    empty = (quota == 0) & (sizes > 0)
+    quota[empty] = 1
+    for _ in range(int(empty.sum())):
+        donors = np.flatnonzero(quota > 1)
+        if not len(donors):
+            break
+        quota[donors[np.argmax(quota[donors] - exact[donors])]] -= 1
+    return quota
+
+
+def _smallest_per_stratum(keys, codes, quota):
+    """Номера строк с наименьшими ключами в каждом слое (не больше quota[слой])."""
+    order = np.lexsort((keys, codes))
+    sorted_codes = codes[order]
+    starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+    first = np.repeat(starts, np.diff(np.r_[starts, len(order)]))
+    rank = np.arange(len(order)) - first
+    return order[rank < quota[sorted_codes]]
+
+
+def _bottom_k(chunks, strata, quota, seed):
+    """Выборка за один проход: каждой строке - случайный ключ, в каждом слое
+    остаются строки с наименьшими ключами (резервуар со случайными ключами).
+
+    strata(chunk) - номера слоев строк чанка, quota - сколько строк взять из
+    слоя. Чанк сначала отсеивается по порогу (наибольшему ключу слоя в
+    резервуаре), поэтому с резервуаром объединяются только строки-кандидаты.
+    Возвращает (строки в порядке файла, число строк в потоке).
+    """
+    rng = np.random.default_rng(seed)
+    kept, keys, codes, positions = None, np.empty(0), np.empty(0, int), np.empty(0, int)
+    threshold = np.full(len(quota), np.inf)
+    total = 0
+    for chunk in chunks:
+        chunk_keys = rng.random(len(chunk))
+        chunk_codes = strata(chunk)
+        candidates = np.flatnonzero(chunk_keys < threshold[chunk_codes])
+        chunk_positions = total + candidates
+        total += len(chunk)
+        if not len(candidates):
+            continue
+        part = chunk.iloc[candidates]
+        kept = part if kept is None else pd.concat([kept, part])
+        keys = np.r_[keys, chunk_keys[candidates]]
+        codes = np.r_[codes, chunk_codes[candidates]]
+        positions = np.r_[positions, chunk_positions]
+        select = _smallest_per_stratum(keys, codes, quota)
+        kept, keys, codes, positions = kept.iloc[select], keys[select], codes[select], positions[select]
+        # Слой заполнен - новые строки проходят, только если их ключ меньше наибольшего в слое
+        full = np.bincount(codes, minlength=len(quota)) >= quota
+        largest = np.full(len(quota), -np.inf)
+        np.maximum.at(largest, codes, keys)
+        threshold = np.where(full, largest, np.inf)
+    if kept is None:
+        return None, total
+    order = np.argsort(positions)
+    return kept.iloc[order].reset_index(drop=True), total
+
+
+def _empty(data):
+    return data.sample(0) if is_stream(data) else data.iloc[:0]
+
+
+def _chunks(data, chunksize):
+    if is_stream(data):
+        return iter(data)
+    return (data.iloc[start:start + chunksize] for start in range(0, len(data), chunksize))
+
+
+class Sample:
+    """Выборка строк таблицы и оценки по ней с доверительными интервалами.
+
+    df - строки выборки (в порядке исходной таблицы), population - число
+    строк всей таблицы. Для выборки по слоям strata - размеры слоев всей
+    таблицы (по значениям column): среднее тогда взвешивается по слоям.
+    """
+
+    def __init__(self, df, method, population, column=None, strata=None, seed=None):
+        self.df = df
+        self.method = method
+        self.population = population
+        self.column = column
+        self.strata = strata
+        self.seed = seed
+
+    @property
+    def fraction(self):
+        return len(self.df) / self.population if self.population else 1.0
+
+    def describe(self):
+        label = SAMPLE_METHODS[self.method]
+        if self.column is not None:
+            label += f" '{self.column}'"
+        return (f"[Выборка] {label}: {len(self.df)} из {self.population} строк "
+                f"({100 * self.fraction:.2f}%)")
+
+    def confidence_intervals(self, columns=None, level=CONFIDENCE):
+        """Оценки средних и медиан всей таблицы по выборке с интервалами уровня level.
+
+        Интервал среднего - нормальное приближение с поправкой на конечную
+        таблицу (1 - доля выборки); для выборки по слоям - взвешенное по
+        размерам слоев среднее и дисперсия (стратифицированная оценка).
+        Интервал медианы - по порядковым статистикам (без предположений о
+        распределении); для выборки по слоям медиана не взвешивается, и
+        интервала у нее нет.
+        """
+        if columns is None:
+            columns = self.df.select_dtypes(include=['number']).columns.tolist()
+        columns = [col for col in columns if col != self.column]
+        z = norm.ppf(0.5 + level / 2)
+        x = self.df[columns].to_numpy(dtype='float64', na_value=np.nan)
+        if self.strata is not None:
+            mean, se = self._stratified_mean(columns)
+        else:
+            n = (~np.isnan(x)).sum(axis=0)
+            with np.errstate(invalid='ignore', divide='ignore'), warnings.catch_warnings():
+                # Колонка без значений: среднее и ошибка - NaN
+                warnings.simplefilter("ignore", RuntimeWarning)
+                mean = np.nanmean(x, axis=0) if len(x) else np.full(len(columns), np.nan)
+                std = np.nanstd(x, axis=0, ddof=1) if len(x) > 1 else np.full(len(columns), np.nan)
+                se = std / np.sqrt(n) * np.sqrt(max(1 - self.fraction, 0.0))
+        s = np.sort(x, axis=0)
+        counts = (~np.isnan(s)).sum(axis=0)
+        median = np.full(len(columns), np.nan)
+        low = np.full(len(columns), np.nan)
+        high = np.full(len(columns), np.nan)
+        for j, m in enumerate(counts):
+            if m == 0:
+                continue
+            median[j] = np.median(s[:m, j])
+            if self.strata is None:
+                # Порядковые статистики с номерами m/2 -+ z*sqrt(m)/2 (биномиальное приближение)
+                half = z * np.sqrt(m) / 2
+                low[j] = s[max(int(np.floor(m / 2 - half)) - 1, 0), j]
+                high[j] = s[min(int(np.ceil(m / 2 + half)), m - 1), j]
+        return pd.DataFrame({
+            'Среднее': mean,
+            'Ошибка среднего': se,
+            'Среднее: от': mean - z * se,
+            'Среднее: до': mean + z * se,
+            'Медиана': median,
+            'Медиана: от': low,
+            'Медиана: до': high,
+            'Значений': counts,
+        }, index=pd.Index(columns, name='Колонка'))
+
+    def _stratified_mean(self, columns):
+        """Среднее и его ошибка по слоям: сумма W_h * среднее_h, сумма W_h^2 (1 - f_h) s_h^2 / n_h."""
+        grouped = self.df.groupby(self.column, dropna=False, observed=True)[columns]
+        means, variances, counts = grouped.mean(), grouped.var(ddof=1).fillna(0.0), grouped.count()
+        sizes = self.strata.reindex(means.index).to_numpy(dtype='float64')[:, None]
+        weights = sizes / self.strata.sum()
+        with np.errstate(invalid='ignore', divide='ignore'):
+            fpc = np.clip(1 - counts.to_numpy() / sizes, 0.0, 1.0)
+            mean = np.nansum(weights * means.to_numpy(), axis=0)
+            var = np.nansum(weights ** 2 * fpc * variances.to_numpy() / counts.to_numpy(), axis=0)
+        return mean, np.sqrt(var)
+
+
+def draw_sample(data, size=DEFAULT_SAMPLE_SIZE, method="uniform", column=None, seed=None,
+                chunksize=100_000):
+    """Выборка из таблицы в памяти или из потока (ChunkedCSV).
+
+    uniform - size случайных строк без повторов (для потока - два прохода:
+    подсчет строк и выбор); stratified - пропорционально размерам слоев
+    колонки column, каждый слой представлен хотя бы одной строкой (для
+    потока сначала читается только колонка column); reservoir - один проход
+    без знания числа строк заранее. Поток целиком в память не загружается.
+    """
+    if method not in SAMPLE_METHODS:
+        raise ValueError(f"Неизвестный способ выборки: {method}")
+    if method == "stratified":
+        if column is None:
+            raise ValueError("Для выборки по слоям нужна колонка.")
+        values = data.column(column) if is_stream(data) else data[column]
+        strata = values.value_counts(dropna=False, sort=False)
+        quota = _allocate(strata.to_numpy(), size)
+        index = strata.index
+
+        def codes(chunk):
+            result = index.get_indexer(chunk[column])
+            if (result < 0).any():
+                # Иначе строка попала бы в последний слой (номер -1)
+                unknown = chunk[column][result < 0].unique()[:5]
+                raise ValueError(f"Значения колонки '{column}' не совпадают с подсчитанными слоями "
+                                 f"(например, {', '.join(map(repr, unknown))}): файл изменился "
+                                 f"во время чтения или типы колонки в частях разные.")
+            return result
+
+        df, total = _bottom_k(_chunks(data, chunksize), codes, quota, seed)
+        return Sample(_empty(data) if df is None else df, method, total, column, strata, seed)
+
+    if method == "reservoir":
+        df, total = _bottom_k(_chunks(data, chunksize), lambda chunk: np.zeros(len(chunk), dtype=int),
+                              np.array([size]), seed)
+        return Sample(_empty(data) if df is None else df, method, total, seed=seed)
+
+    total = data.count_rows() if is_stream(data) else len(data)
+    rng = np.random.default_rng(seed)
+    positions = np.sort(rng.choice(total, size=min(size, total), replace=False))
+    if not is_stream(data):
+        return Sample(data.iloc[positions].reset_index(drop=True), method, total, seed=seed)
+    parts, offset = [], 0
+    for chunk in data:
+        lo, hi = np.searchsorted(positions, [offset, offset + len(chunk)])
+        if hi > lo:
+            parts.append(chunk.iloc[positions[lo:hi] - offset])
+        offset += len(chunk)
+    df = pd.concat(parts, ignore_index=True) if parts else _empty(data)
+    return Sample(df, method, total, seed=seed)
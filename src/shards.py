@@ -0,0 +1,188 @@
+import os
+import glob
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_bool_dtype, is_integer_dtype, is_numeric_dtype
+
+MB = 1024 ** 2
+
+
+def expand_shards(source):
+    """Список файлов-частей: папка (все *.csv в ней) или шаблон пути (glob)."""
+    if os.path.isdir(source):
+        source = os.path.join(source, "*.csv")
+    return sorted(path for path in glob.glob(source) if os.path.isfile(path))
+
+
+def is_shard_source(source):
+    """Путь - папка или шаблон с *, ? или [ ] (а не один файл)."""
+    return os.path.isdir(source) or glob.has_magic(source)
+
+
+def _parse_shard(path):
+    """Разбирает одну часть (в рабочем процессе); ошибка не прерывает остальные."""
+    result = {'path': path, 'frame': None, 'error': None}
+    start = time.perf_counter()
+    try:
+        result['bytes'] = os.path.getsize(path)
+        result['frame'] = pd.read_csv(path)
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {str(e).strip()}"
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+
+def _common_dtype(dtypes, has_gaps):
+    """Общий тип колонки по типам в частях.
+
+    has_gaps - в части файлов колонки нет (или она целиком пустая), там
+    будут пропуски: целые тогда становятся float64 (как при обычном
+    read_csv), логические - nullable boolean. Целые вместе с дробными -
+    float64, числа вместе с текстом - object.
+    """
+    if not dtypes:
+        return np.dtype('float64')
+    if all(is_bool_dtype(d) for d in dtypes):
+        return 'boolean' if has_gaps else np.dtype('bool')
+    if any(is_bool_dtype(d) or not is_numeric_dtype(d) for d in dtypes):
+        return np.dtype('object')
+    if all(is_integer_dtype(d) for d in dtypes) and not has_gaps:
+        return np.dtype('int64')
+    return np.dtype('float64')
+
+
+def _reconcile(frames):
+    """Общая схема: колонки в порядке первого появления и их общие типы.
+
+    Возвращает (колонки, {колонка: тип}, строки отчета о расхождениях).
+    Пустые в части колонки не влияют на тип: read_csv читает их как float64.
+    """
+    columns, votes, gaps = [], {}, {}
+    for frame in frames:
+        for col in frame.columns:
+            if col not in votes:
+                columns.append(col)
+                votes[col], gaps[col] = [], 0
+    for frame in frames:
+        present = frame.notna().any() if len(frame) else pd.Series(False, index=frame.columns)
+        for col in columns:
+            if col not in frame.columns or not present[col]:
+                gaps[col] += len(frame) > 0
+            elif frame[col].dtype not in votes[col]:
+                votes[col].append(frame[col].dtype)
+    dtypes, notes = {}, []
+    for col in columns:
+        missing = sum(col not in frame.columns for frame in frames)
+        dtypes[col] = _common_dtype(votes[col], gaps[col] > 0)
+        if missing:
+            notes.append(f"[Загрузка] Колонки '{col}' нет в {missing} файлах - там пропуски")
+        if len(votes[col]) > 1:
+            seen = ", ".join(str(d) for d in votes[col])
+            notes.append(f"[Загрузка] Колонка '{col}': типы в частях {seen} -> {dtypes[col]}")
+    return columns, dtypes, notes
+
+
+def _assemble(frames, columns, dtypes):
+    """Собирает части в одну таблицу без повторных pd.concat.
+
+    Под каждую колонку один раз выделяется массив на все строки, части
+    копируются в свои срезы; часть отпускается сразу после копирования,
+    поэтому пик памяти - примерно итоговая таблица плюс одна часть.
+    """
+    total = sum(len(frame) for frame in frames)
+    buffers, masks = {}, {}
+    for col in columns:
+        dtype = dtypes[col]
+        if dtype == 'boolean':
+            buffers[col] = np.zeros(total, dtype='bool')
+            masks[col] = np.ones(total, dtype='bool')
+        elif dtype == 'float64':
+            buffers[col] = np.full(total, np.nan)
+        elif dtype == 'object':
+            buffers[col] = np.full(total, np.nan, dtype='object')
+        else:
+            buffers[col] = np.empty(total, dtype=dtype)
+    offset = 0
+    while frames:
+        frame = frames.pop(0)
+        end = offset + len(frame)
+        for col in frame.columns:
+            series = frame[col]
+            if dtypes[col] == 'boolean':
+                present = series.notna().to_numpy()
+                buffers[col][offset:end][present] = series[present].astype('bool').to_numpy()
+                masks[col][offset:end] = ~present
+            elif dtypes[col] == 'object' and series.isna().all():
+                continue
+            elif dtypes[col] == 'float64':
+                buffers[col][offset:end] = series.to_numpy(dtype='float64', na_value=np.nan)
+            else:
+                buffers[col][offset:end] = series.to_numpy(dtype=buffers[col].dtype)
+        offset = end
+        del frame
+    data = {}
+    for col in columns:
+        if col in masks:
+            data[col] = pd.arrays.BooleanArray(buffers[col], masks[col])
+        else:
+            data[col] = buffers[col]
+    return pd.DataFrame(data, columns=columns, copy=False)
+
+
+def load_shards(source, workers=None):
+    """Загружает таблицу, разбитую на много CSV файлов (папка или шаблон пути).
+
+    Части разбираются параллельно в пуле процессов, схемы сводятся в одну
+    (недостающие колонки - пропуски, расхождения типов - общий тип, см.
+    _common_dtype), итог собирается за одно копирование. Файл, который не
+    удалось прочитать, пропускается и отмечается в отчете.
+    Возвращает (таблица, отчет по файлам, строки о расхождениях схем).
+    """
+    paths = expand_shards(source)
+    if not paths:
+        raise FileNotFoundError(f"По пути '{source}' не найдено ни одного CSV файла.")
+    if workers is None:
+        workers = min(len(paths), os.cpu_count() or 1)
+    if workers <= 1 or len(paths) == 1:
+        results = [_parse_shard(path) for path in paths]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # Части небольшие - отдаем их процессам пачками, меньше накладных расходов
+            results = list(pool.map(_parse_shard, paths, chunksize=max(1, len(paths) // (workers * 4))))
+
+    rows = []
+    for result in results:
+        frame, seconds = result['frame'], result['seconds']
+        n = len(frame) if frame is not None else 0
+        size = result.get('bytes', 0) / MB
+        rows.append({'Файл': result['path'], 'Строк': n, 'МБ': size, 'Секунд': seconds,
+                     'Строк/с': n / seconds if frame is not None and seconds > 0 else np.nan,
+                     'МБ/с': size / seconds if frame is not None and seconds > 0 else np.nan,
+                     'Статус': 'ок' if result['error'] is None else 'ошибка',
+                     'Ошибка': result['error'] or ''})
+    report = pd.DataFrame(rows).set_index('Файл')
+
+    frames = [result.pop('frame') for result in results if result['error'] is None]
+    if not frames:
+        raise ValueError(f"Не удалось прочитать ни одного файла из {len(paths)}.")
+    columns, dtypes, notes = _reconcile(frames)
+    return _assemble(frames, columns, dtypes), report, notes
+
+
+def shard_report(report):
+    """Строки отчета: файлы с ошибками и общая скорость разбора."""
+    lines = []
+    failed = report[report['Статус'] != 'ок']
+    for path, row in failed.iterrows():
+        lines.append(f"[Загрузка] Пропущен файл {path}: {row['Ошибка']}")
+    ok = report[report['Статус'] == 'ок']
+    seconds = ok['Секунд'].sum()
+    lines.append(f"[Загрузка] Прочитано файлов: {len(ok)} из {len(report)}, строк: {int(ok['Строк'].sum())}, "
+                 f"{ok['МБ'].sum():.1f} МБ")
+    if len(ok) and seconds > 0:
+        lines.append(f"[Загрузка] Разбор: {ok['Строк'].sum() / seconds:.0f} строк/с, "
+                     f"{ok['МБ'].sum() / seconds:.1f} МБ/с на процесс "
+                     f"(самый медленный файл: {ok['Секунд'].idxmax()}, {ok['Секунд'].max():.3f} с)")
+    return lines
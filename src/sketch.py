@@ -0,0 +1,203 @@
+import math
+import numpy as np
+
+# Эмпирические константы оценки погрешности KLL (как в Apache DataSketches):
+# нормированная ошибка ранга с вероятностью 99% = COEF / k ** EXP
+_RANK_ERROR_COEF = 2.296
+_RANK_ERROR_EXP = 0.9723
+# Минимальная вместимость одного уровня
+_MIN_WIDTH = 8
+# Во сколько раз уменьшается вместимость на каждом более низком уровне
+_CAPACITY_DECAY = 2 / 3
+
+
+def k_for_epsilon(epsilon):
+    """Подбирает параметр k так, чтобы ошибка ранга была не больше epsilon."""
+    return max(_MIN_WIDTH, math.ceil((_RANK_ERROR_COEF / epsilon) ** (1 / _RANK_ERROR_EXP)))
+
+
+class KLLSketch:
+    """Приближенные квантили за ограниченную память (скетч KLL).
+
+    Вместо всей колонки хранится около 3k значений, разложенных по уровням:
+    значение на уровне h "весит" 2**h исходных. Когда уровень переполняется,
+    он сортируется и половина значений (через одно) поднимается выше.
+
+    Гарантия: ранг любого ответа отличается от точного не больше чем на
+    epsilon * n (с вероятностью 99%). Скетчи можно объединять (merge),
+    поэтому их удобно считать по чанкам или в разных процессах.
+    """
+
+    def __init__(self, epsilon=0.01, seed=42):
+        self.epsilon = epsilon
+        self.k = k_for_epsilon(epsilon)
+        self.levels = [np.empty(0)]
+        self.n = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(_MIN_WIDTH, int(math.ceil(self.k * _CAPACITY_DECAY ** depth)))
+
+    def update(self, values):
+        """Добавляет массив значений (NaN пропускаются)."""
+        values = np.asarray(values, dtype='float64').ravel()
+        values = values[~np.isnan(values)]
+        if values.size == 0:
+            return self
+        self.n += values.size
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+        return self
+
+    def merge(self, other):
+        """Объединяет с другим скетчем (на месте)."""
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for h, items in enumerate(other.levels):
+            self.levels[h] = np.concatenate([self.levels[h], items])
+        self.n += other.n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.epsilon = max(self.epsilon, other.epsilon)
+        self._compress()
+        return self
+
+    def _compress(self):
+        h = 0
+        while h < len(self.levels):
+            items = self.levels[h]
+            if len(items) > self._capacity(h):
+                if h + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(items)
+                # При нечетном размере одно значение остается на уровне
+                keep = items[:len(items) % 2]
+                rest = items[len(items) % 2:]
+                offset = self._rng.integers(2)
+                self.levels[h + 1] = np.concatenate([self.levels[h + 1], rest[offset::2]])
+                self.levels[h] = keep
+            h += 1
+
+    def _weighted_items(self):
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(lvl), 2.0 ** h) for h, lvl in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        return items[order], weights[order]
+
+    def quantiles(self, qs):
+        """Приближенные квантили для списка долей qs."""
+        qs = np.atleast_1d(np.asarray(qs, dtype='float64'))
+        if self.n == 0:
+            return np.full(len(qs), np.nan)
+        items, weights = self._weighted_items()
+        cum = np.cumsum(weights)
+        idx = np.searchsorted(cum, qs * cum[-1], side='left')
+        result = items[np.minimum(idx, len(items) - 1)]
+        # Крайние квантили известны точно
+        result = np.where(qs <= 0, self.min, result)
+        result = np.where(qs >= 1, self.max, result)
+        return result
+
+    def quantile(self, q):
+        return self.quantiles([q])[0]
+
+    def median_abs_deviation(self, center):
+        """Медиана |x - center| по тому же скетчу, без второго прохода по данным."""
+        if self.n == 0:
+            return np.nan
+        items, weights = self._weighted_items()
+        dev = np.abs(items - center)
+        order = np.argsort(dev, kind='stable')
+        cum = np.cumsum(weights[order])
+        idx = np.searchsorted(cum, 0.5 * cum[-1], side='left')
+        return dev[order][min(idx, len(dev) - 1)]
+
+    def weighted_sample(self):
+        """Значения скетча и их веса (например, для оценки плотности)."""
+        return self._weighted_items()
+
+    def rank_error(self):
+        """Гарантированная нормированная ошибка ранга (доля от n)."""
+        return _RANK_ERROR_COEF / self.k ** _RANK_ERROR_EXP
+
+    def retained(self):
+        return sum(len(lvl) for lvl in self.levels)
+
+
+# Число счетчиков частых значений на колонку по умолчанию
+MODE_CAPACITY = 1024
+
+
+class FrequentValues:
+    """Частые значения колонки в ограниченной памяти (алгоритм Мисры-Гриса).
+
+    Хранится не больше capacity пар (значение, счетчик). Пока разных
+    значений не больше capacity, счетчики точные. Когда их становится
+    больше, из всех счетчиков вычитается (capacity + 1)-й по величине, и
+    обнулившиеся значения забываются; сумма вычтенного (error) - граница
+    недосчета: точная частота любого значения лежит в [счетчик, счетчик + error],
+    а error <= n / (capacity + 1). Сводки можно объединять (merge).
+    """
+
+    def __init__(self, capacity=MODE_CAPACITY):
+        self.capacity = capacity
+        self.values = np.empty(0)
+        self.counts = np.empty(0, dtype='int64')
+        self.error = 0
+        self.n = 0
+
+    def update(self, values):
+        """Добавляет массив значений (NaN пропускаются)."""
+        values = np.asarray(values, dtype='float64').ravel()
+        values = values[~np.isnan(values)]
+        if values.size == 0:
+            return self
+        unique, counts = np.unique(values, return_counts=True)
+        self._combine(unique, counts)
+        self.n += values.size
+        return self
+
+    def merge(self, other):
+        """Объединяет с другой сводкой (на месте); границы ошибок складываются."""
+        self._combine(other.values, other.counts)
+        self.error += other.error
+        self.n += other.n
+        return self
+
+    def _combine(self, values, counts):
+        values, inverse = np.unique(np.concatenate([self.values, values]), return_inverse=True)
+        counts = np.bincount(inverse, weights=np.concatenate([self.counts, counts]),
+                             minlength=len(values)).astype('int64')
+        if len(values) > self.capacity:
+            cut = int(np.partition(counts, len(counts) - self.capacity - 1)[len(counts) - self.capacity - 1])
+            counts = counts - cut
+            keep = counts > 0
+            values, counts = values[keep], counts[keep]
+            self.error += cut
+        self.values, self.counts = values, counts
+
+    @property
+    def exact(self):
+        return self.error == 0
+
+    def mode(self):
+        """Мода (при равенстве - наименьшее значение) или NaN, если она не определена точно.
+
+        Пока счетчики точные, мода точная. Иначе значение возвращается,
+        только если оно заведомо самое частое: его счетчик больше, чем
+        второй счетчик плюс error (у колонок с множеством почти
+        неповторяющихся значений моды тогда нет).
+        """
+        if len(self.counts) == 0:
+            return np.nan
+        # values отсортированы, argmax дает наименьшее из равных
+        j = int(np.argmax(self.counts))
+        if self.exact:
+            return self.values[j]
+        second = np.partition(self.counts, -2)[-2] if len(self.counts) > 1 else 0
+        return self.values[j] if self.counts[j] > second + self.error else np.nan
@@ -0,0 +1,287 @@
+import itertools
+import numpy as np
+from .loader import is_stream
+
+# Источник номеров версий колонок (общий на процесс, номера не повторяются)
+_next_version = itertools.count(1).__next__
+
+# Бюджет памяти под снимки по умолчанию (в мегабайтах)
+DEFAULT_BUDGET_MB = 1024
+
+
+class Snapshot:
+    """Состояние таблицы без полной копии.
+
+    Снимок - это общая для многих снимков база (неизменяемая поверхностная
+    копия таблицы), номера оставшихся строк базы и только те колонки,
+    значения которых успели измениться. Удаление строк стоит 8 байт на
+    оставшуюся строку, замена колонки - размер одной колонки.
+    """
+
+    def __init__(self, base, rows=None, overrides=None, base_bytes=None, recipe=()):
+        self.base = base
+        self.rows = rows
+        self.overrides = overrides if overrides is not None else {}
+        # Шаги очистки, которые привели к этому состоянию: ((имя, параметры), ...)
+        self.recipe = tuple(recipe)
+        # Версии колонок: новая версия - когда меняются значения колонки или набор строк
+        self.versions = {}
+        # Таблица текущего состояния (та же, что у очистителя; хранится только
+        # у текущего снимка): колонки следующего шага сравниваются с ней по памяти
+        self.frame = None
+        if base_bytes is None and not is_stream(base):
+            base_bytes = int(base.memory_usage(deep=True).sum())
+        self.base_bytes = base_bytes or 0
+
+    @classmethod
+    def of(cls, df):
+        """Новый снимок, который сам становится базой."""
+        if is_stream(df):
+            # Поток неизменяем (pipe создает новый объект), поэтому хранится как есть
+            return cls(df, base_bytes=0)
+        return cls(df.copy(deep=False))
+
+    def columns(self):
+        return list(self.base.columns)
+
+    def index(self):
+        return self.base.index if self.rows is None else self.base.index.take(self.rows)
+
+    def column(self, col, positions=None):
+        """Колонка состояния (positions - дополнительная выборка строк)."""
+        if col in self.overrides:
+            series = self.overrides[col]
+            return series if positions is None else series.iloc[positions]
+        rows = self.rows
+        if positions is not None:
+            rows = positions if rows is None else rows[positions]
+        series = self.base[col]
+        return series if rows is None else series.iloc[rows]
+
+    def materialize(self):
+        """Собирает таблицу этого состояния."""
+        if is_stream(self.base):
+            return self.base
+        if self.rows is None:
+            df = self.base.copy(deep=False)
+        else:
+            df = self.base.take(self.rows)
+        for col, series in self.overrides.items():
+            df[col] = series.array
+        return df
+
+    def own_arrays(self):
+        """Массивы, которые принадлежат снимку (для подсчета памяти)."""
+        arrays = [] if self.rows is None else [self.rows]
+        return arrays + list(self.overrides.values())
+
+
+def _nbytes(obj):
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    return int(obj.memory_usage(index=False, deep=False))
+
+
+def _same_data(a, b):
+    """Одна и та же колонка в памяти (колонка не менялась, а делит буфер)."""
+    try:
+        x, y = a.to_numpy(), b.to_numpy()
+    except Exception:
+        return False
+    return (x.dtype == y.dtype and x.shape == y.shape and x.dtype != object
+            and x.__array_interface__['data'][0] == y.__array_interface__['data'][0])
+
+
+def _same_column(a, b):
+    """Колонка перенесена из прежней таблицы без изменений (тот же массив в памяти).
+
+    Обе таблицы живы, поэтому совпадение адреса означает общий буфер.
+    Шаги очистки не меняют таблицу на месте, так что общий буфер - те же значения.
+    """
+    if a.dtype != b.dtype or len(a) != len(b):
+        return False
+    if not isinstance(a.dtype, np.dtype):
+        return a.array is b.array
+    x, y = a.to_numpy(), b.to_numpy()
+    return (x.strides == y.strides
+            and x.__array_interface__['data'][0] == y.__array_interface__['data'][0])
+
+
+def _frame(df):
+    return None if is_stream(df) else df
+
+
+class SnapshotStore:
+    """Отмена/повтор шагов и именованные контрольные точки в пределах бюджета памяти.
+
+    Снимки разных шагов делят базу и неизмененные колонки. Если суммарный
+    размер превышает бюджет, самые старые снимки вытесняются: сначала
+    история отмены, затем история повтора, затем контрольные точки.
+    """
+
+    def __init__(self, df, budget_mb=DEFAULT_BUDGET_MB, recipe=()):
+        self.budget = budget_mb * 1024 * 1024
+        self.current = Snapshot.of(df)
+        self.current.recipe = tuple(recipe)
+        self.current.frame = _frame(df)
+        self.current.versions = {col: _next_version() for col in self.current.columns()}
+        self.undo_stack = []
+        self.redo_stack = []
+        self.checkpoints = {}
+
+    def _describe(self, df, kind):
+        """Снимок нового состояния относительно текущего.
+
+        kind: 'rows' - шаг только удалял строки, 'columns' - только менял
+        колонки, None - неизвестно (проверяются и строки, и значения).
+        Колонка, которую шаг перенес из прежней таблицы, узнается по общему
+        массиву; значения сравниваются только у остальных колонок.
+        """
+        cur = self.current
+        if is_stream(df) or is_stream(cur.base) or list(df.columns) != list(cur.base.columns):
+            return Snapshot.of(df)
+
+        positions = None
+        if kind != "columns":
+            cur_index = cur.index()
+            if not (len(df) == len(cur_index) and df.index.equals(cur_index)):
+                if not cur_index.is_unique:
+                    return Snapshot.of(df)
+                positions = cur_index.get_indexer(df.index)
+                if (positions < 0).any():
+                    return Snapshot.of(df)
+        rows = cur.rows
+        if positions is not None:
+            rows = positions if rows is None else rows[positions]
+
+        prev = cur.frame if positions is None else None
+        if prev is not None and list(prev.columns) != list(df.columns):
+            prev = None
+
+        overrides = {}
+        for col in df.columns:
+            if kind == "rows":
+                # Значения не менялись: переносим только уже замененные колонки
+                if col in cur.overrides:
+                    overrides[col] = cur.column(col, positions)
+                continue
+            if prev is not None and _same_column(prev[col], df[col]):
+                if col in cur.overrides:
+                    overrides[col] = cur.overrides[col]
+                continue
+            ref = cur.column(col, positions)
+            new = df[col]
+            if _same_data(ref, new):
+                unchanged = True
+            else:
+                unchanged = new.dtype == ref.dtype and new.equals(ref)
+            if not unchanged:
+                overrides[col] = new
+            elif col in cur.overrides:
+                overrides[col] = ref
+        return Snapshot(cur.base, rows, overrides, cur.base_bytes)
+
+    def commit(self, df, label, kind=None, steps=()):
+        """Запоминает новое состояние после шага label. Возвращает число вытесненных снимков.
+
+        steps - шаги рецепта (имя, параметры), которые выполнил этот шаг.
+        """
+        new = self._describe(df, kind)
+        new.frame = _frame(df)
+        new.recipe = self.current.recipe + tuple(steps)
+        new.versions = self._versions(new)
+        self.current.frame = None
+        self.undo_stack.append((self.current, label))
+        self.current = new
+        self.redo_stack.clear()
+        return self._evict()
+
+    def _versions(self, new):
+        """Версии колонок нового состояния: прежние у колонок, которые не изменились.
+
+        Колонка не изменилась, если у снимков общая база, те же строки и
+        тот же объект замены (или замены нет у обоих). Удаление строк
+        меняет все колонки.
+        """
+        cur = self.current
+        same_rows = new.base is cur.base and new.rows is cur.rows
+        versions = {}
+        for col in new.columns():
+            unchanged = (same_rows and col in cur.versions
+                         and new.overrides.get(col) is cur.overrides.get(col))
+            versions[col] = cur.versions[col] if unchanged else _next_version()
+        return versions
+
+    def undo(self):
+        if not self.undo_stack:
+            return None, None
+        snapshot, label = self.undo_stack.pop()
+        self.redo_stack.append((self.current, label))
+        self.current.frame = None
+        self.current = snapshot
+        df = snapshot.materialize()
+        snapshot.frame = _frame(df)
+        return df, label
+
+    def redo(self):
+        if not self.redo_stack:
+            return None, None
+        snapshot, label = self.redo_stack.pop()
+        self.undo_stack.append((self.current, label))
+        self.current.frame = None
+        self.current = snapshot
+        df = snapshot.materialize()
+        snapshot.frame = _frame(df)
+        return df, label
+
+    def checkpoint(self, name):
+        self.checkpoints.pop(name, None)
+        self.checkpoints[name] = self.current
+        return self._evict()
+
+    def restore(self, name):
+        """Возвращает состояние контрольной точки (сам возврат тоже можно отменить)."""
+        if name not in self.checkpoints:
+            return None
+        self.undo_stack.append((self.current, f"возврат к '{name}'"))
+        self.current.frame = None
+        self.current = self.checkpoints[name]
+        self.redo_stack.clear()
+        df = self.current.materialize()
+        self.current.frame = _frame(df)
+        return df
+
+    def _all_snapshots(self):
+        snapshots = [self.current]
+        snapshots += [s for s, _ in self.undo_stack]
+        snapshots += [s for s, _ in self.redo_stack]
+        snapshots += list(self.checkpoints.values())
+        return snapshots
+
+    def memory_usage(self):
+        """Байты, занятые снимками (общие базы и колонки считаются один раз)."""
+        seen = set()
+        total = 0
+        for snapshot in self._all_snapshots():
+            if id(snapshot.base) not in seen:
+                seen.add(id(snapshot.base))
+                total += snapshot.base_bytes
+            for arr in snapshot.own_arrays():
+                if id(arr) not in seen:
+                    seen.add(id(arr))
+                    total += _nbytes(arr)
+        return total
+
+    def _evict(self):
+        evicted = 0
+        while self.memory_usage() > self.budget:
+            if self.undo_stack:
+                self.undo_stack.pop(0)
+            elif self.redo_stack:
+                self.redo_stack.pop(0)
+            elif self.checkpoints:
+                self.checkpoints.pop(next(iter(self.checkpoints)))
+            else:
+                break
+            evicted += 1
+        return evicted
@@ -1,51 +1,483 @@
+import os
+import warnings
+import functools
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import pandas as pd
+import joblib
+from .loader import is_stream, DEFAULT_CHUNKSIZE
+from .sketch import KLLSketch, FrequentValues, MODE_CAPACITY
+from .moments import (MomentAccumulator, sorted_columns, quantiles_from_sorted, modes_from_sorted,
+                      sorted_within_groups, grouped_quantiles, grouped_modes)
+from .correlation import (CORR_BLOCK, PairwiseSums, correlation_matrix, correlated_pairs,
+                          update_correlation)
+from .stats_cache import STATS_CACHE
+from .profiling import instrument
+
+# Начиная с такого числа групп статистика по группам считается в пуле процессов
+SHARD_MIN_GROUPS = 10_000
 
 class DataStats:
-    def __init__(self, df):
+    def __init__(self, df, approx=None, epsilon=0.01, state=None, versions=None, cache=STATS_CACHE):
         self.df = df
-        # Работаем только с числовыми колонками для статистики
-        self.numeric_df = self.df.select_dtypes(include=['number'])
+        # Накопленное состояние (IncrementalStats) для этой же таблицы: приближенная
+        # статистика и корреляция Пирсона берутся из него без прохода по данным
+        self.state = state
+        # Версии колонок (DataCleaner.column_versions): если заданы, результаты
+        # по колонкам запоминаются в cache и не пересчитываются, пока колонка не изменится
+        self.versions = versions
+        self.cache = cache
+        # Приближенный режим (скетчи квантилей). Для потока он включен всегда:
+        # точные квантили потребовали бы держать колонку целиком в памяти.
+        self.approx = is_stream(df) if approx is None else (approx or is_stream(df))
+        self.epsilon = epsilon
+        if is_stream(df):
+            # В потоковом режиме таблицы в памяти нет, запоминаем только имена колонок
+            self.numeric_cols = df.numeric_columns()
+        else:
+            # Работаем только с числовыми колонками; типы смотрим по пустому срезу,
+            # сами данные копируются только если понадобятся (numeric_df)
+            self.numeric_cols = self.df.iloc[:0].select_dtypes(include=['number']).columns.tolist()
+
+    @functools.cached_property
+    def numeric_df(self):
+        """Числовые колонки таблицы (None для потока)."""
+        if is_stream(self.df):
+            return None
+        return self.df[self.numeric_cols]
+
+    def _version_key(self, columns):
+        """Версии колонок для ключа кэша или None, если хоть одна неизвестна."""
+        if self.versions is None or self.cache is None:
+            return None
+        versions = tuple(self.versions.get(col) for col in columns)
+        return None if None in versions else versions
+
+    def _blocks(self, columns=None):
+        """Числовые данные блоками: чанки потока или срезы таблицы в памяти."""
+        if is_stream(self.df):
+            for chunk in self.df:
+                yield chunk[columns or self.numeric_cols]
+        else:
+            data = self.numeric_df if columns is None else self.df[columns]
+            for start in range(0, len(data), DEFAULT_CHUNKSIZE):
+                yield data.iloc[start:start + DEFAULT_CHUNKSIZE]
+
+    def get_moments(self):
+        """Накопитель моментов по всем числовым колонкам.
+
+        Его можно объединить (merge) с накопителем другого чанка или процесса.
+        """
+        if is_stream(self.df):
+            acc = MomentAccumulator(self.numeric_cols)
+            for block in self._blocks():
+                acc.update(block.to_numpy(dtype='float64'))
+            return acc
+        return MomentAccumulator.from_array(self.numeric_df.to_numpy(dtype='float64'), self.numeric_cols)
+
+    @instrument()
+    def get_basic_stats(self, group_by=None, workers=None, columns=None):
+        """Возвращает расширенную статистику (включая асимметрию и эксцесс).
 
-    def get_basic_stats(self):
-        """Возвращает расширенную статистику (включая асимметрию и эксцесс)."""
-        if self.numeric_df.empty:
+        Все колонки обрабатываются сразу как одна матрица: моменты считаются
+        за один проход, медиана, квартили и мода - по одной общей сортировке.
+        В приближенном режиме сортировки нет, квантили берутся из скетчей.
+        group_by - колонка или список колонок: статистика по каждой группе,
+        строки таблицы - (ключ группы, статистика). workers - число
+        процессов (по умолчанию пул включается при большом числе групп).
+        columns - только эти числовые колонки. Если заданы версии колонок,
+        считаются только колонки, которых еще нет в кэше.
+        """
+        if not self.numeric_cols:
             return "Нет числовых данных для анализа."
+        if group_by is not None:
+            if is_stream(self.df):
+                return "Статистика по группам доступна только для таблицы в памяти."
+            return self._grouped_basic_stats(group_by, workers)
+        columns = [col for col in (columns or self.numeric_cols) if col in self.numeric_cols]
+        if not columns:
+            return "Нет числовых данных для анализа."
+        if self.approx and self.state is not None and all(col in self.state.columns for col in columns):
+            return self.state.basic_stats()[columns]
+        if self._version_key(columns) is None:
+            return self._basic_stats(columns)
+
+        # По колонке на запись: шаг, изменивший одну колонку, сбрасывает только ее
+        mode = ("approx", self.epsilon) if self.approx else ("exact",)
+        keys = {col: ("basic", mode, col, self.versions[col]) for col in columns}
+        results = {col: self.cache.get(key) for col, key in keys.items()}
+        missing = [col for col in columns if results[col] is None]
+        if missing:
+            fresh = self._basic_stats(missing)
+            for col in missing:
+                results[col] = fresh[col]
+                self.cache.put(keys[col], fresh[col])
+        return pd.DataFrame(results)
 
-        stats = {}
-        for col in self.numeric_df.columns:
-            series = self.numeric_df[col]
-            
-            # Вычисляем IQR (Интерквартильный размах)
-            Q1 = series.quantile(0.25)
-            Q3 = series.quantile(0.75)
-            IQR = Q3 - Q1
+    def _basic_stats(self, columns):
+        if self.approx:
+            return self._approx_basic_stats(columns)
+        x = self.df[columns].to_numpy(dtype='float64')
+        acc = MomentAccumulator.from_array(x, columns)
+        mean = acc.get_mean()
 
+        s, counts = sorted_columns(x)
+        median = quantiles_from_sorted(s, counts, 0.5)
+        q1 = quantiles_from_sorted(s, counts, 0.25)
+        q3 = quantiles_from_sorted(s, counts, 0.75)
+        modes = modes_from_sorted(s, counts)
+
+        with warnings.catch_warnings():
+            # Для полностью пустых колонок nanmean/nanmedian предупреждают о пустом срезе
+            warnings.simplefilter("ignore", RuntimeWarning)
             # Среднее абсолютное отклонение (Mean Absolute Deviation)
-            mad_mean = (series - series.mean()).abs().mean()
-            
+            mad_mean = np.nanmean(np.abs(x - mean), axis=0)
             # Медианное абсолютное отклонение (Median Absolute Deviation) - требование преподавателя
-            mad_median = (series - series.median()).abs().median()
-
-            stats[col] = {
-                'Количество': series.count(),
-                'Среднее': series.mean(),
-                'Медиана': series.median(),
-                'Мода': series.mode()[0] if not series.mode().empty else "N/A",
-                'Минимум': series.min(),
-                'Максимум': series.max(),
-                'Стд. отклонение': series.std(),
-                'Дисперсия': series.var(),
-                'Mean AD (Ср. абс. откл)': mad_mean,
-                'Median AD (Мед. абс. откл)': mad_median,
-                'IQR (Интерквартильный)': IQR,
-                'Skew (Асимметрия)': series.skew(),
-                'Kurtosis (Эксцесс)': series.kurt()
-            }
-        return pd.DataFrame(stats)
-
-    def get_correlation(self):
-        """Возвращает матрицу корреляции Пирсона"""
-        if self.numeric_df.empty:
+            mad_median = np.nanmedian(np.abs(x - median), axis=0)
+
+        return _stats_frame(acc, {
+            'Медиана': median,
+            'Мода': [m if not np.isnan(m) else "N/A" for m in modes],
+            'Mean AD (Ср. абс. откл)': mad_mean,
+            'Median AD (Мед. абс. откл)': mad_median,
+            'IQR (Интерквартильный)': q3 - q1,
+        })
+
+    def _group_layout(self, group_by):
+        """Порядок строк по группам: (строки, номер группы строки, начала групп, ключи групп).
+
+        Строки с пустым ключом в группы не попадают (как в groupby).
+        """
+        grouped = self.df.groupby(group_by, sort=True, observed=True, dropna=True)
+        # При пропусках в ключе ngroup дает NaN (float) для таких строк
+        gid = grouped.ngroup().fillna(-1).to_numpy(dtype='int64')
+        keys = grouped.size().index
+        rows = np.flatnonzero(gid >= 0)
+        rows = rows[np.argsort(gid[rows], kind='stable')]
+        group = gid[rows]
+        starts = np.flatnonzero(np.r_[True, group[1:] != group[:-1]]) if len(group) else np.empty(0, int)
+        return rows, group, starts, keys
+
+    def _grouped(self, group_by, func, workers, *args):
+        """Применяет func к группам: одним векторным проходом или частями в пуле процессов.
+
+        Для большого числа групп (или явно заданного workers) группы делятся
+        на непрерывные диапазоны с примерно равным числом строк, и каждый
+        процесс получает только свои строки.
+        """
+        group_by = [group_by] if isinstance(group_by, str) else list(group_by)
+        cols = [c for c in self.numeric_cols if c not in group_by]
+        rows, group, starts, keys = self._group_layout(group_by)
+        x = self.df[cols].to_numpy(dtype='float64')[rows]
+        if workers is None:
+            workers = (os.cpu_count() or 1) if len(keys) >= SHARD_MIN_GROUPS else 1
+        shards = min(workers, len(keys))
+        if shards <= 1:
+            return cols, keys, [func(x, group, starts, cols, *args)]
+        # Границы частей - по группам, чтобы группа не делилась между процессами
+        bounds = np.searchsorted(starts, np.linspace(0, len(x), shards + 1)[1:-1])
+        bounds = np.unique(np.r_[0, bounds, len(starts)])
+        row_bounds = np.r_[starts, len(x)][bounds]
+        with ProcessPoolExecutor(max_workers=shards) as pool:
+            futures = [pool.submit(func, x[r0:r1], group[r0:r1] - g0, starts[g0:g1] - r0, cols, *args)
+                       for g0, g1, r0, r1 in zip(bounds[:-1], bounds[1:], row_bounds[:-1], row_bounds[1:])]
+            return cols, keys, [future.result() for future in futures]
+
+    def _grouped_basic_stats(self, group_by, workers):
+        cols, keys, parts = self._grouped(group_by, _group_stats, workers)
+        rows = {name: np.vstack([part[name] for part in parts]) for name in parts[0]}
+        # (группы x статистики x колонки) -> строки (ключ группы, статистика)
+        values = np.stack(list(rows.values()), axis=1).reshape(-1, len(cols))
+        index = _group_index(keys, list(rows), 'Статистика')
+        return pd.DataFrame(values, index=index, columns=cols)
+
+    def _grouped_correlation(self, group_by, method, dtype, workers):
+        cols, keys, parts = self._grouped(group_by, _group_correlations, workers, method, dtype)
+        matrices = [m for part in parts for m in part]
+        values = np.vstack(matrices) if matrices else np.empty((0, len(cols)))
+        index = _group_index(keys, cols, None)
+        return pd.DataFrame(values, index=index, columns=cols)
+
+
+    def get_quantile_sketches(self):
+        """Скетчи квантилей по всем числовым колонкам за один проход."""
+        sketches = [KLLSketch(self.epsilon) for _ in self.numeric_cols]
+        for block in self._blocks():
+            x = block.to_numpy(dtype='float64')
+            for i, sketch in enumerate(sketches):
+                sketch.update(x[:, i])
+        return dict(zip(self.numeric_cols, sketches))
+
+    def _approx_basic_stats(self, columns=None):
+        """Статистика за один проход по блокам в ограниченной памяти.
+
+        Блоки по очереди добавляются в накопленное состояние
+        (IncrementalStats): моменты, скетчи KLL и не больше MODE_CAPACITY
+        частых значений на колонку. Память не зависит от числа строк и
+        разных значений; мода колонки, где разных значений больше
+        MODE_CAPACITY, - "N/A", если самое частое значение не выделяется.
+        """
+        state = IncrementalStats(self.epsilon)
+        for block in self._blocks(columns):
+            state.update(block)
+        return state.basic_stats()
+
+    @instrument()
+    def get_correlation(self, method="pearson", dtype="float64", group_by=None, workers=None):
+        """Возвращает матрицу корреляции (pearson, spearman или kendall).
+
+        Пирсон - одно матричное произведение нормированных колонок, Спирмен -
+        то же по рангам. dtype='float32' быстрее и вдвое экономнее по памяти.
+        group_by - матрица для каждой группы, строки - (ключ группы, колонка).
+        """
+        if not self.numeric_cols:
             return "Нет данных для корреляции."
-        # corr() считает корреляцию Пирсона по умолчанию
-        return self.numeric_df.corr()
+        if group_by is not None:
+            if is_stream(self.df):
+                return "Корреляция по группам доступна только для таблицы в памяти."
+            return self._grouped_correlation(group_by, method, dtype, workers)
+        if self.approx and self.state is not None and method == "pearson" \
+                and all(col in self.state.columns for col in self.numeric_cols):
+            # Точная матрица для таблицы в памяти считается по данным (correlation_matrix)
+            return self.state.correlation().loc[self.numeric_cols, self.numeric_cols]
+        if is_stream(self.df):
+            if method != "pearson":
+                return "Для потока доступна только корреляция Пирсона (ранги требуют всей колонки)."
+            return self._stream_correlation()
+        versions = self._version_key(self.numeric_cols)
+        if versions is None:
+            return correlation_matrix(self.numeric_df.to_numpy(dtype='float64'), self.numeric_cols,
+                                      method, dtype)
+        return self._memoized_correlation(method, dtype, versions)
+
+    def _memoized_correlation(self, method, dtype, versions):
+        """Матрица из кэша; если изменились отдельные колонки - пересчет только их строк."""
+        cols = self.numeric_cols
+        key = ("corr", method, dtype, tuple(cols))
+        entry = self.cache.get(key)
+        if entry is not None and entry[0] == versions:
+            return pd.DataFrame(entry[1], index=cols, columns=cols)
+        x = self.numeric_df.to_numpy(dtype='float64')
+        if entry is not None:
+            # Изменение строк меняет версии всех колонок, поэтому строки у матриц общие
+            changed = [i for i, (old, new) in enumerate(zip(entry[0], versions)) if old != new]
+            corr = update_correlation(entry[1], x, changed, method, dtype)
+        else:
+            corr = correlation_matrix(x, cols, method, dtype).to_numpy()
+        self.cache.put(key, (versions, corr))
+        return pd.DataFrame(corr.copy(), index=cols, columns=cols)
+
+    @instrument()
+    def get_correlated_pairs(self, k=None, threshold=None, method="pearson", dtype="float64",
+                             block_size=CORR_BLOCK):
+        """Самые коррелированные пары колонок: k лучших и/или |r| >= threshold.
+
+        Полная матрица не строится - корреляции считаются блоками колонок.
+        """
+        if len(self.numeric_cols) < 2:
+            return "Нет данных для корреляции."
+        if is_stream(self.df):
+            if method != "pearson":
+                return "Для потока доступна только корреляция Пирсона (ранги требуют всей колонки)."
+            # Для потока копятся попарные суммы (k x k), из них берутся пары
+            corr = self._stream_correlation().to_numpy()
+            return correlated_pairs(corr, self.numeric_cols, k, threshold, block_size=block_size,
+                                    method="matrix")
+        return correlated_pairs(self.numeric_df.to_numpy(dtype='float64'), self.numeric_cols,
+                                k, threshold, method, dtype, block_size)
+
+    def _stream_correlation(self):
+        """Корреляция Пирсона по чанкам (попарно по непустым значениям, как corr())."""
+        sums = PairwiseSums(len(self.numeric_cols))
+        for chunk in self.df:
+            sums.update(chunk[self.numeric_cols].to_numpy(dtype='float64'))
+        return pd.DataFrame(sums.corr(), index=self.numeric_cols, columns=self.numeric_cols)
+
+
+class IncrementalStats:
+    """Статистика, которая обновляется при дописывании строк, а не считается заново.
+
+    Хранит для каждой числовой колонки моменты (MomentAccumulator), скетч
+    квантилей KLL и не больше mode_capacity частых значений (FrequentValues,
+    для моды), а для корреляции - попарные центрированные моменты
+    (PairwiseSums). Мода точная, пока в колонке не больше mode_capacity
+    разных значений; у колонок с большим числом значений она выдается,
+    только если заведомо самая частая, иначе - "N/A". Память не растет с
+    числом строк. update() с новыми строками (дописанный CSV, чанк)
+    обновляет все это за время, пропорциональное только новым данным;
+    basic_stats() и correlation() от числа накопленных строк не зависят.
+    Состояние можно сохранить на диск (save/load) и продолжить завтра.
+    """
+
+    def __init__(self, epsilon=0.01, mode_capacity=MODE_CAPACITY):
+        self.epsilon = epsilon
+        self.mode_capacity = mode_capacity
+        self.columns = []
+        self.rows = 0
+        self.moments = MomentAccumulator([])
+        self.sketches = []
+        # Частые значения колонок (для моды)
+        self.frequent = []
+        self.sums = PairwiseSums(0)
+
+    @classmethod
+    def from_data(cls, data, epsilon=0.01):
+        """Состояние по таблице или потоку (ChunkedCSV), блоками."""
+        state = cls(epsilon)
+        if is_stream(data):
+            for chunk in data:
+                state.update(chunk)
+        else:
+            for start in range(0, len(data), DEFAULT_CHUNKSIZE):
+                state.update(data.iloc[start:start + DEFAULT_CHUNKSIZE])
+        return state
+
+    def _add_columns(self, columns):
+        """Новые колонки начинают с пустого состояния (в старых строках их не было)."""
+        new = [col for col in columns if col not in self.columns]
+        if not new:
+            return
+        k = len(self.columns)
+        self.columns = self.columns + new
+        moments = MomentAccumulator(self.columns)
+        for name in ("n", "mean", "m2", "m3", "m4", "min", "max"):
+            getattr(moments, name)[:k] = getattr(self.moments, name)
+        self.moments = moments
+        self.sketches += [KLLSketch(self.epsilon) for _ in new]
+        self.frequent += [FrequentValues(self.mode_capacity) for _ in new]
+        self.sums.grow(len(self.columns))
+
+    def update(self, df):
+        """Добавляет новые строки (таблица или чанк); учитываются числовые колонки."""
+        numeric = df.select_dtypes(include=['number'])
+        self._add_columns(numeric.columns)
+        # Колонок, которых нет в новых строках, там считаем пропущенными
+        x = numeric.reindex(columns=self.columns).to_numpy(dtype='float64', na_value=np.nan)
+        self.moments.update(x)
+        self.sums.update(x)
+        for i in range(len(self.columns)):
+            self.sketches[i].update(x[:, i])
+            self.frequent[i].update(x[:, i])
+        self.rows += len(df)
+        return self
+
+    def basic_stats(self):
+        """Таблица как у DataStats.get_basic_stats() в приближенном режиме."""
+        if not self.columns:
+            return "Нет числовых данных для анализа."
+        mean = self.moments.get_mean()
+        median, iqr, mad_mean, mad_median = [], [], [], []
+        for i, sketch in enumerate(self.sketches):
+            q1, med, q3 = sketch.quantiles([0.25, 0.5, 0.75])
+            median.append(med)
+            iqr.append(q3 - q1)
+            mad_median.append(sketch.median_abs_deviation(med))
+            items, weights = sketch.weighted_sample()
+            mad_mean.append(np.sum(weights * np.abs(items - mean[i])) / weights.sum()
+                            if sketch.n else np.nan)
+
+        result = _stats_frame(self.moments, {
+            'Медиана': median,
+            'Мода': [_mode_label(f.mode()) for f in self.frequent],
+            'Mean AD (Ср. абс. откл)': mad_mean,
+            'Median AD (Мед. абс. откл)': mad_median,
+            'IQR (Интерквартильный)': iqr,
+        })
+        result.loc['Ошибка ранга квантилей (±)'] = [s.rank_error() for s in self.sketches]
+        return result
+
+    def correlation(self):
+        """Корреляция Пирсона по всем накопленным строкам (попарно по непустым значениям)."""
+        if not self.columns:
+            return "Нет данных для корреляции."
+        return pd.DataFrame(self.sums.corr(), index=self.columns, columns=self.columns)
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        joblib.dump(self, path)
+        return path
+
+    @staticmethod
+    def load(path):
+        return joblib.load(path)
+
+
+def _mode_label(value):
+    return "N/A" if np.isnan(value) else float(value)
+
+
+def _stats_frame(acc, extra):
+    """Собирает таблицу результатов в привычном порядке строк."""
+    rows = _stat_rows(acc, extra)
+    stats = {}
+    for i, col in enumerate(acc.columns):
+        stats[col] = {name: values[i] for name, values in rows.items()}
+    return pd.DataFrame(stats)
+
+
+def _stat_rows(acc, extra):
+    """Строки таблицы статистики в привычном порядке (массивы по колонкам или группам)."""
+    return {
+        'Количество': acc.n.astype('int64'),
+        'Среднее': acc.get_mean(),
+        'Медиана': extra['Медиана'],
+        'Мода': extra['Мода'],
+        'Минимум': acc.get_min(),
+        'Максимум': acc.get_max(),
+        'Стд. отклонение': acc.std(),
+        'Дисперсия': acc.var(),
+        'Mean AD (Ср. абс. откл)': extra['Mean AD (Ср. абс. откл)'],
+        'Median AD (Мед. абс. откл)': extra['Median AD (Мед. абс. откл)'],
+        'IQR (Интерквартильный)': extra['IQR (Интерквартильный)'],
+        'Skew (Асимметрия)': acc.skew(),
+        'Kurtosis (Эксцесс)': acc.kurt()
+    }
+
+
+def _group_index(keys, labels, name):
+    """Индекс (ключ группы..., метка) для всех групп: каждая группа повторена len(labels) раз."""
+    keys = keys if isinstance(keys, pd.MultiIndex) else pd.MultiIndex.from_arrays([keys])
+    n = len(labels)
+    codes = [np.repeat(code, n) for code in keys.codes]
+    return pd.MultiIndex(levels=[*keys.levels, pd.Index(labels, dtype=object)],
+                         codes=[*codes, np.tile(np.arange(n), len(keys))],
+                         names=[*keys.names, name], verify_integrity=False)
+
+
+def _group_stats(x, group, starts, cols):
+    """Вся статистика для всех групп сразу (строки x упорядочены по группам).
+
+    Моменты - суммами по группам (reduceat), медиана, квартили и мода - по
+    одной сортировке каждой колонки внутри групп. Выполняется и в рабочих
+    процессах, поэтому это функция модуля.
+    """
+    acc = MomentAccumulator.from_groups(x, starts, cols)
+    counts = acc.n.astype(int)
+    sizes = np.diff(np.r_[starts, len(x)])
+    s = sorted_within_groups(x, group)
+    median = grouped_quantiles(s, starts, counts, 0.5)
+    q1 = grouped_quantiles(s, starts, counts, 0.25)
+    q3 = grouped_quantiles(s, starts, counts, 0.75)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mask = ~np.isnan(x)
+        deviation = np.abs(x - np.repeat(acc.get_mean(), sizes, axis=0))
+        mad_mean = np.add.reduceat(np.where(mask, deviation, 0.0), starts, axis=0) / acc.n
+        abs_from_median = np.abs(x - np.repeat(median, sizes, axis=0))
+    mad_median = grouped_quantiles(sorted_within_groups(abs_from_median, group), starts, counts, 0.5)
+    return _stat_rows(acc, {
+        'Медиана': median,
+        'Мода': grouped_modes(s, group, starts, counts),
+        'Mean AD (Ср. абс. откл)': mad_mean,
+        'Median AD (Мед. абс. откл)': mad_median,
+        'IQR (Интерквартильный)': q3 - q1,
+    })
+
+
+def _group_correlations(x, group, starts, cols, method, dtype):
+    """Матрицы корреляции групп (каждая - одно матричное произведение)."""
+    bounds = np.r_[starts, len(x)]
+    with warnings.catch_warnings():
+        # Колонка без значений в группе дает NaN в матрице, предупреждение не нужно
+        warnings.simplefilter('ignore', RuntimeWarning)
+        return [correlation_matrix(x[r0:r1], cols, method, dtype).to_numpy()
+                for r0, r1 in zip(bounds[:-1], bounds[1:])]
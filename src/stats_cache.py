@@ -0,0 +1,71 @@
+import sys
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+
+# Бюджет памяти общего кэша статистики по умолчанию (в мегабайтах)
+DEFAULT_STATS_CACHE_MB = 64
+
+
+def _nbytes(value):
+    """Примерный размер результата в байтах."""
+    if isinstance(value, (pd.Series, pd.DataFrame)):
+        usage = value.memory_usage(deep=True)
+        return int(usage.sum()) if isinstance(usage, pd.Series) else int(usage)
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (tuple, list)):
+        return sum(_nbytes(item) for item in value)
+    return sys.getsizeof(value)
+
+
+class StatsCache:
+    """Общий кэш посчитанной статистики с ограниченной памятью.
+
+    Ключ записи включает версии колонок (DataCleaner.column_versions),
+    поэтому после шага очистки устаревшие записи просто перестают
+    находиться, а статистика неизмененных колонок остается. Когда размер
+    превышает бюджет, вытесняются давно не использованные записи (LRU).
+    """
+
+    def __init__(self, budget_mb=DEFAULT_STATS_CACHE_MB):
+        self.budget = budget_mb * 1024 * 1024
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key, value):
+        """Запоминает результат; запись больше всего бюджета не сохраняется."""
+        nbytes = _nbytes(value)
+        if nbytes > self.budget:
+            return
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.size -= old[1]
+        self.entries[key] = (value, nbytes)
+        self.size += nbytes
+        while self.size > self.budget:
+            _, (_, evicted) = self.entries.popitem(last=False)
+            self.size -= evicted
+
+    def clear(self):
+        self.entries.clear()
+        self.size = 0
+
+    def info(self):
+        return {'entries': len(self.entries), 'mb': self.size / 1024 / 1024,
+                'hits': self.hits, 'misses': self.misses}
+
+
+# Общий кэш программы: статистика и графики берут результаты отсюда
+STATS_CACHE = StatsCache()
@@ -0,0 +1,337 @@
+import os
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from pandas.tseries.api import guess_datetime_format
+from .moments import MomentAccumulator, sorted_columns, quantiles_from_sorted
+
+# Низкоуровневые операции очистки над целыми колонками и матрицами.
+# Их используют и DataCleaner, и исполнитель ленивого плана (pipeline.py).
+
+OUTLIER_LABELS = {"zscore": "Z-score", "iqr": "IQR", "mad": "MAD"}
+# Множитель, переводящий MAD в оценку стд. отклонения для нормального распределения
+MAD_TO_STD = 1.4826
+
+# Преобразования типов: функция pandas, подпись для истории и условие принятия результата
+CONVERSIONS = {
+    "numeric": (pd.to_numeric, "числа", lambda converted: converted.notna().sum() > 0),
+    "datetime": (pd.to_datetime, "даты", lambda converted: converted.notna().mean() > 0.5),
+}
+# Сколько значений колонки смотреть, чтобы выбрать тип и формат даты
+INFER_SAMPLE_SIZE = 1000
+# Ключи двух независимых 64-битных хэшей строки (вместе - 128 бит)
+HASH_KEYS = ("0123456789123456", "a5f1c0d2e3b4978f")
+
+
+def _sample_values(series, size=INFER_SAMPLE_SIZE):
+    """Равномерная выборка значений колонки (без пропусков)."""
+    if len(series) > size:
+        positions = np.linspace(0, len(series) - 1, size).astype(int)
+        series = series.iloc[positions]
+    return series.dropna()
+
+
+def infer_datetime_format(sample):
+    """Подбирает явный формат даты по выборке; None, если формат не найден."""
+    candidates = []
+    for value in sample.astype(str).iloc[:20]:
+        # Порядок день/месяц по одной строке не всегда понятен - пробуем оба
+        for dayfirst in (False, True):
+            fmt = guess_datetime_format(value, dayfirst=dayfirst)
+            if fmt and fmt not in candidates:
+                candidates.append(fmt)
+    best, best_share = None, 0.0
+    for fmt in candidates:
+        share = pd.to_datetime(sample, format=fmt, errors='coerce').notna().mean()
+        if share > best_share:
+            best, best_share = fmt, share
+    return best if best_share > 0.5 else None
+
+
+def text_columns(df):
+    """Текстовые колонки: object и category со строковыми значениями."""
+    columns = []
+    for col in df.columns:
+        dtype = df[col].dtype
+        if dtype == object or (isinstance(dtype, pd.CategoricalDtype)
+                               and dtype.categories.dtype == object):
+            columns.append(col)
+    return columns
+
+
+def fill_missing(df, values):
+    """fillna по словарю {колонка: значение} без потери компактных типов.
+
+    Целая колонка (int8/Int16/...) не может хранить дробное среднее: такие
+    колонки явно переводятся в наименьший подходящий float (float32 для
+    Int8/Int16, иначе float64), остальные колонки свой тип сохраняют.
+    Возвращает (таблица, список переведенных колонок).
+    """
+    casts = {}
+    for col, value in values.items():
+        dtype = df[col].dtype
+        if pd.api.types.is_integer_dtype(dtype) and value != round(value):
+            casts[col] = 'float32' if dtype.itemsize <= 2 else 'float64'
+    if casts:
+        df = df.astype(casts)
+    # Значение приводится к типу колонки, иначе float64-скаляр повысит float32 до float64
+    values = {col: df[col].dtype.type(value) if df[col].dtype.kind == 'f' else value
+              for col, value in values.items()}
+    return df.fillna(values), list(casts)
+
+
+def infer_conversion(series, kind, sample_size=INFER_SAMPLE_SIZE):
+    """По выборке решает, стоит ли преобразовывать колонку. Возвращает (да/нет, формат даты)."""
+    sample = _sample_values(series, sample_size)
+    if isinstance(sample.dtype, pd.CategoricalDtype):
+        sample = sample.astype(object)
+    if sample.empty:
+        return False, None
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        if kind == "numeric":
+            return bool(pd.to_numeric(sample, errors='coerce').notna().any()), None
+        fmt = infer_datetime_format(sample)
+        if fmt:
+            return True, fmt
+        # Без явного формата даты разбираются поэлементно (медленно),
+        # поэтому такой разбор сначала пробуем только на выборке
+        return bool(pd.to_datetime(sample, errors='coerce').notna().mean() > 0.5), None
+
+
+def _convert_column(series, kind, fmt):
+    """Преобразует одну колонку (выполняется в потоке или процессе пула)."""
+    start = time.perf_counter()
+    func, _, accept = CONVERSIONS[kind]
+    codes = None
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Преобразуются только разные значения, затем раскладываются по кодам
+        codes = series.cat.codes.to_numpy()
+        original, series = series, pd.Series(series.cat.categories.astype(object))
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            if fmt:
+                converted = pd.to_datetime(series, format=fmt, errors='coerce')
+            else:
+                converted = func(series, errors='coerce')
+        if codes is not None:
+            converted = converted.take(np.maximum(codes, 0)).set_axis(original.index).rename(original.name)
+            converted = converted.where(codes >= 0)
+        if not accept(converted):
+            converted = None
+    except Exception:
+        converted = None
+    return converted, time.perf_counter() - start
+
+
+def convert_columns(df, columns, kind, max_workers=None, use_processes=False,
+                    sample_size=INFER_SAMPLE_SIZE):
+    """Определяет типы колонок по выборке и параллельно преобразует подходящие.
+
+    Возвращает список словарей по каждой колонке: column, converted
+    (новая колонка или None), format (формат даты) и seconds (время).
+    """
+    results = {}
+    todo = []
+    for col in columns:
+        ok, fmt = infer_conversion(df[col], kind, sample_size)
+        if ok:
+            todo.append((col, fmt))
+        else:
+            results[col] = {'column': col, 'converted': None, 'format': None, 'seconds': 0.0}
+
+    workers = max_workers or min(len(todo), os.cpu_count() or 1)
+    if workers <= 1 or len(todo) <= 1:
+        outputs = [_convert_column(df[col], kind, fmt) for col, fmt in todo]
+    else:
+        executor = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+        with executor(max_workers=workers) as pool:
+            futures = [pool.submit(_convert_column, df[col], kind, fmt) for col, fmt in todo]
+            outputs = [future.result() for future in futures]
+
+    for (col, fmt), (converted, seconds) in zip(todo, outputs):
+        results[col] = {'column': col, 'converted': converted, 'format': fmt, 'seconds': seconds}
+    return [results[col] for col in columns]
+
+
+def conversion_message(result, kind):
+    """Строка истории о преобразовании колонки."""
+    label = CONVERSIONS[kind][1]
+    details = f"{result['seconds']:.2f} с"
+    if result['format']:
+        details = f"формат {result['format']}, " + details
+    return f"[Очистка] Колонка '{result['column']}' преобразована в {label} ({details})."
+
+
+def outlier_reference(x, method):
+    """Опорные значения для поиска выбросов по всем колонкам матрицы сразу.
+
+    Возвращает (low, high, scale): выбросом считается значение, которое
+    лежит за пределами [low, high] дальше, чем threshold * scale.
+    """
+    if method == "zscore":
+        acc = MomentAccumulator.from_array(x, range(x.shape[1]))
+        mean = acc.get_mean()
+        return mean, mean, acc.std()
+    s, counts = sorted_columns(x)
+    if method == "iqr":
+        q1 = quantiles_from_sorted(s, counts, 0.25)
+        q3 = quantiles_from_sorted(s, counts, 0.75)
+        return q1, q3, q3 - q1
+    median = quantiles_from_sorted(s, counts, 0.5)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        mad = np.nanmedian(np.abs(x - median), axis=0)
+    return median, median, mad * MAD_TO_STD
+
+
+def outlier_reference_from_sketches(sketches, method):
+    """То же, что outlier_reference, но по скетчам квантилей (потоковый режим)."""
+    low, high, scale = [], [], []
+    for sketch in sketches:
+        q1, median, q3 = sketch.quantiles([0.25, 0.5, 0.75])
+        if method == "iqr":
+            low.append(q1)
+            high.append(q3)
+            scale.append(q3 - q1)
+        else:
+            low.append(median)
+            high.append(median)
+            scale.append(sketch.median_abs_deviation(median) * MAD_TO_STD)
+    return np.array(low), np.array(high), np.array(scale)
+
+
+def outlier_keep_mask(x, method, threshold, low, high, scale):
+    """Булева маска строк без выбросов (одна операция над всей матрицей)."""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        score = np.maximum(np.maximum(low - x, x - high), 0) / scale
+        if method == "iqr":
+            inside = score <= threshold
+        else:
+            inside = score < threshold
+    return inside.all(axis=1)
+
+
+def row_hashes(df, subset=None, bits=64):
+    """Хэш каждой строки по колонкам subset (по умолчанию - по всем).
+
+    Колонки хэшируются векторно и смешиваются в одно uint64 на строку
+    (pandas.util.hash_pandas_object), без промежуточных объектов-кортежей.
+    bits=128 - два независимых хэша, массив формы (n, 2).
+    """
+    data = df if subset is None else df[list(subset)]
+    first = pd.util.hash_pandas_object(data, index=False, hash_key=HASH_KEYS[0]).to_numpy()
+    if bits == 64:
+        return first
+    second = pd.util.hash_pandas_object(data, index=False, hash_key=HASH_KEYS[1]).to_numpy()
+    return np.column_stack([first, second])
+
+
+def _codes_hash(data):
+    """64-битный хэш строки из кодов значений колонок (одна колонка за раз).
+
+    pd.factorize использует кэшированные хэши строк Python, поэтому это
+    быстрее хэширования содержимого; коды зависят от таблицы, поэтому
+    такой хэш годится только внутри одной таблицы.
+    """
+    h = np.zeros(len(data), dtype='uint64')
+    for col in data.columns:
+        codes, _ = pd.factorize(data[col], use_na_sentinel=False)
+        codes = codes.astype('uint64')
+        # Смешивание как в boost::hash_combine (переполнение uint64 - по модулю 2^64)
+        h ^= codes + np.uint64(0x9E3779B97F4A7C15) + (h << np.uint64(6)) + (h >> np.uint64(2))
+    return h
+
+
+def duplicated_rows(df, subset=None, hashed=True):
+    """Маска повторов (как DataFrame.duplicated(subset), keep='first').
+
+    hashed=True: колонки по одной превращаются в коды и смешиваются в
+    64-битный хэш строки - без общей матрицы кодов по всем колонкам.
+    Строки, чей хэш встречается больше одного раза, перепроверяются по
+    значениям, так что совпадение хэшей не удалит разные строки.
+    """
+    data = df if subset is None else df[list(subset)]
+    if not hashed:
+        return data.duplicated().to_numpy()
+    hashes = pd.Series(_codes_hash(data))
+    candidates = hashes.duplicated(keep=False).to_numpy()
+    dup = np.zeros(len(df), dtype=bool)
+    if candidates.any():
+        dup[candidates] = data[candidates].duplicated().to_numpy()
+    return dup
+
+
+def _sorted_run(first, second):
+    """Хэши, упорядоченные по first (second проверяется внутри равных first)."""
+    # Устойчивая сортировка: слитые серии уже упорядочены по частям, она их просто сливает
+    order = np.argsort(first, kind='stable')
+    return first[order], second[order]
+
+
+def _in_run(run, first, second):
+    """Маска: пара хэшей (first, second) есть в отсортированной серии run.
+
+    first должен быть отсортирован: поиск по отсортированным ключам
+    быстрее (соседние ключи ищутся рядом).
+    """
+    run_first, run_second = run
+    pos = np.searchsorted(run_first, first)
+    inside = np.minimum(pos, len(run_first) - 1)
+    found = (pos < len(run_first)) & (run_first[inside] == first) & (run_second[inside] == second)
+    # Одинаковый первый хэш у разных строк серии (совпадение 64 бит) - почти не бывает
+    more = np.flatnonzero(~found & (pos + 1 < len(run_first)))
+    more = more[run_first[pos[more] + 1] == first[more]]
+    for i in more:
+        right = np.searchsorted(run_first, first[i], side='right')
+        found[i] = (run_second[pos[i]:right] == second[i]).any()
+    return found
+
+
+class StreamDeduplicator:
+    """Удаление дубликатов в потоке с учетом строк из предыдущих чанков.
+
+    Хранит 128-битные хэши уже встреченных строк (16 байт на уникальную
+    строку, сами строки не хранятся). Повтор строки из другого чанка
+    распознается по совпадению обоих хэшей. Хэши каждого чанка - новая
+    отсортированная серия; серии сливаются, когда последняя не меньше
+    предыдущей (как в LSM-дереве): серий не больше log2(строк / чанк), и
+    каждый хэш переписывается столько же раз, а не при каждом чанке.
+    """
+
+    def __init__(self, subset=None):
+        self.subset = subset
+        # Отсортированные серии [(first, second)], от больших к меньшим
+        self.runs = []
+        self.removed = 0
+
+    def start(self):
+        """Новое состояние для очередного прохода по файлу."""
+        return StreamDeduplicator(self.subset)
+
+    @property
+    def seen(self):
+        """Число запомненных (уникальных) строк."""
+        return sum(len(run[0]) for run in self.runs)
+
+    def __call__(self, chunk):
+        hashes = row_hashes(chunk, self.subset, bits=128)
+        # Повторы внутри чанка
+        dup = pd.DataFrame(hashes).duplicated().to_numpy()
+        # Повторы строк из прошлых чанков: хэши чанка сортируются один раз
+        order = np.argsort(hashes[:, 0], kind='stable')
+        first, second = hashes[order, 0], hashes[order, 1]
+        for run in self.runs:
+            dup[order] |= _in_run(run, first, second)
+        self.removed += int(dup.sum())
+        if not dup.all():
+            keep = ~dup[order]
+            self.runs.append((first[keep], second[keep]))
+            while len(self.runs) > 1 and len(self.runs[-2][0]) <= len(self.runs[-1][0]):
+                newer, older = self.runs.pop(), self.runs.pop()
+                self.runs.append(_sorted_run(np.concatenate([older[0], newer[0]]),
+                                             np.concatenate([older[1], newer[1]])))
+        return chunk[~dup]
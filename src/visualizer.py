@@ -1,32 +1,183 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+import matplotlib
 import matplotlib.pyplot as plt
 import matplotlib.patches as patches
+from matplotlib.colors import LogNorm
 import seaborn as sns
+import numpy as np
 import pandas as pd
+from scipy.signal import fftconvolve
+from scipy.stats import gaussian_kde
+from .loader import is_stream, DEFAULT_CHUNKSIZE
+from .moments import MomentAccumulator
+from .sketch import KLLSketch
+from .profiling import instrument
+from .statistics import DataStats
+
+# Сколько строк рисовать "как есть"; если больше - данные сначала агрегируются
+MAX_POINTS = 100_000
+# Сетка для плотности по гистограмме (KDE через свертку на сетке)
+KDE_GRID = 2048
+# Число корзин по каждой оси для агрегированного scatter
+SCATTER_BINS = 200
 
 class DataVisualizer:
-    def __init__(self, df):
+    def __init__(self, df, approx=None, epsilon=0.01, save_dir=None, fmt="png", max_points=MAX_POINTS,
+                 versions=None):
         self.df = df
+        # Версии колонок (DataCleaner.column_versions): среднее, медиана, мода и т.п.
+        # для подписей графиков берутся из общего кэша статистики
+        self.versions = versions
+        # Если задана папка, графики сохраняются в файлы вместо показа на экране
+        # (бэкенд Agg включают точки входа без экрана: пакетный режим, рабочие процессы)
+        self.save_dir = save_dir
+        # Формат файлов в режиме сохранения: png или svg
+        self.fmt = fmt
+        # Больше max_points строк - гистограммы/плотности/scatter строятся по агрегатам
+        self.max_points = max_points
+        # Приближенный режим для Box/Violin: квантили из скетча вместо полной сортировки
+        self.approx = is_stream(df) if approx is None else approx
+        self.epsilon = epsilon
         # Устанавливаем красивый стиль графиков
         sns.set_theme(style="whitegrid")
 
+    def _finish(self, name):
+        """Показывает график или сохраняет его в save_dir (возвращает путь к файлу)."""
+        if self.save_dir:
+            os.makedirs(self.save_dir, exist_ok=True)
+            path = os.path.join(self.save_dir, f"{name}.{self.fmt}")
+            plt.savefig(path, bbox_inches='tight')
+            plt.close()
+            print(f"График сохранен: {path}")
+            return path
+        print("График открыт.")
+        plt.show()
+
+    def _series(self, column):
+        """Колонка для графика; из потока в память собирается только она."""
+        if is_stream(self.df):
+            return self.df.column(column)
+        return self.df[column]
+
+    def _blocks(self, columns):
+        """Значения колонок блоками (чанки потока или срезы таблицы) как float-матрицы."""
+        if is_stream(self.df):
+            for chunk in self.df:
+                yield chunk[columns].to_numpy(dtype='float64')
+        else:
+            values = self.df[columns].to_numpy(dtype='float64')
+            for start in range(0, len(values), DEFAULT_CHUNKSIZE):
+                yield values[start:start + DEFAULT_CHUNKSIZE]
+
+    def _is_large(self):
+        """Рисовать по агрегатам: поток или строк больше max_points."""
+        return is_stream(self.df) or len(self.df) > self.max_points
+
+    def _sketch(self, column):
+        """Скетч квантилей колонки за один проход в ограниченной памяти."""
+        sketch = KLLSketch(self.epsilon)
+        for block in self._blocks([column]):
+            sketch.update(block[:, 0])
+        return sketch
+
+    def _moments(self, columns):
+        """Количество, среднее, стд. отклонение, минимум и максимум за один проход."""
+        acc = MomentAccumulator(columns)
+        for block in self._blocks(columns):
+            acc.update(block)
+        return acc
+
+    def _column_stats(self, column):
+        """Статистика колонки (как в DataStats.get_basic_stats) через общий кэш.
+
+        Для больших таблиц - приближенная (скетч), иначе точная.
+        """
+        stats = DataStats(self.df, approx=self._is_large(), epsilon=self.epsilon, versions=self.versions)
+        return stats.get_basic_stats(columns=[column])[column]
+
+    def _binned_density(self, column, with_sketch=False):
+        """Плотность по гистограмме на сетке (KDE через FFT-свертку).
+
+        Первый проход - моменты (ширина окна по правилу Скотта, как у
+        gaussian_kde), второй - гистограмма на сетке из KDE_GRID корзин
+        (из нее же собираются столбцы гистограммы для показа).
+        Время и память не зависят от числа строк.
+        """
+        acc = self._moments([column])
+        n, std = acc.n[0], acc.std()[0]
+        if n == 0:
+            return None
+        bw = std * n ** (-1 / 5) if std > 0 else 1.0
+        lo, hi = acc.min[0] - 3 * bw, acc.max[0] + 3 * bw
+        edges = np.linspace(lo, hi, KDE_GRID + 1)
+        counts = np.zeros(KDE_GRID)
+        sketch = KLLSketch(self.epsilon) if with_sketch else None
+        for block in self._blocks([column]):
+            values = block[:, 0]
+            counts += np.histogram(values[~np.isnan(values)], bins=edges)[0]
+            if sketch is not None:
+                sketch.update(values)
+        dx = edges[1] - edges[0]
+        half = int(np.ceil(4 * bw / dx))
+        kernel = np.exp(-0.5 * (np.arange(-half, half + 1) * dx / bw) ** 2)
+        density = fftconvolve(counts, kernel / kernel.sum(), mode='same') / (n * dx)
+        centers = (edges[:-1] + edges[1:]) / 2
+        return {'x': centers, 'density': np.clip(density, 0, None), 'counts': counts,
+                'edges': edges, 'acc': acc, 'sketch': sketch}
+
+    @instrument()
     def plot_histogram(self, column):
         """Строит гистограмму (распределение) для выбранной колонки."""
+        if self._is_large():
+            return self._plot_histogram_binned(column)
         plt.figure(figsize=(10, 6))
         # kde=True рисует плавную линию тренда
-        sns.histplot(self.df[column], kde=True, color='skyblue')
+        sns.histplot(self._series(column), kde=True, color='skyblue')
         plt.title(f'Гистограмма: {column}')
         plt.xlabel(column)
         plt.ylabel('Частота')
-        print("График открыт.")
-        plt.show()
+        return self._finish(f"histogram_{column}")
 
+    def _plot_histogram_binned(self, column):
+        """Гистограмма и линия плотности по агрегатам (для больших данных)."""
+        result = self._binned_density(column)
+        if result is None:
+            print("В колонке нет данных.")
+            return None
+        acc = result['acc']
+        # Для показа укрупняем мелкую сетку плотности до ~50 столбцов в пределах
+        # реальных данных: столбец - сумма соседних корзин, третьего прохода нет
+        fine_edges, fine_counts = result['edges'], result['counts']
+        first = max(np.searchsorted(fine_edges, acc.min[0], side='right') - 1, 0)
+        last = min(np.searchsorted(fine_edges, acc.max[0], side='right'), len(fine_counts))
+        step = max(1, int(np.ceil((last - first) / 50)))
+        starts = np.arange(first, last, step)
+        end = min(starts[-1] + step, len(fine_counts))
+        counts = np.add.reduceat(fine_counts[first:end], starts - first)
+        edges = np.r_[fine_edges[starts], fine_edges[end]]
+
+        plt.figure(figsize=(10, 6))
+        plt.stairs(counts, edges, fill=True, color='skyblue', alpha=0.8)
+        # Плотность в масштабе частот: density * n * ширина столбца
+        plt.plot(result['x'], result['density'] * acc.n[0] * (edges[1] - edges[0]), color='steelblue')
+        plt.xlim(acc.min[0], acc.max[0])
+        plt.title(f'Гистограмма: {column} (агрегировано, {int(acc.n[0])} значений)')
+        plt.xlabel(column)
+        plt.ylabel('Частота')
+        return self._finish(f"histogram_{column}")
+
+    @instrument()
     def plot_density(self, column):
         """Строит диаграмму плотности с линиями среднего, медианы и моды."""
-        data = self.df[column].dropna()
-        mean_val = data.mean()
-        median_val = data.median()
-        # Мода может вернуть несколько значений, берем первое
-        mode_val = data.mode()[0] if not data.mode().empty else mean_val
+        if self._is_large():
+            return self._plot_density_binned(column)
+        data = self._series(column).dropna()
+        stats = self._column_stats(column)
+        mean_val = stats['Среднее']
+        median_val = stats['Медиана']
+        # Мода - наименьшее из самых частых значений (как data.mode()[0])
+        mode_val = stats['Мода'] if stats['Мода'] != "N/A" else mean_val
 
         plt.figure(figsize=(10, 6))
         # Рисуем саму плотность
@@ -41,24 +192,80 @@ class DataVisualizer:
         plt.xlabel(column)
         plt.ylabel('Плотность')
         plt.legend() # Показываем легенду линий
-        print("График открыт.")
-        plt.show()
+        return self._finish(f"density_{column}")
+
+    def _plot_density_binned(self, column):
+        """Плотность по гистограмме на сетке; медиана из скетча, мода - пик плотности."""
+        result = self._binned_density(column, with_sketch=True)
+        if result is None:
+            print("В колонке нет данных.")
+            return None
+        mean_val = result['acc'].get_mean()[0]
+        median_val = result['sketch'].quantile(0.5)
+        mode_val = result['x'][result['density'].argmax()]
+
+        plt.figure(figsize=(10, 6))
+        plt.fill_between(result['x'], result['density'], color='purple', alpha=0.3)
+        plt.plot(result['x'], result['density'], color='purple')
+        plt.axvline(mean_val, color='red', linestyle='--', linewidth=2, label=f'Среднее: {mean_val:.2f}')
+        plt.axvline(median_val, color='green', linestyle='-', linewidth=2, label=f'Медиана: {median_val:.2f}')
+        plt.axvline(mode_val, color='blue', linestyle=':', linewidth=2, label=f'Мода (пик плотности): {mode_val:.2f}')
+
+        plt.title(f'Диаграмма плотности: {column} (агрегировано)')
+        plt.xlabel(column)
+        plt.ylabel('Плотность')
+        plt.legend()
+        return self._finish(f"density_{column}")
 
+    @instrument()
     def plot_boxplot(self, column):
         """Строит 'Ящик с усами' (Box Plot) на основе Медианы и квартилей."""
+        if self.approx or self._is_large():
+            return self._plot_boxplot_approx(column)
         plt.figure(figsize=(10, 6))
-        sns.boxplot(x=self.df[column], color='lightgreen')
+        sns.boxplot(x=self._series(column), color='lightgreen')
         plt.title(f'Box Plot (IQR/Median): {column}')
-        print("График открыт.")
-        plt.show()
+        return self._finish(f"boxplot_{column}")
+
+    def _plot_boxplot_approx(self, column):
+        """Box Plot по квантилям из скетча (выбросы по отдельности не рисуются)."""
+        sketch = self._sketch(column)
+        if sketch.n == 0:
+            print("В колонке нет данных.")
+            return
+        q1, med, q3 = sketch.quantiles([0.25, 0.5, 0.75])
+        iqr = q3 - q1
+        box = {
+            'med': med, 'q1': q1, 'q3': q3,
+            # Усы - как у обычного Box Plot: 1.5 IQR, но не дальше минимума/максимума
+            'whislo': max(sketch.min, q1 - 1.5 * iqr),
+            'whishi': min(sketch.max, q3 + 1.5 * iqr),
+            'fliers': [], 'label': column,
+        }
+        error = sketch.rank_error()
 
+        plt.figure(figsize=(10, 6))
+        ax = plt.gca()
+        ax.bxp([box], orientation='horizontal', patch_artist=True, boxprops={'facecolor': 'lightgreen'})
+        plt.title(f'Box Plot (IQR/Median, приближенно ±{error:.2%} по рангу): {column}')
+        print(f"Квантили приближенные: ошибка ранга не больше {error:.2%}.")
+        return self._finish(f"boxplot_{column}")
+
+    @instrument()
     def plot_boxplot_mean_std(self, column):
         """Строит Box Plot на основе Среднего и Стандартного отклонения."""
-        data = self.df[column].dropna()
-        mean = data.mean()
-        std = data.std()
-        min_val = data.min()
-        max_val = data.max()
+        if self.versions is not None and column in self.versions:
+            # Моменты уже есть в статистике колонки (или попадут в общий кэш)
+            stats = self._column_stats(column)
+            mean, std = stats['Среднее'], stats['Стд. отклонение']
+            min_val, max_val = stats['Минимум'], stats['Максимум']
+        else:
+            # Нужны только моменты - считаем их за один проход, не собирая колонку
+            acc = self._moments([column])
+            mean = acc.get_mean()[0]
+            std = acc.std()[0]
+            min_val = acc.get_min()[0]
+            max_val = acc.get_max()[0]
 
         plt.figure(figsize=(10, 6))
         ax = plt.gca()
@@ -83,23 +290,111 @@ class DataVisualizer:
         plt.xlabel(column)
         plt.title(f'Box Plot (Mean +/- Std): {column}')
         plt.legend()
-        print("График открыт.")
-        plt.show()
+        return self._finish(f"boxplot_mean_std_{column}")
 
+    @instrument()
     def plot_violin(self, column):
         """Скрипичная диаграмма (второй тип диаграммы размаха)."""
+        if self.approx or self._is_large():
+            return self._plot_violin_approx(column)
         plt.figure(figsize=(10, 6))
-        sns.violinplot(x=self.df[column], color='orange')
+        sns.violinplot(x=self._series(column), color='orange')
         plt.title(f'Violin Plot: {column}')
-        print("График открыт.")
-        plt.show()
+        return self._finish(f"violin_{column}")
+
+    def _plot_violin_approx(self, column):
+        """Violin Plot по взвешенным значениям скетча вместо всей колонки."""
+        sketch = self._sketch(column)
+        if sketch.n == 0:
+            print("В колонке нет данных.")
+            return
+        items, weights = sketch.weighted_sample()
+        coords = np.linspace(sketch.min, sketch.max, 200)
+        if len(np.unique(items)) > 1:
+            density = gaussian_kde(items, weights=weights)(coords)
+        else:
+            density = np.ones_like(coords)
+        q1, med, q3 = sketch.quantiles([0.25, 0.5, 0.75])
+        stats = {
+            'coords': coords, 'vals': density, 'mean': med, 'median': med,
+            'min': sketch.min, 'max': sketch.max, 'quantiles': [q1, q3],
+        }
+        error = sketch.rank_error()
+
+        plt.figure(figsize=(10, 6))
+        ax = plt.gca()
+        parts = ax.violin([stats], orientation='horizontal', showmedians=True, showextrema=True)
+        for body in parts['bodies']:
+            body.set_facecolor('orange')
+        ax.set_yticks([])
+        plt.xlabel(column)
+        plt.title(f'Violin Plot (приближенно ±{error:.2%} по рангу): {column}')
+        print(f"Квантили приближенные: ошибка ранга не больше {error:.2%}.")
+        return self._finish(f"violin_{column}")
 
+    @instrument()
     def plot_scatter(self, col_x, col_y):
         """Строит график зависимости одной переменной от другой."""
+        if self._is_large():
+            return self._plot_scatter_binned(col_x, col_y)
         plt.figure(figsize=(10, 6))
-        sns.scatterplot(x=self.df[col_x], y=self.df[col_y])
+        sns.scatterplot(x=self._series(col_x), y=self._series(col_y))
         plt.title(f'Зависимость {col_y} от {col_x}')
         plt.xlabel(col_x)
         plt.ylabel(col_y)
-        print("График открыт.")
-        plt.show()
+        return self._finish(f"scatter_{col_x}_{col_y}")
+
+    def _plot_scatter_binned(self, col_x, col_y):
+        """Вместо миллионов точек - двумерная гистограмма (число точек в клетке)."""
+        acc = self._moments([col_x, col_y])
+        if acc.n.min() == 0:
+            print("В колонках нет данных.")
+            return None
+        x_edges = np.linspace(acc.min[0], acc.max[0], SCATTER_BINS + 1)
+        y_edges = np.linspace(acc.min[1], acc.max[1], SCATTER_BINS + 1)
+        counts = np.zeros((SCATTER_BINS, SCATTER_BINS))
+        for block in self._blocks([col_x, col_y]):
+            both = ~np.isnan(block).any(axis=1)
+            counts += np.histogram2d(block[both, 0], block[both, 1], bins=[x_edges, y_edges])[0]
+
+        plt.figure(figsize=(10, 6))
+        masked = np.ma.masked_equal(counts.T, 0)
+        # rasterized: в SVG клетки сохраняются картинкой, размер файла не растет
+        mesh = plt.pcolormesh(x_edges, y_edges, masked, norm=LogNorm(), cmap='viridis', rasterized=True)
+        plt.colorbar(mesh, label='Число точек')
+        plt.title(f'Зависимость {col_y} от {col_x} (агрегировано, {int(counts.sum())} точек)')
+        plt.xlabel(col_x)
+        plt.ylabel(col_y)
+        return self._finish(f"scatter_{col_x}_{col_y}")
+
+
+def plot_columns(plot):
+    """Колонки, нужные для графика из описания {'type': ..., 'column' | 'x', 'y'}."""
+    if plot["type"] == "scatter":
+        return [plot["x"], plot["y"]]
+    return [plot["column"]]
+
+
+def render_plot(df, plot, save_dir, fmt="png", max_points=MAX_POINTS):
+    """Строит один график в файл (функция для рабочих процессов)."""
+    matplotlib.use("Agg")
+    viz = DataVisualizer(df, save_dir=save_dir, fmt=fmt, max_points=max_points)
+    if plot["type"] == "scatter":
+        return viz.plot_scatter(plot["x"], plot["y"])
+    return getattr(viz, f"plot_{plot['type']}")(plot["column"])
+
+
+def render_batch(df, plots, save_dir, fmt="png", workers=None, max_points=MAX_POINTS):
+    """Строит пачку графиков в файлы параллельно в пуле процессов.
+
+    Каждому процессу передаются только колонки его графика. Поток (ChunkedCSV)
+    с записанными шагами очистки в другой процесс не передать, поэтому для
+    него графики строятся по очереди в текущем процессе.
+    """
+    workers = workers or min(len(plots), os.cpu_count() or 1)
+    if is_stream(df) or workers <= 1 or len(plots) <= 1:
+        return [render_plot(df, plot, save_dir, fmt, max_points) for plot in plots]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(render_plot, df[plot_columns(plot)], plot, save_dir, fmt, max_points)
+                   for plot in plots]
+        return [future.result() for future in futures]
@@ -0,0 +1,31 @@
+import os
+import shutil
+import matplotlib
+import pandas as pd
+import pytest
+
+# Графики в тестах только сохраняются в файлы
+matplotlib.use("Agg")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TITANIC = os.path.join(ROOT, "titanic.csv")
+
+
+@pytest.fixture
+def titanic_copy(tmp_path):
+    """Копия titanic.csv во временной папке (ее можно менять)."""
+    path = tmp_path / "titanic.csv"
+    shutil.copy(TITANIC, path)
+    return str(path)
+
+
+@pytest.fixture
+def titanic():
+    return pd.read_csv(TITANIC)
+
+
+@pytest.fixture
+def titanic_stream():
+    from src.loader import ChunkedCSV
+    # Маленькие чанки: граница чанков проходит через данные много раз
+    return ChunkedCSV(TITANIC, chunksize=100)
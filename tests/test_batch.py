@@ -0,0 +1,74 @@
+import json
+import os
+import pandas as pd
+import pytest
+from src.batch import run_job, validate_job
+from src.statistics import DataStats
+
+
+def _job(titanic_copy, tmp_path, **extra):
+    spec = {
+        "inputs": [titanic_copy],
+        "output_dir": str(tmp_path / "results"),
+        "workers": 1,
+        "cleaning": [{"step": "remove_duplicates"},
+                     {"step": "fill_missing_values", "strategy": "median", "group_by": ["Pclass", "Sex"]}],
+        "stats": {"basic": True, "correlation": True, "group_by": ["Pclass"]},
+        "plots": [{"type": "histogram", "column": "Age"}],
+        "models": [{"target": "Fare", "features": ["Age", "Pclass"], "model": "linear"}],
+    }
+    spec.update(extra)
+    return spec
+
+
+def test_job_writes_results(titanic_copy, tmp_path):
+    summary = run_job(_job(titanic_copy, tmp_path))
+    [result] = summary["files"]
+    assert result["status"] == "ok", result.get("error")
+    out = result["output_dir"]
+    for name in ("stats_basic.csv", "correlation.csv", "stats_by_group.csv", "cleaning.txt",
+                 "run.log", os.path.join("models", "metrics.json")):
+        assert os.path.exists(os.path.join(out, name)), name
+    assert os.path.exists(os.path.join(tmp_path, "results", "summary.json"))
+    assert any(path.endswith(".png") for path in result["outputs"])
+
+
+def test_job_stats_match_interactive_path(titanic_copy, tmp_path, titanic):
+    spec = _job(titanic_copy, tmp_path, cleaning=[], plots=[], models=[], load={"optimize": False})
+    [result] = run_job(spec)["files"]
+    written = pd.read_csv(os.path.join(result["output_dir"], "stats_basic.csv"), index_col=0)
+    expected = DataStats(titanic, cache=None).get_basic_stats()
+    pd.testing.assert_series_equal(written.loc["Среднее"].astype(float),
+                                   expected.loc["Среднее"].astype(float), check_names=False)
+
+
+def test_broken_file_does_not_stop_job(titanic_copy, tmp_path):
+    broken = tmp_path / "broken.csv"
+    broken.write_text("")
+    summary = run_job(_job(titanic_copy, tmp_path, inputs=[titanic_copy, str(broken)]))
+    statuses = {os.path.basename(r["input"]): r["status"] for r in summary["files"]}
+    assert statuses == {"titanic.csv": "ok", "broken.csv": "error"}
+    with open(tmp_path / "results" / "summary.json", encoding="utf-8") as f:
+        assert len(json.load(f)["files"]) == 2
+
+
+@pytest.mark.parametrize("bad", [{"cleaning": [{"step": "nope"}]}, {"plots": [{"type": "pie"}]},
+                                 {"models": [{"target": "Fare"}]}, {"inputs": []}])
+def test_invalid_job_rejected(titanic_copy, tmp_path, bad):
+    with pytest.raises(ValueError):
+        validate_job(_job(titanic_copy, tmp_path, **bad))
+
+
+def test_same_named_inputs_get_separate_folders(titanic, tmp_path):
+    for folder, rows in (("a", 891), ("b", 100)):
+        (tmp_path / "drops" / folder).mkdir(parents=True)
+        titanic.head(rows).to_csv(tmp_path / "drops" / folder / "data.csv", index=False)
+    spec = {"inputs": [str(tmp_path / "drops" / "*" / "data.csv")], "output_dir": str(tmp_path / "results"),
+            "workers": 2, "stats": {"basic": True}}
+    summary = run_job(spec)
+    dirs = [r["output_dir"] for r in summary["files"]]
+    assert dirs == [str(tmp_path / "results" / "a" / "data"), str(tmp_path / "results" / "b" / "data")]
+    for result, rows in zip(summary["files"], (891, 100)):
+        assert result["status"] == "ok", result.get("error")
+        written = pd.read_csv(os.path.join(result["output_dir"], "stats_basic.csv"), index_col=0)
+        assert written.loc["Количество", "PassengerId"] == rows
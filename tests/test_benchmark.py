@@ -0,0 +1,56 @@
+import pandas as pd
+from src.benchmark import make_dataset, scaled_titanic, run_benchmarks, compare_results, \
+    save_results, load_results
+
+
+def test_make_dataset_is_reproducible():
+    df = make_dataset(2000, columns=5, seed=3)
+    assert len(df) == 2000
+    assert list(df.columns) == ["float_0", "int_1", "category_2", "text_3", "numtext_4", "target"]
+    pd.testing.assert_frame_equal(df, make_dataset(2000, columns=5, seed=3))
+    # Доля пропусков близка к missing_rate, в цели пропусков нет
+    rate = df.drop(columns="target").isna().mean()
+    assert ((rate > 0.03) & (rate < 0.07)).all()
+    assert df["target"].notna().all()
+    assert df.duplicated().sum() >= 10
+
+
+def test_make_dataset_without_noise():
+    df = make_dataset(500, columns=3, missing_rate=0, duplicate_rate=0)
+    assert df.notna().all().all()
+    assert not df.duplicated().any()
+
+
+def test_scaled_titanic(titanic, titanic_copy):
+    df = scaled_titanic(3000, titanic_copy)
+    assert len(df) == 3000
+    assert list(df.columns) == list(titanic.columns)
+    assert df["PassengerId"].is_unique
+    assert set(df["Pclass"]) <= set(titanic["Pclass"])
+
+
+def test_run_benchmarks_and_compare(tmp_path):
+    results = run_benchmarks(sizes=(300,), groups=("load",), repeat=1, memory=False, progress=None)
+    cases = {r["case"] for r in results["results"]}
+    assert {"read_csv", "optimize_dtypes", "stream_pass"} <= cases
+    assert all(r["group"] == "load" and r["rows"] == 300 for r in results["results"])
+    path = str(tmp_path / "bench.json")
+    save_results(results, path)
+    assert load_results(path) == results
+
+
+def _results(seconds, peak_mb=10.0):
+    return {"results": [{"group": "stats", "case": "basic", "rows": 100, "seconds": seconds, "peak_mb": peak_mb}]}
+
+
+def test_compare_results_statuses():
+    assert compare_results(_results(1.0), _results(1.0))["Статус"][0] == "ок"
+    assert compare_results(_results(2.0), _results(1.0))["Статус"][0] == "регрессия"
+    assert compare_results(_results(0.5), _results(1.0))["Статус"][0] == "ускорение"
+    # Рост памяти - тоже регрессия
+    assert compare_results(_results(1.0, 50.0), _results(1.0, 10.0))["Статус"][0] == "регрессия"
+    # Разница меньше min_seconds - шум
+    assert compare_results(_results(0.002), _results(0.001))["Статус"][0] == "ок"
+    table = compare_results(_results(1.0), {"results": []})
+    assert table["Статус"][0] == "нет в базе"
+    assert pd.isna(table["База, с"][0])
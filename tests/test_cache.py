@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+from src.cache import DatasetCache
+from src.memory import optimize_dtypes
+
+
+def test_roundtrip_keeps_values_and_dtypes(tmp_path, titanic, titanic_copy):
+    source = titanic_copy
+    cache = DatasetCache(str(tmp_path / "cache"))
+    df, _ = optimize_dtypes(titanic)
+    df["When"] = pd.date_range("2020-01-01", periods=len(df), freq="D")
+    cache.save(df, source)
+    loaded = cache.load(source)
+    pd.testing.assert_frame_equal(loaded.copy(), df)
+    # Числовые колонки отображены в память, а не прочитаны
+    assert isinstance(loaded["Fare"].to_numpy().base, np.memmap)
+
+
+def test_non_string_column_labels(tmp_path, titanic, titanic_copy):
+    source = titanic_copy
+    cache = DatasetCache(str(tmp_path / "cache"))
+    df = titanic.assign(**{"1": 0.5})
+    df[0] = 1
+    df[("a", "b")] = "x"
+    cache.save(df, source)
+    loaded = cache.load(source)
+    assert list(loaded.columns) == list(df.columns)
+    pd.testing.assert_frame_equal(loaded.copy(), df)
+
+
+def test_entries_keyed_by_file_and_recipe(tmp_path, titanic, titanic_copy):
+    source = titanic_copy
+    cache = DatasetCache(str(tmp_path / "cache"))
+    recipe = [("remove_missing_values", {})]
+    cache.save(titanic, source)
+    cache.save(titanic.dropna(), source, recipe)
+    assert len(cache.load(source, recipe)) == len(titanic.dropna())
+    assert cache.cleaned_recipes(source) == [[("remove_missing_values", {})]]
+    # Файл изменился - старые записи не подходят
+    with open(source, "a") as f:
+        f.write("892,0,3,\"New, Mr. Test\",male,30,0,0,X,7.5,,S\n")
+    assert cache.load(source) is None
+    assert cache.load(source, recipe) is None
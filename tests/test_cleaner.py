@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.cleaner import DataCleaner
+from src.loader import ChunkedCSV
+from src.transforms import StreamDeduplicator, _in_run
+
+
+def _numeric(df):
+    return df.select_dtypes(include=["number"])
+
+
+def test_zscore_outliers_match_pandas(titanic):
+    num = _numeric(titanic)
+    z = (num - num.mean()) / num.std()
+    expected = titanic[(z.abs() < 3).all(axis=1)]
+    result = DataCleaner(titanic).remove_outliers(3, "zscore")
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_iqr_outliers_match_pandas(titanic):
+    num = _numeric(titanic)
+    q1, q3 = num.quantile(0.25), num.quantile(0.75)
+    iqr = q3 - q1
+    cols = iqr[iqr > 0].index
+    inside = (num[cols] >= q1[cols] - 1.5 * iqr[cols]) & (num[cols] <= q3[cols] + 1.5 * iqr[cols])
+    expected = titanic[inside.all(axis=1)]
+    result = DataCleaner(titanic).remove_outliers(1.5, "iqr")
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_sequential_outliers_match_column_loop(titanic):
+    expected = titanic
+    for col in _numeric(titanic).columns:
+        z = (expected[col] - expected[col].mean()) / expected[col].std()
+        expected = expected[z.abs() < 3]
+    result = DataCleaner(titanic).remove_outliers(3, "zscore", sequential=True)
+    pd.testing.assert_frame_equal(result, expected)
+
+
+@pytest.fixture
+def with_duplicates(titanic):
+    # Повторы разбросаны по таблице, в том числе через границы чанков по 100 строк
+    return pd.concat([titanic, titanic.sample(300, random_state=1)], ignore_index=True)
+
+
+@pytest.mark.parametrize("subset", [None, ["Pclass", "Sex", "Embarked"], ["Age"]])
+@pytest.mark.parametrize("hashed", [True, False])
+def test_duplicates_match_pandas(with_duplicates, subset, hashed):
+    result = DataCleaner(with_duplicates).remove_duplicates(subset, hashed=hashed)
+    pd.testing.assert_frame_equal(result, with_duplicates.drop_duplicates(subset))
+
+
+def test_stream_duplicates_across_chunks(with_duplicates, tmp_path):
+    path = tmp_path / "dups.csv"
+    with_duplicates.to_csv(path, index=False)
+    stream = DataCleaner(ChunkedCSV(str(path), chunksize=100)).remove_duplicates()
+    expected = pd.read_csv(path).drop_duplicates().reset_index(drop=True)
+    # Числа в потоке читаются как float64
+    pd.testing.assert_frame_equal(stream.to_frame(), expected, check_dtype=False)
+    # Каждый проход по потоку начинает с пустого набора хэшей
+    assert stream.count_rows() == len(expected)
+
+
+def test_stream_deduplicator_keeps_few_sorted_runs():
+    rng = np.random.default_rng(3)
+    df = pd.DataFrame({"a": rng.integers(0, 3000, 20_000), "b": rng.integers(0, 3, 20_000)})
+    dedup = StreamDeduplicator()
+    result = pd.concat([dedup(df.iloc[start:start + 250]) for start in range(0, len(df), 250)])
+    pd.testing.assert_frame_equal(result, df.drop_duplicates())
+    assert dedup.seen == len(result) and dedup.removed == len(df) - len(result)
+    # 80 чанков - не больше log2(80) + 1 серий
+    assert len(dedup.runs) <= 7
+    for first, _ in dedup.runs:
+        assert (np.diff(first.astype("float64")) >= 0).all()
+
+
+def test_equal_first_hashes_checked_by_second():
+    run = (np.array([1, 5, 5, 5, 9], dtype="uint64"), np.array([0, 30, 10, 20, 0], dtype="uint64"))
+    first = np.array([5, 5, 5, 9, 9, 10], dtype="uint64")
+    second = np.array([10, 20, 40, 0, 1, 0], dtype="uint64")
+    assert _in_run(run, first, second).tolist() == [True, True, False, True, False, False]
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.loader import ChunkedCSV
+from src.statistics import DataStats
+
+
+def _pandas_pairs(corr):
+    upper = corr.where(np.triu(np.ones(corr.shape, dtype=bool), k=1)).stack()
+    return upper.reindex(upper.abs().sort_values(ascending=False, kind="stable").index)
+
+
+@pytest.mark.parametrize("method", ["pearson", "spearman", "kendall"])
+def test_correlation_matches_pandas(titanic, method):
+    result = DataStats(titanic, cache=None).get_correlation(method)
+    expected = titanic.select_dtypes(include=["number"]).corr(method)
+    pd.testing.assert_frame_equal(result, expected, atol=1e-10, check_exact=False)
+
+
+def test_float32_correlation_is_close(titanic):
+    result = DataStats(titanic, cache=None).get_correlation(dtype="float32")
+    expected = titanic.select_dtypes(include=["number"]).corr()
+    np.testing.assert_allclose(result, expected, atol=1e-5)
+
+
+def test_stream_pearson_matches_pandas(titanic, titanic_stream):
+    result = DataStats(titanic_stream).get_correlation()
+    expected = titanic.select_dtypes(include=["number"]).corr()
+    np.testing.assert_allclose(result, expected, atol=1e-10)
+
+
+@pytest.mark.parametrize("block_size", [2, 3, 100])
+def test_top_pairs_match_full_matrix(block_size):
+    rng = np.random.default_rng(6)
+    base = rng.normal(size=(500, 4))
+    x = np.hstack([base, base + 0.3 * rng.normal(size=(500, 4)), rng.normal(size=(500, 5))])
+    df = pd.DataFrame(x, columns=[f"c{i}" for i in range(x.shape[1])])
+    expected = _pandas_pairs(df.corr())
+    pairs = DataStats(df, cache=None).get_correlated_pairs(k=6, block_size=block_size)
+    assert list(zip(pairs["Колонка 1"], pairs["Колонка 2"])) == list(expected.index[:6])
+    np.testing.assert_allclose(pairs["Корреляция"], expected.iloc[:6], atol=1e-10)
+    strong = DataStats(df, cache=None).get_correlated_pairs(threshold=0.5, block_size=block_size)
+    assert len(strong) == (expected.abs() >= 0.5).sum() == 4
+
+
+def test_stream_pearson_stable_for_large_means(tmp_path):
+    rng = np.random.default_rng(4)
+    a = rng.normal(size=3000)
+    df = pd.DataFrame({"a": a, "b": a + 0.5 * rng.normal(size=3000), "c": rng.normal(size=3000)}) + 1e8
+    df.loc[rng.random(3000) < 0.1, "b"] = np.nan
+    path = tmp_path / "offset.csv"
+    df.to_csv(path, index=False)
+    expected = pd.read_csv(path).corr()
+    result = DataStats(ChunkedCSV(str(path), chunksize=250)).get_correlation()
+    np.testing.assert_allclose(result, expected, atol=1e-7)
+
+
+def test_kendall_computes_each_pair_once(monkeypatch):
+    import src.correlation as correlation
+    calls = []
+    original = correlation.kendalltau
+    monkeypatch.setattr(correlation, "kendalltau", lambda a, b: calls.append(1) or original(a, b))
+    rng = np.random.default_rng(5)
+    df = pd.DataFrame(rng.normal(size=(300, 6)), columns=list("abcdef"))
+    df.loc[rng.random(300) < 0.1, "b"] = np.nan
+    df["f"] = 1.0
+    result = DataStats(df, cache=None).get_correlation("kendall")
+    assert len(calls) == 6 * 5 // 2
+    expected = df.corr("kendall")
+    # У постоянной колонки на диагонали NaN, как у Пирсона и Спирмена
+    expected.loc["f", "f"] = np.nan
+    pd.testing.assert_frame_equal(result, expected, atol=1e-12, check_exact=False)
+    calls.clear()
+    pairs = DataStats(df, cache=None).get_correlated_pairs(k=3, method="kendall", block_size=4)
+    assert len(calls) == 6 * 5 // 2
+    assert len(pairs) == 3
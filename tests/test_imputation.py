@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.cleaner import DataCleaner
+from src.imputation import Imputer
+
+
+@pytest.mark.parametrize("strategy", ["mean", "median"])
+def test_overall_matches_fillna(titanic, strategy):
+    filled, report = Imputer.from_data(titanic, strategy).transform(titanic)
+    numeric = titanic.select_dtypes(include=["number"])
+    expected = numeric.fillna(getattr(numeric, strategy)())
+    pd.testing.assert_frame_equal(filled[numeric.columns], expected)
+    assert [item["column"] for item in report] == ["Age"]
+    # Исходная таблица не меняется
+    assert titanic["Age"].isna().sum() == 177
+
+
+@pytest.mark.parametrize("strategy", ["mean", "median"])
+def test_grouped_matches_groupby_transform(titanic, strategy):
+    imputer = Imputer.from_data(titanic, strategy, group_by=["Pclass", "Sex"])
+    filled, _ = imputer.transform(titanic)
+    expected = titanic["Age"].fillna(titanic.groupby(["Pclass", "Sex"])["Age"].transform(strategy))
+    pd.testing.assert_series_equal(filled["Age"], expected)
+
+
+def test_grouped_mode_matches_pandas(titanic):
+    filled, _ = Imputer.from_data(titanic, "mode", group_by="Pclass").transform(titanic)
+    # Наименьшая из самых частых - как mode().iloc[0]
+    modes = titanic.groupby("Pclass")["Embarked"].agg(lambda s: s.mode().iloc[0])
+    expected = titanic["Embarked"].fillna(titanic["Pclass"].map(modes))
+    pd.testing.assert_series_equal(filled["Embarked"], expected)
+    cabin = titanic.groupby("Pclass")["Cabin"].agg(lambda s: s.mode().iloc[0] if s.notna().any() else np.nan)
+    expected = titanic["Cabin"].fillna(titanic["Pclass"].map(cabin))
+    pd.testing.assert_series_equal(filled["Cabin"], expected)
+
+
+def test_unseen_and_empty_groups_use_overall_value(titanic):
+    train = titanic[titanic["Pclass"] != 3]
+    imputer = Imputer.from_data(train, "median", group_by="Pclass")
+    test = pd.DataFrame({"Pclass": [1, 3, np.nan], "Age": [np.nan, np.nan, np.nan]})
+    filled, report = imputer.transform(test)
+    assert filled["Age"].tolist() == [train.loc[train["Pclass"] == 1, "Age"].median(),
+                                      train["Age"].median(), train["Age"].median()]
+    assert report[0]["left"] == 0
+
+
+def test_fitted_values_reapplied_after_save(titanic, tmp_path):
+    head, tail = titanic.iloc[:500], titanic.iloc[500:]
+    imputer = Imputer.from_data(head, "mean", group_by="Sex")
+    loaded = Imputer.load(imputer.save(str(tmp_path / "imputer.joblib")))
+    filled, _ = loaded.transform(tail)
+    means = head.groupby("Sex")["Age"].mean()
+    pd.testing.assert_series_equal(filled["Age"], tail["Age"].fillna(tail["Sex"].map(means)))
+
+
+def test_integer_column_widened_for_fractional_value():
+    df = pd.DataFrame({"g": ["a", "a", "b"], "n": pd.array([1, 2, None], dtype="Int64"),
+                       "k": np.array([1, 2, 3], dtype="int8")})
+    filled, report = Imputer.from_data(df, "mean").transform(df)
+    assert filled["n"].tolist() == [1, 2, 1.5]
+    assert report[0]["cast"] == "float64"
+
+
+def test_cleaner_uses_saved_imputer(titanic, tmp_path):
+    cleaner = DataCleaner(titanic.copy())
+    cleaner.fill_missing_values("median", group_by=["Pclass", "Sex"])
+    path = cleaner.imputer.save(str(tmp_path / "imputer.joblib"))
+    again = DataCleaner(titanic.copy())
+    again.fill_missing_values(fitted=path)
+    pd.testing.assert_frame_equal(again.df, cleaner.df)
+    assert any("по группам Pclass, Sex" in line for line in cleaner.history)
+
+
+def test_stream_fill_matches_memory(titanic, titanic_stream):
+    stream = DataCleaner(titanic_stream)
+    stream.fill_missing_values("mean")
+    memory = DataCleaner(titanic.copy())
+    memory.fill_missing_values("mean")
+    result = pd.concat(list(stream.df), ignore_index=True)
+    np.testing.assert_allclose(result["Age"], memory.df["Age"], rtol=1e-12)
@@ -0,0 +1,148 @@
+import numpy as np
+import pandas as pd
+import pytest
+import main
+from src.cleaner import DataCleaner
+from src.memory import optimize_dtypes, append_rows
+from src.statistics import DataStats, IncrementalStats
+
+
+@pytest.fixture
+def session(monkeypatch):
+    """Чистое состояние программы (глобальные переменные main)."""
+    for name in ("current_df", "current_cleaner", "current_stats", "stats_owner",
+                 "sample_settings", "current_sample", "sample_owner"):
+        monkeypatch.setattr(main, name, None)
+    return main
+
+
+def _load(session, df):
+    session.current_df = df
+    session.current_cleaner = DataCleaner(df)
+
+
+def test_update_equals_state_of_whole_table(titanic, tmp_path):
+    head, tail = titanic.iloc[:600], titanic.iloc[600:]
+    state = IncrementalStats.from_data(head).update(tail)
+    whole = IncrementalStats.from_data(titanic)
+    numeric = titanic.select_dtypes(include=["number"])
+    stats = state.basic_stats()
+    assert state.rows == len(titanic)
+    np.testing.assert_array_equal(stats.loc["Количество"].astype(float), numeric.count())
+    np.testing.assert_allclose(stats.loc["Среднее"].astype(float), numeric.mean(), rtol=1e-12)
+    np.testing.assert_allclose(stats.loc["Дисперсия"].astype(float), numeric.var(), rtol=1e-10)
+    np.testing.assert_allclose(stats.loc["Skew (Асимметрия)"].astype(float), numeric.skew(), rtol=1e-8)
+    # Мало разных значений - мода точная
+    assert stats.loc["Мода", "Pclass"] == numeric["Pclass"].mode()[0]
+    np.testing.assert_allclose(state.correlation(), numeric.corr(), atol=1e-12)
+    # Моменты не зависят от того, какими частями пришли строки
+    exact = ["Количество", "Среднее", "Минимум", "Максимум", "Дисперсия", "Kurtosis (Эксцесс)"]
+    pd.testing.assert_frame_equal(stats.loc[exact].astype(float), whole.basic_stats().loc[exact].astype(float),
+                                  rtol=1e-10)
+    restored = IncrementalStats.load(state.save(str(tmp_path / "state.joblib")))
+    pd.testing.assert_frame_equal(restored.basic_stats(), stats)
+
+
+def test_new_column_in_appended_rows(titanic):
+    state = IncrementalStats.from_data(titanic[["Age", "Fare"]])
+    state.update(titanic[["Age", "Fare", "Pclass"]])
+    assert state.columns == ["Age", "Fare", "Pclass"]
+    assert state.basic_stats().loc["Количество", "Pclass"] == len(titanic)
+
+
+def test_append_rows_keeps_compact_dtypes(titanic):
+    compact, _ = optimize_dtypes(titanic.iloc[:600])
+    result = append_rows(compact, titanic.iloc[600:])
+    assert (result.dtypes == compact.dtypes).all()
+    expected = pd.concat([titanic.iloc[:600], titanic.iloc[600:]], ignore_index=True)
+    pd.testing.assert_frame_equal(result.astype(object).where(result.notna(), None),
+                                  expected.astype(object).where(expected.notna(), None), check_dtype=False)
+
+
+def test_append_rows_widens_when_values_do_not_fit():
+    df = pd.DataFrame({"a": np.array([1, 2], dtype="int8"), "b": pd.Categorical(["x", "y"])})
+    new = pd.DataFrame({"a": [1000, 3], "b": ["z", "x"], "c": [0.5, 1.5]})
+    result = append_rows(df, new)
+    assert result["a"].dtype == np.int16
+    assert result["a"].tolist() == [1, 2, 1000, 3]
+    assert result["b"].dtype == "category"
+    assert result["b"].tolist() == ["x", "y", "z", "x"]
+    assert result["c"].isna().tolist() == [True, True, False, False]
+
+
+def test_basic_stats_columns_filter(titanic):
+    state = IncrementalStats.from_data(titanic)
+    stats = DataStats(titanic, approx=True, state=state, cache=None)
+    result = stats.get_basic_stats(columns=["Fare", "Age"])
+    assert list(result.columns) == ["Fare", "Age"]
+    # Колонки, которой нет в состоянии, - расчет по данным, а не все колонки состояния
+    frame = titanic.assign(Extra=titanic["Fare"] * 2)
+    result = DataStats(frame, approx=True, state=state, cache=None).get_basic_stats(columns=["Extra"])
+    assert list(result.columns) == ["Extra"]
+    assert result.loc["Количество", "Extra"] == titanic["Fare"].count()
+
+
+def test_append_data_updates_state(session, titanic, tmp_path):
+    _load(session, titanic.iloc[:600].reset_index(drop=True))
+    path = tmp_path / "more.csv"
+    titanic.iloc[600:].to_csv(path, index=False)
+    session.append_data(str(path))
+    assert len(session.current_df) == len(titanic)
+    assert session.stats_state_fresh()
+    state = session.get_stats_state()
+    np.testing.assert_allclose(state.basic_stats().loc["Среднее", "Fare"], titanic["Fare"].mean(), rtol=1e-12)
+
+
+def test_stale_state_is_rebuilt_after_cleaning(session):
+    # Регрессия: состояние, построенное до шага очистки, не должно использоваться после него
+    df = pd.DataFrame({"a": [1.0, 2.0, 3.0, 4.0], "amount": ["10", "20", "30", "40"]})
+    _load(session, df)
+    before = session.get_stats_state()
+    assert before.columns == ["a"]
+    session.current_cleaner.convert_to_numeric()
+    session.current_df = session.current_cleaner.df
+    assert not session.stats_state_fresh()
+    assert session.stats_for(session.current_df).state is None
+    after = session.get_stats_state()
+    assert after is not before
+    assert after.columns == ["a", "amount"]
+    assert session.stats_for(session.current_df).state is after
+    # Отмена шага тоже меняет версии колонок
+    session.current_cleaner.undo()
+    session.current_df = session.current_cleaner.df
+    assert not session.stats_state_fresh()
+    assert session.get_stats_state().columns == ["a"]
+
+
+def test_state_not_used_for_other_tables(session, titanic):
+    _load(session, titanic)
+    session.get_stats_state()
+    assert session.stats_for(titanic.iloc[:100]).state is None
+    assert session.stats_for(titanic).state is session.current_stats
+
+
+def _offset_frame(rows=4000, offset=1e8):
+    rng = np.random.default_rng(2)
+    a = rng.normal(size=rows)
+    df = pd.DataFrame({"a": a, "b": a + 0.5 * rng.normal(size=rows), "c": rng.normal(size=rows) + 0.3 * a}) + offset
+    df.loc[rng.random(rows) < 0.1, "a"] = np.nan
+    df.loc[rng.random(rows) < 0.2, "c"] = np.nan
+    return df
+
+
+def test_correlation_stable_for_large_means():
+    # Сырые суммы x и x^2 при среднем 1e8 давали NaN вместо 0.89
+    df = _offset_frame()
+    state = IncrementalStats.from_data(df.iloc[:1500]).update(df.iloc[1500:])
+    np.testing.assert_allclose(state.correlation(), df.corr(), atol=1e-7)
+    assert state.correlation().notna().all().all()
+
+
+def test_exact_correlation_does_not_use_state(titanic):
+    # Состояние другой таблицы: точная матрица считается по данным, а не берется из него
+    other = IncrementalStats.from_data(titanic.sample(frac=0.5, random_state=0))
+    result = DataStats(titanic, state=other, cache=None).get_correlation()
+    expected = titanic.select_dtypes(include=["number"]).corr()
+    pd.testing.assert_frame_equal(result, expected, atol=1e-12, check_exact=False)
+    approx = DataStats(titanic, approx=True, state=other, cache=None).get_correlation()
+    pd.testing.assert_frame_equal(approx, other.correlation())
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+from src.loader import ChunkedCSV, is_stream, SAMPLE_ROWS
+from src.statistics import DataStats
+from src.cleaner import DataCleaner
+
+
+def test_stream_reads_same_rows(titanic, titanic_stream):
+    assert is_stream(titanic_stream)
+    assert titanic_stream.count_rows() == len(titanic)
+    # Поток можно обходить несколько раз
+    assert titanic_stream.count_rows() == len(titanic)
+    pd.testing.assert_frame_equal(titanic_stream.to_frame(), titanic, check_dtype=False)
+
+
+def test_stream_transforms_apply_per_chunk(titanic, titanic_stream):
+    cleaner = DataCleaner(titanic_stream)
+    stream = cleaner.remove_missing_values()
+    assert stream.count_rows() == len(titanic.dropna())
+
+
+def test_stream_stats_match_pandas(titanic, titanic_stream):
+    stats = DataStats(titanic_stream).get_basic_stats()
+    numeric = titanic.select_dtypes(include=["number"])
+    np.testing.assert_allclose(stats.loc["Среднее"].astype(float), numeric.mean(), rtol=1e-10)
+    np.testing.assert_allclose(stats.loc["Стд. отклонение"].astype(float), numeric.std(), rtol=1e-10)
+
+
+def test_stream_moments_are_stable_for_large_mean(tmp_path):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({"a": 1e9 + rng.normal(size=5000), "b": np.r_[np.nan, np.arange(4999.0)]})
+    path = tmp_path / "big_mean.csv"
+    df.to_csv(path, index=False)
+    mean, std, missing = DataCleaner(ChunkedCSV(str(path), chunksize=700))._stream_moments(["a", "b"])
+    np.testing.assert_allclose(mean, df.mean(), rtol=1e-12)
+    np.testing.assert_allclose(std, df.std(), rtol=1e-8)
+    assert missing.tolist() == [0, 1]
+
+
+def test_text_after_sample_rows_does_not_break_stream(tmp_path, capsys):
+    rows = SAMPLE_ROWS + 500
+    df = pd.DataFrame({"x": np.arange(rows, dtype="float64"), "flag": [True, False] * (rows // 2),
+                       "name": ["a"] * rows}).astype({"x": object, "flag": object})
+    df.loc[SAMPLE_ROWS + 10, "x"] = "n/a?"
+    df.loc[SAMPLE_ROWS + 20, "flag"] = "maybe"
+    path = tmp_path / "late_text.csv"
+    df.to_csv(path, index=False)
+    stream = ChunkedCSV(str(path), chunksize=3000)
+    assert stream.dtypes == {"x": "float64", "flag": "boolean", "name": "object"}
+    chunks = list(stream)
+    assert all(chunk["x"].dtype == "float64" and chunk["flag"].dtype == "boolean" for chunk in chunks)
+    result = pd.concat(chunks, ignore_index=True)
+    assert len(result) == rows
+    assert result["x"].isna().sum() == 1 and result["flag"].isna().sum() == 1
+    assert result["x"].sum() == np.arange(rows).sum() - (SAMPLE_ROWS + 10)
+    assert "'x'" in capsys.readouterr().out
+    # Предупреждение печатается один раз, а не на каждом проходе
+    list(stream)
+    assert capsys.readouterr().out == ""
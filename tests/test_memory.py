@@ -0,0 +1,34 @@
+import numpy as np
+import pandas as pd
+from src.memory import optimize_dtypes, memory_usage, memory_report
+
+
+def _same_values(a, b):
+    pd.testing.assert_frame_equal(a.astype(object).where(a.notna(), None),
+                                  b.astype(object).where(b.notna(), None), check_dtype=False)
+
+
+def test_optimize_is_lossless_and_smaller(titanic):
+    optimized, report = optimize_dtypes(titanic)
+    _same_values(optimized, titanic)
+    assert memory_usage(optimized) < 0.6 * memory_usage(titanic)
+    assert optimized["Pclass"].dtype == np.int8
+    assert optimized["Sex"].dtype == "category"
+    # Дробные значения не помещаются во float32 - колонка не меняется
+    assert optimized["Fare"].dtype == np.float64
+    assert report.loc["Pclass", "Тип после"] == "int8"
+    assert memory_report(report)[-1].startswith("[Память] Таблица:")
+
+
+def test_float_with_gaps_becomes_nullable_int():
+    df = pd.DataFrame({"a": [1.0, np.nan, 300.0], "b": [0.5, 0.25, np.nan]})
+    optimized, _ = optimize_dtypes(df)
+    assert optimized["a"].dtype == "Int16"
+    assert optimized["b"].dtype == np.float32
+    _same_values(optimized, df)
+
+
+def test_original_table_is_not_modified(titanic):
+    before = titanic.dtypes.copy()
+    optimize_dtypes(titanic)
+    pd.testing.assert_series_equal(titanic.dtypes, before)
@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+from sklearn.linear_model import LinearRegression
+from sklearn.metrics import r2_score
+from sklearn.model_selection import KFold, cross_val_score, train_test_split
+from src.machine_learning import DataPredictor, _StreamScore
+from src.models import ModelRegistry, data_fingerprint
+
+
+@pytest.fixture
+def registry(tmp_path):
+    return ModelRegistry(str(tmp_path / "models"))
+
+
+def test_second_fit_comes_from_registry(titanic, registry, tmp_path):
+    predictor = DataPredictor(titanic, registry=registry)
+    first = predictor.predict("Fare", ["Age", "Pclass"], "tree", save_path=str(tmp_path / "a.png"))
+    second = predictor.predict("Fare", ["Age", "Pclass"], "tree", save_path=str(tmp_path / "b.png"))
+    assert not first["cached"] and second["cached"]
+    assert first["key"] == second["key"]
+    assert second["mae"] == pytest.approx(first["mae"])
+    # Другие данные - другой ключ, модель обучается заново
+    other = DataPredictor(titanic.iloc[:500], registry=registry).predict(
+        "Fare", ["Age", "Pclass"], "tree", save_path=str(tmp_path / "c.png"))
+    assert not other["cached"]
+
+
+def test_linear_model_matches_sklearn(titanic, tmp_path):
+    result = DataPredictor(titanic).predict("Fare", ["Age", "Pclass"], save_path=str(tmp_path / "a.png"))
+    data = titanic[["Fare", "Age", "Pclass"]].dropna()
+    # predict делит данные так же (train_test_split, random_state=42)
+    X_train, _, y_train, _ = train_test_split(data[["Age", "Pclass"]], data["Fare"], test_size=0.2,
+                                              random_state=42)
+    np.testing.assert_allclose(result["model"].coef_, LinearRegression().fit(X_train, y_train).coef_)
+
+
+def test_score_new_file_without_refit(titanic, titanic_copy, registry, tmp_path):
+    fitted = DataPredictor(titanic, registry=registry).predict(
+        "Fare", ["Age", "Pclass"], save_path=str(tmp_path / "a.png"))
+    scored = registry.score(fitted["key"], titanic_copy, chunksize=100)
+    complete = titanic[["Age", "Pclass"]].notna().all(axis=1)
+    expected = fitted["model"].predict(titanic.loc[complete, ["Age", "Pclass"]])
+    np.testing.assert_allclose(scored.loc[complete, "prediction_Fare"], expected)
+    assert scored.loc[~complete, "prediction_Fare"].isna().all()
+
+
+def test_registry_evicts_least_recently_used(titanic, tmp_path):
+    registry = ModelRegistry(str(tmp_path / "models"), budget_mb=0)
+    model = LinearRegression().fit(titanic[["Pclass"]], titanic["Fare"])
+    keys = [registry.key(data_fingerprint(titanic), "Fare", ["Pclass"], "linear", {"i": i}) for i in range(3)]
+    for key in keys:
+        registry.put(key, model, {"target": "Fare", "features": ["Pclass"]})
+    # Бюджет 0: остается только последняя сохраненная модель
+    assert [meta["key"] for meta in registry.entries()] == [keys[-1]]
+
+
+def test_compare_models_matches_cross_val_score(titanic):
+    report = DataPredictor(titanic).compare_models("Fare", ["Age", "Pclass", "SibSp"],
+                                                   ("linear", "tree"), folds=4, n_jobs=2)
+    data = titanic[["Fare", "Age", "Pclass", "SibSp"]].dropna()
+    X, y = data[["Age", "Pclass", "SibSp"]].to_numpy(), data["Fare"].to_numpy()
+    cv = KFold(n_splits=4, shuffle=True, random_state=42)
+    expected = -cross_val_score(LinearRegression(), X, y, cv=cv, scoring="neg_mean_absolute_error")
+    assert report.loc["Линейная регрессия", "MAE (среднее)"] == pytest.approx(expected.mean())
+    assert report.loc["Линейная регрессия", "MAE (стд.)"] == pytest.approx(expected.std(ddof=1))
+    assert list(report.index) == ["Линейная регрессия", "Дерево решений"]
+
+
+def test_sgd_on_stream_close_to_least_squares(titanic_stream, titanic, tmp_path):
+    result = DataPredictor(titanic_stream).fit_incremental("Fare", ["Pclass", "Age"], "sgd",
+                                                          save_path=str(tmp_path / "sgd.png"), epochs=20)
+    data = titanic[["Fare", "Pclass", "Age"]].dropna()
+    exact = LinearRegression().fit(data[["Pclass", "Age"]], data["Fare"])
+    scaler, sgd = result["model"][0], result["model"][-1]
+    np.testing.assert_allclose(sgd.coef_ / scaler.scale_, exact.coef_, rtol=0.2)
+    assert result["r2"] > 0.2
+
+
+def test_hist_subsamples_above_row_budget(titanic, tmp_path, capsys):
+    predictor = DataPredictor(titanic)
+    full = predictor.fit_incremental("Fare", ["Age", "Pclass"], "hist", save_path=str(tmp_path / "a.png"),
+                                     chunksize=100)
+    assert "Внимание" not in capsys.readouterr().out
+    small = predictor.fit_incremental("Fare", ["Age", "Pclass"], "hist", save_path=str(tmp_path / "b.png"),
+                                      chunksize=100, max_rows=200)
+    assert "случайной выборке около 200" in capsys.readouterr().out
+    booster = small["model"][-1]
+    assert booster.n_iter_ > 0 and full["r2"] > 0
+
+
+def test_stream_r2_stable_for_large_target_mean():
+    rng = np.random.default_rng(8)
+    # Цель вроде отметок времени: среднее 1.7e9, разброс - единицы
+    y = 1.7e9 + rng.normal(0, 3, 5000)
+    y_pred = y + rng.normal(0, 1, 5000)
+    score = _StreamScore()
+    for start in range(0, len(y), 700):
+        score.update(y[start:start + 700], y_pred[start:start + 700])
+    np.testing.assert_allclose(score.r2(), r2_score(y, y_pred), rtol=1e-9)
+    np.testing.assert_allclose(score.mae(), np.abs(y - y_pred).mean(), rtol=1e-12)
@@ -0,0 +1,42 @@
+import pandas as pd
+import pytest
+from src.cleaner import DataCleaner
+
+PLANS = [
+    [("remove_duplicates", {}), ("remove_missing_values", {})],
+    [("remove_duplicates", {}), ("fill_missing_values", {"strategy": "mean"}),
+     ("remove_outliers", {"threshold": 3, "method": "zscore"})],
+    [("fill_missing_values", {"strategy": "median", "group_by": ["Pclass", "Sex"]}),
+     ("remove_outliers", {"threshold": 1.5, "method": "iqr"}), ("optimize_memory", {})],
+    [("convert_to_numeric", {}), ("remove_duplicates", {"subset": ["Name"]}),
+     ("fill_missing_values", {"strategy": "mode"})],
+]
+
+
+@pytest.fixture
+def dirty(titanic):
+    df = pd.concat([titanic, titanic.iloc[:50]], ignore_index=True)
+    df["Code"] = df["PassengerId"].astype(str)
+    return df
+
+
+@pytest.mark.parametrize("plan", PLANS)
+def test_lazy_plan_equals_eager_steps(dirty, plan):
+    eager = DataCleaner(dirty)
+    for name, params in plan:
+        getattr(eager, name)(**params)
+    lazy = DataCleaner(dirty, lazy=True)
+    for name, params in plan:
+        getattr(lazy, name)(**params)
+    assert len(lazy.plan) == len(plan)
+    pd.testing.assert_frame_equal(lazy.collect(), eager.df)
+    assert len(lazy.plan) == 0
+
+
+def test_plan_fuses_row_steps(dirty):
+    lazy = DataCleaner(dirty, lazy=True)
+    lazy.remove_duplicates()
+    lazy.fill_missing_values()
+    lazy.remove_outliers()
+    lazy.convert_to_numeric()
+    assert [kind for kind, _ in lazy.plan.stages()] == ["rows", "coerce"]
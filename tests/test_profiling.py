@@ -0,0 +1,130 @@
+import json
+import threading
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from src.profiling import Profiler, PROFILER, count_rows, format_record
+from src.cleaner import DataCleaner
+
+
+def test_nested_stages():
+    profiler = Profiler(trace_memory=True)
+    with profiler.stage("outer", rows_in=10) as outer:
+        with profiler.stage("inner") as inner:
+            data = [0] * 1_000_000
+            inner['rows_out'] = len(data)
+        del data
+        outer['rows_out'] = 5
+    records = {r['name']: r for r in profiler.records}
+    assert records["inner"]['depth'] == 1 and records["inner"]['parent'] == "outer"
+    assert records["outer"]['wall'] >= records["inner"]['wall']
+    # Пик вложенного этапа учитывается и в родителе
+    assert records["inner"]['peak_alloc_mb'] > 7
+    assert records["outer"]['peak_alloc_mb'] >= records["inner"]['peak_alloc_mb']
+    assert list(profiler.frame()['name']) == ["outer", "inner"]
+    assert "строк 10 -> 5" in format_record(records["outer"])
+
+
+def test_error_is_recorded():
+    profiler = Profiler()
+    with pytest.raises(ZeroDivisionError):
+        with profiler.stage("broken"):
+            1 / 0
+    assert profiler.records[0]['error'].startswith("ZeroDivisionError")
+    assert "ошибка" in format_record(profiler.records[0])
+
+
+def test_instrumented_cleaner(titanic):
+    PROFILER.clear()
+    cleaner = DataCleaner(titanic.copy())
+    cleaner.remove_missing_values()
+    record = PROFILER.records[-1]
+    assert record['name'] == "DataCleaner.remove_missing_values"
+    assert record['rows_in'] == len(titanic)
+    assert record['rows_out'] == len(titanic.dropna())
+    assert cleaner.history[-1] == format_record(record)
+
+
+def test_lazy_steps_are_not_measured(titanic):
+    PROFILER.clear()
+    cleaner = DataCleaner(titanic.copy(), lazy=True)
+    cleaner.remove_duplicates()
+    cleaner.remove_missing_values()
+    assert not PROFILER.records
+    cleaner.collect()
+    names = [r['name'] for r in PROFILER.records]
+    assert names[-1] == "DataCleaner.collect"
+    # Проходы плана - вложенные этапы выполнения
+    assert all(r['parent'] == "DataCleaner.collect" for r in list(PROFILER.records)[:-1])
+
+
+def test_exports(tmp_path):
+    profiler = Profiler()
+    with profiler.stage("a"):
+        with profiler.stage("b"):
+            pass
+    lines = open(profiler.to_jsonl(str(tmp_path / "p.jsonl")), encoding="utf-8").read().splitlines()
+    assert [json.loads(line)['name'] for line in lines] == ["a", "b"]
+    trace = json.load(open(profiler.to_chrome_trace(str(tmp_path / "t.json")), encoding="utf-8"))
+    events = {e['name']: e for e in trace['traceEvents']}
+    assert events["a"]['ph'] == "X"
+    assert events["a"]['ts'] <= events["b"]['ts']
+    assert events["a"]['ts'] + events["a"]['dur'] >= events["b"]['ts'] + events["b"]['dur']
+
+
+def test_cprofile_of_slowest_stage(tmp_path):
+    profiler = Profiler(profile=True)
+    with profiler.stage("fast"):
+        pass
+    with profiler.stage("slow"):
+        sorted(range(200_000), key=lambda x: -x)
+    name, text = profiler.dump_slowest(str(tmp_path / "slow.prof"))
+    assert name == "slow"
+    assert "sorted" in text
+    assert Profiler().dump_slowest(str(tmp_path / "none.prof")) is None
+
+
+def test_count_rows(titanic, titanic_stream):
+    assert count_rows(titanic) == len(titanic)
+    assert count_rows(titanic_stream) is None
+
+
+def test_records_are_bounded():
+    profiler = Profiler(max_records=5)
+    for i in range(12):
+        with profiler.stage(f"s{i}"):
+            pass
+    assert [r['name'] for r in profiler.records] == [f"s{i}" for i in range(7, 12)]
+    profiler.clear()
+    assert len(profiler.records) == 0 and profiler.records.maxlen == 5
+
+
+def test_history_keeps_last_profile_lines(titanic, monkeypatch):
+    monkeypatch.setattr(PROFILER, "history_lines", 3)
+    cleaner = DataCleaner(titanic.copy())
+    for _ in range(5):
+        cleaner.remove_duplicates()
+    profiled = [line for line in cleaner.history if line.startswith("[Профиль]")]
+    assert len(profiled) == 3
+    # Строки самих шагов не удаляются
+    assert sum(line.startswith("[Очистка]") for line in cleaner.history) == 5
+
+
+def test_stack_is_per_thread():
+    profiler = Profiler(trace_memory=True)
+    barrier = threading.Barrier(4)
+
+    def work(i):
+        with profiler.stage(f"outer{i}"):
+            barrier.wait()
+            with profiler.stage(f"inner{i}"):
+                barrier.wait()
+
+    with ThreadPoolExecutor(4) as pool:
+        list(pool.map(work, range(4)))
+    records = {r['name']: r for r in profiler.records}
+    for i in range(4):
+        assert records[f"outer{i}"]['depth'] == 0 and records[f"outer{i}"]['parent'] is None
+        assert records[f"inner{i}"]['depth'] == 1 and records[f"inner{i}"]['parent'] == f"outer{i}"
+    # Последний этап с замером памяти выключил tracemalloc, включенный журналом
+    assert not tracemalloc.is_tracing()
@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+import pytest
+import main
+from src.cleaner import DataCleaner
+from src.loader import ChunkedCSV
+from src.sampling import draw_sample, _allocate
+
+
+def _in_source(sample, source):
+    """Строки выборки - строки исходной таблицы в ее порядке."""
+    ids = sample["PassengerId"].to_numpy()
+    assert (np.diff(ids) > 0).all()
+    merged = sample.merge(source, on=list(source.columns), how="left", indicator=True)
+    assert (merged["_merge"] == "both").all()
+
+
+def test_allocate_is_proportional():
+    quota = _allocate([500, 300, 199, 1], 100)
+    # Строка маленького слоя не увеличивает размер выборки
+    assert quota.tolist() == [50, 30, 19, 1]
+    assert _allocate([600, 300, 100], 10).tolist() == [6, 3, 1]
+    assert _allocate([3, 2], 100).tolist() == [3, 2]
+    assert _allocate([1000, 1, 1, 1, 1], 5).tolist() == [1, 1, 1, 1, 1]
+    assert _allocate([5, 0, 5], 4).tolist() == [2, 0, 2]
+
+
+@pytest.mark.parametrize("method", ["uniform", "reservoir", "stratified"])
+def test_sample_rows_come_from_source(titanic, method):
+    sample = draw_sample(titanic, 200, method, column="Pclass" if method == "stratified" else None,
+                         seed=1, chunksize=64)
+    assert len(sample.df) == 200 and sample.population == len(titanic)
+    _in_source(sample.df, titanic)
+    again = draw_sample(titanic, 200, method, column=sample.column, seed=1, chunksize=64)
+    pd.testing.assert_frame_equal(again.df, sample.df)
+
+
+def test_stratified_quota_per_stratum(titanic):
+    sample = draw_sample(titanic, 100, "stratified", column="Embarked", seed=0, chunksize=50)
+    sizes = titanic["Embarked"].value_counts(dropna=False, sort=False)
+    counts = sample.df["Embarked"].value_counts(dropna=False)
+    expected = pd.Series(_allocate(sizes.to_numpy(), 100), index=sizes.index)
+    pd.testing.assert_series_equal(counts.reindex(expected.index), expected, check_names=False)
+    # Слой из двух пропусков тоже представлен
+    assert sample.df["Embarked"].isna().sum() >= 1
+
+
+@pytest.mark.parametrize("method", ["uniform", "reservoir", "stratified"])
+def test_stream_equals_memory(titanic, titanic_stream, method):
+    column = "Pclass" if method == "stratified" else None
+    memory = draw_sample(titanic, 150, method, column=column, seed=3, chunksize=100)
+    stream = draw_sample(titanic_stream, 150, method, column=column, seed=3)
+    pd.testing.assert_frame_equal(stream.df, memory.df, check_dtype=False)
+    assert stream.population == memory.population
+
+
+def test_reservoir_is_uniform():
+    # Каждая строка попадает в выборку с вероятностью size / rows
+    df = pd.DataFrame({"i": np.arange(100)})
+    hits = np.zeros(100)
+    for seed in range(400):
+        hits[draw_sample(df, 10, "reservoir", seed=seed, chunksize=7).df["i"]] += 1
+    assert abs(hits.mean() - 40) < 1e-9
+    assert hits.min() > 15 and hits.max() < 70
+
+
+def test_unknown_stratum_raises(tmp_path, monkeypatch):
+    path = tmp_path / "data.csv"
+    pd.DataFrame({"g": ["a", "b", "a", "b"], "v": [1, 2, 3, 4]}).to_csv(path, index=False)
+    stream = ChunkedCSV(str(path), chunksize=2)
+    count_column = stream.column
+
+    def column_then_change_file(name):
+        # Файл меняется между подсчетом слоев и проходом выборки
+        values = count_column(name)
+        pd.DataFrame({"g": ["a", "b", "c", "b"], "v": [1, 2, 3, 4]}).to_csv(path, index=False)
+        return values
+
+    monkeypatch.setattr(stream, "column", column_then_change_file)
+    with pytest.raises(ValueError, match="не совпадают"):
+        draw_sample(stream, 3, "stratified", column="g", seed=0)
+
+
+def test_confidence_intervals_cover_population(titanic):
+    sample = draw_sample(titanic, 400, "stratified", column="Pclass", seed=5)
+    ci = sample.confidence_intervals(["Age", "Fare"])
+    mean = titanic[["Age", "Fare"]].mean()
+    assert ((ci["Среднее: от"] <= mean) & (mean <= ci["Среднее: до"])).all()
+    uniform = draw_sample(titanic, 400, seed=5).confidence_intervals(["Fare"])
+    median = titanic["Fare"].median()
+    assert uniform.loc["Fare", "Медиана: от"] <= median <= uniform.loc["Fare", "Медиана: до"]
+
+
+def test_sample_redrawn_when_table_changes(monkeypatch, titanic):
+    monkeypatch.setattr(main, "current_df", titanic)
+    monkeypatch.setattr(main, "current_cleaner", DataCleaner(titanic))
+    monkeypatch.setattr(main, "sample_settings", {"size": 100, "method": "uniform", "seed": 0})
+    monkeypatch.setattr(main, "current_sample", None)
+    monkeypatch.setattr(main, "sample_owner", None)
+    first = main.get_sample()
+    assert main.get_sample() is first
+    main.current_cleaner.fill_missing_values()
+    main.current_df = main.current_cleaner.df
+    second = main.get_sample()
+    assert second is not first
+    assert second.df["Age"].notna().all()
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.shards import load_shards, shard_report, expand_shards, is_shard_source
+
+
+def _split(df, folder, parts):
+    folder.mkdir()
+    for i, part in enumerate(np.array_split(np.arange(len(df)), parts)):
+        df.iloc[part].to_csv(folder / f"part_{i:02d}.csv", index=False)
+    return folder
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_shards_equal_single_file(titanic, tmp_path, workers):
+    folder = _split(titanic, tmp_path / "parts", 5)
+    df, report, notes = load_shards(str(folder), workers=workers)
+    pd.testing.assert_frame_equal(df, titanic)
+    assert notes == []
+    assert (report["Статус"] == "ок").all() and report["Строк"].sum() == len(titanic)
+
+
+def test_glob_pattern(titanic, tmp_path):
+    folder = _split(titanic, tmp_path / "parts", 3)
+    assert is_shard_source(str(folder / "part_0[01].csv")) and is_shard_source(str(folder))
+    assert len(expand_shards(str(folder / "part_0[01].csv"))) == 2
+    df, _, _ = load_shards(str(folder / "part_0[01].csv"), workers=1)
+    expected = pd.concat([pd.read_csv(folder / "part_00.csv"), pd.read_csv(folder / "part_01.csv")],
+                         ignore_index=True)
+    pd.testing.assert_frame_equal(df, expected)
+
+
+def test_schema_reconciliation_matches_concat(tmp_path):
+    folder = tmp_path / "parts"
+    folder.mkdir()
+    frames = [
+        pd.DataFrame({"id": [1, 2], "value": [1, 2], "flag": [True, False]}),
+        pd.DataFrame({"id": [3, 4], "value": [0.5, np.nan], "flag": [False, True], "note": ["a", "b"]}),
+        # Колонки flag нет, note целиком пустая
+        pd.DataFrame({"id": [5], "value": [7], "note": [np.nan]}),
+    ]
+    for i, frame in enumerate(frames):
+        frame.to_csv(folder / f"{i}.csv", index=False)
+    df, _, notes = load_shards(str(folder), workers=1)
+    expected = pd.concat([pd.read_csv(folder / f"{i}.csv") for i in range(3)], ignore_index=True)
+    assert list(df.columns) == ["id", "value", "flag", "note"]
+    assert df["id"].dtype == np.int64
+    # Целые вместе с дробными - float64
+    assert df["value"].dtype == np.float64
+    # Логическая колонка с пропусками - nullable boolean, а не object
+    assert df["flag"].dtype == "boolean"
+    assert df["flag"].tolist() == [True, False, False, True, pd.NA]
+    pd.testing.assert_frame_equal(df.drop(columns="flag"), expected.drop(columns="flag"))
+    assert any("'flag'" in note and "1 файлах" in note for note in notes)
+    assert any("'value'" in note and "float64" in note for note in notes)
+
+
+def test_broken_shard_is_skipped(titanic, tmp_path):
+    folder = _split(titanic, tmp_path / "parts", 3)
+    (folder / "part_99.csv").write_bytes(b"")
+    df, report, _ = load_shards(str(folder), workers=1)
+    pd.testing.assert_frame_equal(df, titanic)
+    assert report.loc[str(folder / "part_99.csv"), "Статус"] == "ошибка"
+    assert shard_report(report)[0].startswith(f"[Загрузка] Пропущен файл {folder / 'part_99.csv'}")
+
+
+def test_no_files(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        load_shards(str(tmp_path / "*.csv"))
@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+from src.sketch import KLLSketch, FrequentValues
+from src.statistics import DataStats
+
+
+def _rank_errors(sketch, values, qs):
+    s = np.sort(values)
+    answers = sketch.quantiles(qs)
+    ranks = np.searchsorted(s, answers, side="right") / len(s)
+    return np.abs(ranks - qs)
+
+
+@pytest.mark.parametrize("epsilon", [0.05, 0.01])
+def test_kll_rank_error_within_bound(epsilon):
+    rng = np.random.default_rng(2)
+    values = rng.lognormal(size=200_000)
+    sketch = KLLSketch(epsilon)
+    for block in np.array_split(values, 40):
+        sketch.update(block)
+    qs = np.linspace(0.01, 0.99, 99)
+    assert sketch.n == len(values)
+    assert _rank_errors(sketch, values, qs).max() <= epsilon
+    # Скетч хранит малую часть значений
+    assert sketch.retained() < len(values) / 10
+
+
+def test_kll_merge_keeps_bound():
+    rng = np.random.default_rng(3)
+    parts = [rng.normal(loc, size=50_000) for loc in (0, 5, -3)]
+    merged = KLLSketch(0.01)
+    for part in parts:
+        merged.merge(KLLSketch(0.01).update(part))
+    qs = np.linspace(0.05, 0.95, 19)
+    assert _rank_errors(merged, np.concatenate(parts), qs).max() <= 0.01
+
+
+def test_approx_stats_close_to_exact(titanic):
+    exact = DataStats(titanic, cache=None).get_basic_stats()
+    approx = DataStats(titanic, approx=True, cache=None).get_basic_stats()
+    np.testing.assert_allclose(approx.loc["Среднее"].astype(float), exact.loc["Среднее"].astype(float),
+                               rtol=1e-12)
+    # Малая таблица помещается в скетч целиком: медиана точная
+    np.testing.assert_allclose(approx.loc["Медиана"].astype(float), exact.loc["Медиана"].astype(float))
+    assert approx.loc["Мода"].tolist() == exact.loc["Мода"].tolist()
+
+
+def test_frequent_values_exact_for_low_cardinality():
+    rng = np.random.default_rng(4)
+    values = rng.integers(0, 50, size=10_000).astype(float)
+    summary = FrequentValues(capacity=64)
+    for block in np.array_split(values, 10):
+        summary.update(block)
+    counts = np.bincount(values.astype(int))
+    assert summary.exact
+    assert summary.mode() == counts.argmax()
+
+
+def test_frequent_values_memory_is_bounded():
+    rng = np.random.default_rng(5)
+    values = np.r_[rng.normal(size=100_000), np.full(3_000, 7.0)]
+    rng.shuffle(values)
+    summary = FrequentValues(capacity=100)
+    for block in np.array_split(values, 20):
+        summary.update(block)
+    assert len(summary.values) <= 100
+    assert summary.error <= summary.n / 101
+    assert summary.mode() == 7.0
+
+
+def test_frequent_values_without_clear_mode():
+    summary = FrequentValues(capacity=10).update(np.arange(1000.0))
+    assert len(summary.values) <= 10
+    assert np.isnan(summary.mode())
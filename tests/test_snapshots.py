@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+from src.cleaner import DataCleaner
+from src.snapshots import Snapshot, SnapshotStore
+
+
+def test_undo_redo_restore_tables(titanic):
+    cleaner = DataCleaner(titanic.copy())
+    original = cleaner.df.copy()
+    cleaner.remove_missing_values()
+    after_drop = cleaner.df.copy()
+    cleaner.fill_missing_values()
+    pd.testing.assert_frame_equal(cleaner.undo(), after_drop)
+    pd.testing.assert_frame_equal(cleaner.undo(), original)
+    # Отменять больше нечего - таблица не меняется
+    pd.testing.assert_frame_equal(cleaner.undo(), original)
+    pd.testing.assert_frame_equal(cleaner.redo(), after_drop)
+
+
+def test_undo_after_type_conversion_restores_text(titanic):
+    df = titanic.assign(Code=titanic["PassengerId"].astype(str))
+    cleaner = DataCleaner(df)
+    cleaner.convert_to_numeric()
+    assert cleaner.df["Code"].dtype == "int64"
+    # Преобразование не меняет исходную таблицу на месте
+    assert df["Code"].dtype == object
+    pd.testing.assert_frame_equal(cleaner.undo(), df)
+
+
+def test_checkpoint_and_restore(titanic):
+    cleaner = DataCleaner(titanic)
+    cleaner.remove_duplicates()
+    cleaner.checkpoint("start")
+    saved = cleaner.df.copy()
+    cleaner.remove_missing_values()
+    cleaner.remove_outliers()
+    pd.testing.assert_frame_equal(cleaner.restore("start"), saved)
+    assert len(cleaner.undo()) < len(saved)
+
+
+def test_row_steps_store_positions_not_copies(titanic):
+    cleaner = DataCleaner(titanic)
+    before = cleaner.snapshots.memory_usage()
+    cleaner.remove_missing_values()
+    cleaner.remove_outliers()
+    added = cleaner.snapshots.memory_usage() - before
+    # Только номера оставшихся строк (8 байт на строку), без копий колонок
+    assert added <= 8 * 2 * len(titanic)
+
+
+def test_snapshots_respect_memory_budget():
+    n = 100_000
+    df = pd.DataFrame({col: np.arange(n, dtype="float64") for col in "abcd"})
+    column_mb = 8 * n / 1024 ** 2
+    # База (4 колонки) и еще 3.5 замененные колонки
+    store = SnapshotStore(df, budget_mb=7.5 * column_mb)
+    evicted = 0
+    for step in range(1, 6):
+        df = df.assign(a=df["a"] + 1)
+        evicted += store.commit(df, f"шаг {step}", "columns")
+        assert store.memory_usage() <= store.budget
+    assert evicted == 3
+    # Остались два последних шага: отмена возвращает их состояния по порядку
+    assert len(store.undo_stack) == 2
+    restored, label = store.undo()
+    assert label == "шаг 5"
+    assert restored["a"].iloc[0] == 4
+    restored, _ = store.undo()
+    assert restored["a"].iloc[0] == 3
+    assert store.undo() == (None, None)
+
+
+def test_column_step_after_row_removal_skips_untouched_columns(titanic, monkeypatch):
+    cleaner = DataCleaner(titanic.copy())
+    cleaner.remove_outliers()
+    gathered = []
+    column = Snapshot.column
+    monkeypatch.setattr(Snapshot, "column", lambda self, col, positions=None:
+                        gathered.append(col) or column(self, col, positions))
+    before = cleaner.df.copy()
+    cleaner.fill_missing_values("mode")
+    # Значения собираются только у колонок, которые шаг заменил
+    changed = [col for col in before.columns if not before[col].equals(cleaner.df[col])]
+    assert changed and sorted(gathered) == sorted(changed)
+    pd.testing.assert_frame_equal(cleaner.undo(), before)
+    cleaner.redo()
+    assert sorted(cleaner.snapshots.current.overrides) == sorted(changed)
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.moments import MomentAccumulator
+from src.statistics import DataStats
+
+
+def _row(stats, name):
+    return stats.loc[name].astype(float)
+
+
+def test_basic_stats_match_pandas(titanic):
+    stats = DataStats(titanic, cache=None).get_basic_stats()
+    numeric = titanic.select_dtypes(include=["number"])
+    assert list(stats.columns) == list(numeric.columns)
+    np.testing.assert_array_equal(_row(stats, "Количество"), numeric.count())
+    np.testing.assert_allclose(_row(stats, "Среднее"), numeric.mean(), rtol=1e-12)
+    np.testing.assert_allclose(_row(stats, "Медиана"), numeric.median(), rtol=1e-12)
+    np.testing.assert_allclose(_row(stats, "Стд. отклонение"), numeric.std(), rtol=1e-12)
+    np.testing.assert_allclose(_row(stats, "Skew (Асимметрия)"), numeric.skew(), rtol=1e-9)
+    np.testing.assert_allclose(_row(stats, "Kurtosis (Эксцесс)"), numeric.kurt(), rtol=1e-9)
+    iqr = numeric.quantile(0.75) - numeric.quantile(0.25)
+    np.testing.assert_allclose(_row(stats, "IQR (Интерквартильный)"), iqr, rtol=1e-12)
+    np.testing.assert_allclose(_row(stats, "Мода"), numeric.mode().iloc[0], rtol=1e-12)
+
+
+@pytest.mark.parametrize("parts", [2, 7, 50])
+def test_moment_merge_equals_single_pass(parts):
+    rng = np.random.default_rng(1)
+    x = rng.gamma(2.0, 3.0, size=(3000, 3)) + 1e6
+    x[rng.random(x.shape) < 0.1] = np.nan
+    whole = MomentAccumulator.from_array(x, ["a", "b", "c"])
+    merged = MomentAccumulator(["a", "b", "c"])
+    for block in np.array_split(x, parts):
+        merged.merge(MomentAccumulator.from_array(block, ["a", "b", "c"]))
+    for name in ("get_mean", "var", "skew", "kurt", "get_min", "get_max"):
+        np.testing.assert_allclose(getattr(merged, name)(), getattr(whole, name)(), rtol=1e-7)
+    frame = pd.DataFrame(x)
+    np.testing.assert_allclose(merged.var(), frame.var(), rtol=1e-9)
+    np.testing.assert_allclose(merged.skew(), frame.skew(), rtol=1e-6)
+
+
+def test_merge_with_empty_accumulator():
+    x = np.arange(10.0)[:, None]
+    acc = MomentAccumulator(["a"]).merge(MomentAccumulator.from_array(x, ["a"]))
+    assert acc.get_mean()[0] == pytest.approx(4.5)
+    assert acc.var()[0] == pytest.approx(np.var(x, ddof=1))
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_grouped_stats_match_groupby(titanic, workers):
+    stats = DataStats(titanic, cache=None).get_basic_stats(group_by=["Pclass", "Sex"], workers=workers)
+    grouped = titanic.drop(columns=["Pclass", "Sex"]).select_dtypes(include=["number"]) \
+        .groupby([titanic["Pclass"], titanic["Sex"]])
+    for name, expected in [("Среднее", grouped.mean()), ("Медиана", grouped.median()),
+                           ("Стд. отклонение", grouped.std()), ("Количество", grouped.count())]:
+        result = stats.xs(name, level="Статистика")
+        np.testing.assert_allclose(result.astype(float), expected.astype(float), rtol=1e-10)
+
+
+def test_grouped_correlation_matches_groupby(titanic):
+    result = DataStats(titanic, cache=None).get_correlation(group_by="Pclass", workers=1)
+    numeric = titanic.select_dtypes(include=["number"])
+    for key, part in numeric.groupby("Pclass"):
+        expected = part.drop(columns="Pclass").corr()
+        np.testing.assert_allclose(result.loc[key], expected, atol=1e-10)
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.cleaner import DataCleaner
+from src.statistics import DataStats
+from src.stats_cache import StatsCache
+
+
+def _stats(cleaner, cache):
+    return DataStats(cleaner.df, versions=cleaner.column_versions, cache=cache)
+
+
+def test_cached_stats_equal_fresh(titanic):
+    cache = StatsCache()
+    cleaner = DataCleaner(titanic.copy())
+    first = _stats(cleaner, cache).get_basic_stats()
+    assert cache.misses == len(first.columns) and cache.hits == 0
+    second = _stats(cleaner, cache).get_basic_stats()
+    assert cache.hits == len(first.columns)
+    pd.testing.assert_frame_equal(second, first)
+    pd.testing.assert_frame_equal(first, DataStats(titanic, cache=None).get_basic_stats())
+
+
+def test_step_invalidates_only_changed_columns(titanic):
+    cache = StatsCache()
+    cleaner = DataCleaner(titanic.copy())
+    _stats(cleaner, cache).get_basic_stats()
+    cleaner.fill_missing_values()
+    misses = cache.misses
+    result = _stats(cleaner, cache).get_basic_stats()
+    # Пропуски были только в Age
+    assert cache.misses - misses == 1
+    pd.testing.assert_frame_equal(result, DataStats(cleaner.df, cache=None).get_basic_stats())
+
+
+def test_undo_reuses_cached_results(titanic):
+    cache = StatsCache()
+    cleaner = DataCleaner(titanic.copy())
+    before = _stats(cleaner, cache).get_basic_stats()
+    cleaner.remove_missing_values()
+    _stats(cleaner, cache).get_basic_stats()
+    cleaner.undo()
+    misses = cache.misses
+    pd.testing.assert_frame_equal(_stats(cleaner, cache).get_basic_stats(), before)
+    assert cache.misses == misses
+
+
+@pytest.mark.parametrize("method", ["pearson", "spearman"])
+def test_correlation_updated_for_changed_columns(titanic, method):
+    cache = StatsCache()
+    cleaner = DataCleaner(titanic.copy())
+    _stats(cleaner, cache).get_correlation(method)
+    cleaner.fill_missing_values()
+    corr = _stats(cleaner, cache).get_correlation(method)
+    numeric = cleaner.df.select_dtypes(include=["number"])
+    np.testing.assert_allclose(corr, numeric.corr(method), atol=1e-12)
+
+
+def test_budget_evicts_least_recently_used():
+    cache = StatsCache(budget_mb=1)
+    block = np.zeros(50_000)  # 400 КБ
+    cache.put("a", block)
+    cache.put("b", block)
+    cache.get("a")
+    cache.put("c", block)
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.size <= cache.budget
+    # Запись больше всего бюджета не сохраняется и ничего не вытесняет
+    cache.put("big", np.zeros(200_000))
+    assert cache.get("big") is None and len(cache.entries) == 2
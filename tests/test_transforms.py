@@ -0,0 +1,34 @@
+import pandas as pd
+import pytest
+from src.cleaner import DataCleaner
+from src.transforms import convert_columns
+
+
+@pytest.fixture
+def text_table(titanic):
+    dates = pd.date_range("2020-01-01", periods=len(titanic), freq="h")
+    return titanic.assign(Code=titanic["PassengerId"].astype(str),
+                          FareText=titanic["Fare"].map("{:.4f}".format),
+                          When=dates.strftime("%d.%m.%Y %H:%M"))
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_numeric_conversion_matches_pandas(text_table, workers):
+    cleaner = DataCleaner(text_table, workers=workers)
+    result = cleaner.convert_to_numeric()
+    pd.testing.assert_series_equal(result["Code"], pd.to_numeric(text_table["Code"]))
+    pd.testing.assert_series_equal(result["FareText"], pd.to_numeric(text_table["FareText"]))
+    # Имена не числа - колонка остается текстом
+    assert result["Name"].dtype == object
+
+
+def test_datetime_conversion_uses_inferred_format(text_table):
+    result = DataCleaner(text_table).convert_to_datetime()
+    expected = pd.to_datetime(text_table["When"], format="%d.%m.%Y %H:%M")
+    pd.testing.assert_series_equal(result["When"], expected)
+
+
+def test_categorical_columns_convert_by_categories(text_table):
+    df = text_table.assign(Code=text_table["Code"].astype("category"))
+    [result] = convert_columns(df, ["Code"], "numeric")
+    pd.testing.assert_series_equal(result["converted"].astype("int64"), pd.to_numeric(text_table["Code"]))
@@ -0,0 +1,60 @@
+import os
+import matplotlib
+import matplotlib.pyplot as plt
+import numpy as np
+import pytest
+from scipy.stats import gaussian_kde
+from src.visualizer import DataVisualizer, render_batch
+
+PLOTS = [{"type": "histogram", "column": "Age"}, {"type": "density", "column": "Fare"},
+         {"type": "boxplot", "column": "Age"}, {"type": "boxplot_mean_std", "column": "Age"},
+         {"type": "violin", "column": "Fare"}, {"type": "scatter", "x": "Age", "y": "Fare"}]
+
+
+def test_binned_density_close_to_gaussian_kde(titanic):
+    age = titanic["Age"].dropna().to_numpy()
+    result = DataVisualizer(titanic)._binned_density("Age")
+    expected = gaussian_kde(age)(result["x"])
+    assert result["counts"].sum() == len(age)
+    np.testing.assert_allclose(result["density"], expected, atol=0.02 * expected.max())
+
+
+@pytest.mark.parametrize("max_points", [100, 100_000])
+def test_all_plots_render_headless(titanic, tmp_path, max_points):
+    # max_points=100 - графики строятся по агрегатам
+    saved = render_batch(titanic, PLOTS, str(tmp_path), workers=1, max_points=max_points)
+    assert len(saved) == len(PLOTS)
+    assert all(os.path.getsize(path) > 0 for path in saved)
+
+
+def test_parallel_render_matches_serial_outputs(titanic, tmp_path):
+    serial = render_batch(titanic, PLOTS, str(tmp_path / "serial"), fmt="svg", workers=1)
+    parallel = render_batch(titanic, PLOTS, str(tmp_path / "parallel"), fmt="svg", workers=2)
+    assert [os.path.basename(p) for p in serial] == [os.path.basename(p) for p in parallel]
+
+
+def test_binned_histogram_uses_two_passes(titanic_stream, titanic, tmp_path, monkeypatch):
+    viz = DataVisualizer(titanic_stream, save_dir=str(tmp_path))
+    passes = []
+    blocks = DataVisualizer._blocks
+    monkeypatch.setattr(DataVisualizer, "_blocks", lambda self, cols: passes.append(cols) or blocks(self, cols))
+    bars = {}
+    monkeypatch.setattr(plt, "stairs", lambda counts, edges, **kw: bars.update(counts=counts, edges=edges))
+    assert viz.plot_histogram("Fare").endswith("histogram_Fare.png")
+    # Моменты и мелкая сетка; столбцы для показа собираются из сетки
+    assert len(passes) == 2
+    fare = titanic["Fare"].dropna()
+    assert bars["counts"].sum() == len(fare)
+    assert 25 <= len(bars["counts"]) <= 50
+    assert bars["edges"][0] <= fare.min() and bars["edges"][-1] >= fare.max()
+    expected = np.histogram(fare, bins=bars["edges"])[0]
+    np.testing.assert_array_equal(bars["counts"], expected)
+
+
+def test_save_dir_does_not_switch_backend(titanic, tmp_path):
+    matplotlib.use("pdf")
+    try:
+        DataVisualizer(titanic, save_dir=str(tmp_path))
+        assert matplotlib.get_backend() == "pdf"
+    finally:
+        matplotlib.use("Agg")